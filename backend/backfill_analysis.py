@@ -0,0 +1,57 @@
+# backend/backfill_analysis.py
+# Job phân tích bù (cảm xúc + chủ đề) cho các bài báo chưa được phân tích lúc ingest,
+# hoặc đã phân tích bằng model cũ. Chạy lại bao nhiêu lần cũng được: bài đã xong sẽ được bỏ qua.
+#   python backfill_analysis.py --batch-size 64
+import argparse
+import json
+import time
+from datetime import datetime
+from sqlalchemy import or_
+
+from database import SessionLocal, ArticleDB, init_db
+from services.sentiment_service import load_model, map_label, model_revision
+from services.news_api_service import per_article_topics
+
+parser = argparse.ArgumentParser(description="Phân tích bù cảm xúc + chủ đề cho bài báo trong DB")
+parser.add_argument("--batch-size", type=int, default=64, help="Số bài mỗi lô (mỗi lô commit 1 lần)")
+parser.add_argument("--start-id", type=int, default=0, help="Bắt đầu từ id lớn hơn giá trị này")
+args = parser.parse_args()
+
+init_db()
+sentiment_analyzer = load_model()
+if sentiment_analyzer is None:
+    raise SystemExit("Model cảm xúc chưa được tải, dừng job.")
+MODEL_REVISION = model_revision()
+
+start = time.time()
+db = SessionLocal()
+last_id = args.start_id
+done = 0
+try:
+    pending_filter = or_(ArticleDB.sentiment_model.is_(None), ArticleDB.sentiment_model != MODEL_REVISION)
+    total = db.query(ArticleDB.id).filter(ArticleDB.id > last_id, pending_filter).count()
+    print(f"Có {total} bài báo cần phân tích (model {MODEL_REVISION}).")
+
+    while True:
+        batch = db.query(ArticleDB).filter(ArticleDB.id > last_id, pending_filter) \
+            .order_by(ArticleDB.id).limit(args.batch_size).all()
+        if not batch:
+            break
+        texts = [f"{a.title}. {a.content or ''}" for a in batch]
+        results = sentiment_analyzer(texts, truncation=True, batch_size=len(texts))
+        topics = per_article_topics(texts)
+        now = datetime.utcnow()
+        for article, res, article_topics in zip(batch, results, topics):
+            article.sentiment_label = map_label(res["label"])
+            article.sentiment_score = float(res["score"])
+            article.sentiment_model = MODEL_REVISION
+            article.topics = json.dumps(article_topics, ensure_ascii=False)
+            article.analyzed_at = now
+        db.commit()  # Mỗi lô 1 commit -> dừng giữa chừng thì lần sau chạy tiếp từ lô chưa xong
+        last_id = batch[-1].id
+        done += len(batch)
+        print(f"  ... {done}/{total} bài (id <= {last_id})")
+finally:
+    db.close()
+
+print(f"Đã phân tích {done} bài báo trong {time.time() - start:.1f}s!")
@@ -0,0 +1,72 @@
+# backend/bench_sentiment_backends.py
+# So sánh backend ONNX int8 với pipeline PyTorch hiện tại trên cùng dữ liệu:
+# - Độ khớp nhãn POS/NEG/NEU + lệch điểm (dừng với mã lỗi 1 nếu khớp dưới --min-agreement)
+# - Thông lượng (câu/giây) theo từng batch size
+#   python bench_sentiment_backends.py --limit 500 --batch-sizes 1,8,32
+import os
+import csv
+import sys
+import time
+import argparse
+import statistics
+
+parser = argparse.ArgumentParser(description="Parity + benchmark: PyTorch vs ONNX int8")
+parser.add_argument("--csv", default=os.path.join(os.path.dirname(__file__), "test_dataset_1000.csv"))
+parser.add_argument("--column", default="BinhLuan")
+parser.add_argument("--limit", type=int, default=1000)
+parser.add_argument("--batch-sizes", default="1,8,32")
+parser.add_argument("--threads", type=int, default=0, help="SENTIMENT_ONNX_THREADS (0 = tự chọn)")
+parser.add_argument("--min-agreement", type=float, default=0.98, help="Tỉ lệ nhãn khớp tối thiểu")
+parser.add_argument("--export", action="store_true", help="Luôn export lại model ONNX")
+args = parser.parse_args()
+
+if args.threads:
+    os.environ["SENTIMENT_ONNX_THREADS"] = str(args.threads)
+from transformers import pipeline
+from services.sentiment_service import LOCAL_MODEL_PATH, weights_revision
+from services.onnx_sentiment import OnnxSentimentPipeline, ensure_onnx_model, export_onnx
+
+with open(args.csv, encoding="utf-8-sig", newline="") as f:
+    texts = [row[args.column] for row in csv.DictReader(f) if row.get(args.column, "").strip()][:args.limit]
+print(f"{len(texts)} câu từ {os.path.basename(args.csv)}")
+
+torch_pipe = pipeline("sentiment-analysis", model=LOCAL_MODEL_PATH)
+revision = weights_revision()
+onnx_path = export_onnx(LOCAL_MODEL_PATH, revision) if args.export else ensure_onnx_model(LOCAL_MODEL_PATH, revision)
+onnx_pipe = OnnxSentimentPipeline(LOCAL_MODEL_PATH, onnx_path)
+print(f"ONNX: {onnx_path} ({os.path.getsize(onnx_path) / 1e6:.0f} MB), {onnx_pipe.threads} luồng")
+
+# === 1. ĐỘ KHỚP KẾT QUẢ ===
+reference = torch_pipe(texts, truncation=True, batch_size=32)
+candidate = onnx_pipe(texts, truncation=True, batch_size=32)
+agree = [r["label"] == c["label"] for r, c in zip(reference, candidate)]
+score_diffs = [abs(r["score"] - c["score"]) for r, c, ok in zip(reference, candidate, agree) if ok]
+agreement = sum(agree) / len(agree)
+print(f"\nKhớp nhãn: {agreement:.2%} ({sum(agree)}/{len(agree)})")
+if score_diffs:
+    print(f"Lệch điểm (khi cùng nhãn): trung bình {statistics.mean(score_diffs):.4f}, lớn nhất {max(score_diffs):.4f}")
+for text, r, c, ok in zip(texts, reference, candidate, agree):
+    if not ok:
+        print(f"  Khác nhãn: {r['label']} ({r['score']:.2f}) vs {c['label']} ({c['score']:.2f}): {text[:80]}")
+
+# === 2. THÔNG LƯỢNG ===
+def throughput(pipe, batch_size: int):
+    pipe(texts[:batch_size], truncation=True, batch_size=batch_size)  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        t = time.perf_counter()
+        pipe(texts[i:i + batch_size], truncation=True, batch_size=batch_size)
+        latencies.append(time.perf_counter() - t)
+    return len(texts) / (time.perf_counter() - start), statistics.median(latencies) * 1000
+
+print(f"\n{'Batch':>6}{'PyTorch (câu/s)':>18}{'ONNX int8 (câu/s)':>20}{'Tăng tốc':>10}{'p50 lô torch/onnx (ms)':>26}")
+for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+    torch_tps, torch_p50 = throughput(torch_pipe, batch_size)
+    onnx_tps, onnx_p50 = throughput(onnx_pipe, batch_size)
+    print(f"{batch_size:>6}{torch_tps:>18.1f}{onnx_tps:>20.1f}{onnx_tps / torch_tps:>9.2f}x"
+          f"{f'{torch_p50:.1f} / {onnx_p50:.1f}':>26}")
+
+if agreement < args.min_agreement:
+    print(f"\n!!! Độ khớp {agreement:.2%} thấp hơn ngưỡng {args.min_agreement:.2%}")
+    sys.exit(1)
@@ -0,0 +1,53 @@
+# backend/bench_stability.py
+# Đo thông lượng client Stability (pool kết nối + semaphore + retry + gộp request trùng)
+# với server giả lập: python fake_stability_server.py --latency 1 --fail-rate 0.1
+#   python bench_stability.py --requests 40 --concurrency 4 --duplicate-rate 0.25
+import os
+import time
+import random
+import asyncio
+import argparse
+
+import httpx
+
+parser = argparse.ArgumentParser(description="Đo thông lượng StabilityClient")
+parser.add_argument("--base-url", default="http://127.0.0.1:8789")
+parser.add_argument("--requests", type=int, default=40, help="Tổng số request gửi cùng lúc")
+parser.add_argument("--concurrency", type=int, default=4, help="STABILITY_MAX_CONCURRENCY")
+parser.add_argument("--duplicate-rate", type=float, default=0.25, help="Tỉ lệ request trùng payload (được gộp)")
+args = parser.parse_args()
+
+os.environ.setdefault("STABILITY_API_KEY", "test")  # Server giả lập không kiểm tra key
+from services.stability_service import StabilityClient, StabilityError
+
+
+async def main():
+    client = StabilityClient(base_url=args.base_url, max_concurrency=args.concurrency)
+    prompts = [f"prompt {i}" if random.random() >= args.duplicate_rate else "prompt trùng" for i in range(args.requests)]
+    latencies = []
+
+    async def one(prompt):
+        start = time.perf_counter()
+        try:
+            await client.text_to_image(prompt)
+            return True
+        except StabilityError as e:
+            print(f"  Lỗi: {e}")
+            return False
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(p) for p in prompts))
+    elapsed = time.perf_counter() - start
+    await client.close()
+
+    latencies.sort()
+    print(f"{sum(results)}/{len(results)} thành công trong {elapsed:.2f}s -> {len(results) / elapsed:.1f} req/s")
+    print(f"Độ trễ p50 {latencies[len(latencies) // 2]:.2f}s, p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f}s")
+    print(f"Client: {client.stats()}")
+    async with httpx.AsyncClient() as http:
+        print(f"Server: {(await http.get(f'{args.base_url}/stats')).json()}")
+
+
+asyncio.run(main())
@@ -0,0 +1,48 @@
+# backend/bench_startup.py
+# Đo thời gian import của từng router / main.py trong interpreter mới (giống cold start / mỗi lần --reload).
+#   python bench_startup.py --repeat 3 --top 8
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+TARGETS = ["database", "routers.analytics", "routers.content_studio", "routers.personalization", "main"]
+
+parser = argparse.ArgumentParser(description="Đo chi phí import lúc khởi động theo từng router")
+parser.add_argument("--repeat", type=int, default=3, help="Số lần đo mỗi module (lấy trung vị)")
+parser.add_argument("--top", type=int, default=8, help="Số package import nặng nhất liệt kê cho mỗi module")
+parser.add_argument("targets", nargs="*", default=TARGETS)
+args = parser.parse_args()
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s+(\S+)")
+_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def measure(module: str):
+    """ (giây import, {package gốc: tổng thời gian self của các module con}) trong 1 process Python mới """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _SNIPPET.format(module=module)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    per_package = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        # Cộng thời gian self (không cộng cumulative -> không tính trùng module con)
+        if match:
+            per_package[match.group(2).split(".")[0]] += int(match.group(1)) / 1e6
+    return float(proc.stdout.strip().splitlines()[-1]), per_package
+
+
+print(f"{'Module':<28}{'Trung vị (s)':>14}{'Min (s)':>10}   Package nặng nhất")
+for module in args.targets:
+    try:
+        runs = [measure(module) for _ in range(args.repeat)]
+    except RuntimeError as e:
+        print(f"{module:<28}{'LỖI':>14}   {e}")
+        continue
+    times = [t for t, _ in runs]
+    heaviest = sorted(runs[-1][1].items(), key=lambda x: x[1], reverse=True)[:args.top]
+    print(f"{module:<28}{statistics.median(times):>14.3f}{min(times):>10.3f}   "
+          + ", ".join(f"{name} {secs:.2f}s" for name, secs in heaviest))
@@ -1,13 +1,43 @@
 # backend/database.py
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, DateTime
+import os
+from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey, DateTime, Float, UniqueConstraint, Index, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+from dotenv import load_dotenv
 
-# Kết nối MySQL (XAMPP)
-SQLALCHEMY_DATABASE_URL = "mysql+pymysql://root:@localhost/mediac_db?charset=utf8mb4"
+load_dotenv()
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Kết nối MySQL (XAMPP). DATABASE_URL để đổi DB, vd. sqlite:///./mediac_test.db khi chạy thử không có MySQL
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "mysql+pymysql://root:@localhost/mediac_db?charset=utf8mb4")
+
+# --- CẤU HÌNH POOL KẾT NỐI (áp dụng cho cả engine sync và async) ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))            # Số kết nối giữ sẵn
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))      # Kết nối mở thêm lúc cao điểm (đóng khi trả về)
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))    # Chờ tối đa N giây để mượn kết nối
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))    # Thay kết nối cũ hơn N giây (trước wait_timeout của MySQL)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"   # Ping trước khi dùng: bỏ kết nối MySQL đã bị server đóng
+
+# Driver async tương ứng với từng loại DB (ASYNC_DATABASE_URL để chỉ định trực tiếp)
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+def _engine_options(url) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}  # SQLite (DB thay thế khi test): giữ pool mặc định của SQLAlchemy
+    return {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": DB_POOL_PRE_PING}
+
+def async_database_url(url: str = SQLALCHEMY_DATABASE_URL) -> str:
+    """ mysql+pymysql://... -> mysql+aiomysql://..., sqlite:///x.db -> sqlite+aiosqlite:///x.db """
+    if os.getenv("ASYNC_DATABASE_URL"):
+        return os.getenv("ASYNC_DATABASE_URL")
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS[parsed.get_backend_name()]
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+# Engine sync: job nền, thread (ingest, bộ đệm lượt xem, chỉ mục gợi ý) và các script
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -15,11 +45,18 @@ Base = declarative_base()
 class ArticleDB(Base):
     __tablename__ = "articles"
     id = Column(Integer, primary_key=True, index=True)
-    category = Column(String(100))
+    category = Column(String(100), index=True)
     title = Column(String(500))
     content = Column(Text)
     url = Column(String(500), unique=True)
     image_url = Column(String(500), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=True) # Thời điểm ingest
+    # Kết quả phân tích lưu sẵn lúc ingest (không phải chạy lại model khi đọc)
+    sentiment_label = Column(String(20), nullable=True)
+    sentiment_score = Column(Float, nullable=True)
+    sentiment_model = Column(String(32), nullable=True) # Revision model đã chấm (đổi model -> backfill lại)
+    topics = Column(Text, nullable=True) # JSON: [{"text": ..., "value": ...}]
+    analyzed_at = Column(DateTime, nullable=True, index=True)
 
 # --- 2. BẢNG NGƯỜI DÙNG (MỚI) ---
 class UserDB(Base):
@@ -32,6 +69,11 @@ class UserDB(Base):
 # --- 3. BẢNG TƯƠNG TÁC/LỊCH SỬ (MỚI) ---
 class InteractionDB(Base):
     __tablename__ = "interactions"
+    __table_args__ = (
+        Index("ix_interactions_user_timestamp", "user_id", "timestamp"), # Lịch sử đọc: lọc user + sắp theo thời gian
+        # 1 lượt đọc / (user, bài): bộ đệm /log_view ghi lô bằng INSERT bỏ qua trùng -> ghi lại an toàn
+        Index("uq_interactions_user_article", "user_id", "article_id", unique=True),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     article_id = Column(Integer, ForeignKey("articles.id"))
@@ -40,10 +82,118 @@ class InteractionDB(Base):
     user = relationship("UserDB", back_populates="interactions")
     article = relationship("ArticleDB")
 
+# --- 4. BẢNG GỢI Ý TÍNH SẴN (Job precompute_recommendations.py) ---
+class RecommendationDB(Base):
+    __tablename__ = "recommendations"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    article_id = Column(Integer, ForeignKey("articles.id"))
+    rank = Column(Integer)
+    score = Column(Float)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    article = relationship("ArticleDB")
+
+# --- 5. BẢNG XU HƯỚNG CHỦ ĐỀ (Số bài chứa cụm 2-3 từ, theo giờ ingest + chuyên mục) ---
+class TopicTrendDB(Base):
+    __tablename__ = "topic_trends"
+    __table_args__ = (UniqueConstraint("bucket", "category", "phrase", name="uq_topic_trend_bucket"),)
+    id = Column(Integer, primary_key=True, index=True)
+    bucket = Column(DateTime) # Đầu giờ (UTC) lúc bài được ingest (unique index bắt đầu bằng cột này)
+    category = Column(String(100), default="")
+    phrase = Column(String(255))
+    count = Column(Integer, default=0)
+
 def get_db():
     db = SessionLocal()
     try: yield db
     finally: db.close()
 
-# Tạo bảng mới (User & Interaction)
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+# --- ENGINE ASYNC (handler của FastAPI: chờ DB không chặn event loop) ---
+# Tạo lúc dùng lần đầu: import database.py không phải nạp driver async
+_async_engine = None
+_async_sessionmaker = None
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        url = async_database_url()
+        _async_engine = create_async_engine(url, **_engine_options(url))
+        _async_sessionmaker = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_sessionmaker()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_async_engine():
+    global _async_engine, _async_sessionmaker
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = _async_sessionmaker = None
+
+def pool_status() -> dict:
+    """ Trạng thái pool (số kết nối đang mượn / rảnh / overflow) của 2 engine """
+    status = {"sync": engine.pool.status()}
+    if _async_engine is not None:
+        status["async"] = _async_engine.pool.status()
+    return status
+
+# Unique index mới trên bảng cũ: xóa dòng trùng (giữ id nhỏ nhất) thì mới tạo được index
+def _drop_duplicate_rows(table_name, columns):
+    cols = ", ".join(columns)
+    with engine.begin() as conn:
+        deleted = conn.execute(text(
+            f"DELETE FROM {table_name} WHERE id NOT IN "
+            f"(SELECT id FROM (SELECT MIN(id) AS id FROM {table_name} GROUP BY {cols}) AS keep_rows)"
+        )).rowcount
+    if deleted:
+        print(f"[DB] Đã xóa {deleted} dòng trùng ({cols}) trong {table_name}")
+
+# Index cũ đã được thay thế: (bảng, tên index, các cột) -> xóa nếu còn trên DB đã chạy phiên bản trước
+RETIRED_INDEXES = [
+    ("interactions", "ix_interactions_user_article", ("user_id", "article_id")),  # -> uq_interactions_user_article
+]
+
+# Bảng đã tồn tại thì create_all không thêm cột / index mới -> bổ sung thủ công
+def _add_missing_columns_and_indexes():
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                col_type = column.type.compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+                print(f"[DB] Đã thêm cột {table.name}.{column.name}")
+        existing_indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            if index.unique:
+                _drop_duplicate_rows(table.name, [c.name for c in index.columns])
+            index.create(bind=engine)
+        # Sau khi đã tạo index thay thế (khóa ngoại trên MySQL luôn còn index dùng được)
+        for table_name, index_name, columns in RETIRED_INDEXES:
+            if table_name == table.name and index_name in existing_indexes:
+                Index(index_name, *[table.c[c] for c in columns]).drop(bind=engine)
+                print(f"[DB] Đã xóa index cũ {index_name}")
+
+# Tạo bảng mới (User & Interaction) + bổ sung cột / index.
+# Gọi lúc khởi động server (main.py) hoặc đầu các job, không chạy khi import -> import nhanh, --reload nhanh
+db_state = {"ready": False, "error": None}
+
+def init_db():
+    try:
+        Base.metadata.create_all(bind=engine)
+        _add_missing_columns_and_indexes()
+        db_state.update(ready=True, error=None)
+    except Exception as e:
+        db_state.update(ready=False, error=str(e))
+        raise
\ No newline at end of file
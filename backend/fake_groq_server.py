@@ -0,0 +1,68 @@
+# backend/fake_groq_server.py
+# Server giả lập API chuẩn OpenAI (Groq) để test Content Studio không cần mạng / API key.
+#   python fake_groq_server.py --port 8787 --token-delay 0.05
+#   GROQ_BASE_URL=http://localhost:8787/v1 GROQ_API_KEY=test uvicorn main:app
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+parser = argparse.ArgumentParser(description="Server giả lập /v1/chat/completions (chuẩn OpenAI)")
+parser.add_argument("--port", type=int, default=8787)
+parser.add_argument("--token-delay", type=float, default=0.05, help="Giây giữa 2 token khi stream")
+parser.add_argument("--first-token-delay", type=float, default=0.3, help="Giây chờ trước token đầu tiên")
+parser.add_argument("--tokens", type=int, default=40, help="Số token trả về (tối đa max_tokens)")
+args = parser.parse_args()
+
+app = FastAPI(title="Fake Groq")
+
+
+def fake_tokens(messages, max_tokens: int):
+    """ Lặp lại các từ trong prompt của user cho đủ số token """
+    user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+    words = f"Phản hồi giả cho: {user}".split()
+    return [words[i % len(words)] + " " for i in range(min(args.tokens, max_tokens))]
+
+
+def chunk(model: str, delta: dict, finish_reason=None):
+    return {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "fake")
+    tokens = fake_tokens(body.get("messages", []), body.get("max_tokens") or 1024)
+
+    if not body.get("stream"):
+        await asyncio.sleep(args.first_token_delay + args.token_delay * len(tokens))
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+        }
+
+    async def events():
+        sent = 0
+        try:
+            await asyncio.sleep(args.first_token_delay)
+            for token in tokens:
+                yield f"data: {json.dumps(chunk(model, {'role': 'assistant', 'content': token}), ensure_ascii=False)}\n\n"
+                sent += 1
+                await asyncio.sleep(args.token_delay)
+            yield f"data: {json.dumps(chunk(model, {}, 'stop'))}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            if sent < len(tokens):
+                print(f"[FakeGroq] Client ngắt kết nối sau {sent}/{len(tokens)} token.")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
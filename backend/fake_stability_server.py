@@ -0,0 +1,72 @@
+# backend/fake_stability_server.py
+# Server giả lập Stability AI (v1) để test / đo tải Content Studio không cần mạng / API key.
+#   python fake_stability_server.py --port 8789 --latency 2 --fail-rate 0.1
+#   STABILITY_BASE_URL=http://localhost:8789 STABILITY_API_KEY=test uvicorn main:app
+#   python bench_stability.py --requests 40     # Đo thông lượng client với server này
+import io
+import random
+import asyncio
+import argparse
+import hashlib
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from PIL import Image
+
+parser = argparse.ArgumentParser(description="Server giả lập các endpoint Stability AI v1 (trả về PNG)")
+parser.add_argument("--port", type=int, default=8789)
+parser.add_argument("--latency", type=float, default=1.0, help="Giây xử lý mỗi request")
+parser.add_argument("--fail-rate", type=float, default=0.0, help="Tỉ lệ trả 429 / 503 ngẫu nhiên (test retry)")
+parser.add_argument("--max-concurrent", type=int, default=0, help=">0: trả 429 khi quá số request đồng thời")
+parser.add_argument("--size", type=int, default=256, help="Kích thước ảnh trả về (px)")
+args = parser.parse_args()
+
+app = FastAPI(title="Fake Stability")
+state = {"active": 0, "peak": 0, "total": 0}
+
+
+def fake_png(seed: bytes, size: int) -> bytes:
+    """ Ảnh 1 màu, màu lấy theo hash nội dung request (cùng request -> cùng ảnh) """
+    color = tuple(hashlib.sha256(seed).digest()[:3])
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def handle(request: Request, size: int):
+    body = await request.body()
+    state["total"] += 1
+    if args.max_concurrent and state["active"] >= args.max_concurrent:
+        return Response(status_code=429, content=b'{"message": "too many requests"}', media_type="application/json")
+    if random.random() < args.fail_rate:
+        status = random.choice((429, 503))
+        return Response(status_code=status, content=b'{"message": "fake error"}', media_type="application/json",
+                        headers={"Retry-After": "0.2"} if status == 429 else None)
+    state["active"] += 1
+    state["peak"] = max(state["peak"], state["active"])
+    try:
+        await asyncio.sleep(args.latency)
+        return Response(content=fake_png(body, size), media_type="image/png")
+    finally:
+        state["active"] -= 1
+
+
+@app.post("/v1/generation/{engine}/text-to-image")
+async def text_to_image(engine: str, request: Request):
+    return await handle(request, args.size)
+
+@app.post("/v1/generation/{engine}/image-to-image")
+async def image_to_image(engine: str, request: Request):
+    return await handle(request, args.size)
+
+@app.post("/v1/generation/{engine}/image-to-image/upscale")
+async def upscale(engine: str, request: Request):
+    return await handle(request, args.size * 2)
+
+@app.get("/stats")
+async def stats():
+    return state
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -1,15 +1,54 @@
 # backend/main.py
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
+load_dotenv() # Đọc .env trước khi import router / service (các module đọc biến môi trường lúc import)
+
+from fastapi import FastAPI, Response
+from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
 # Import các router (Module con)
 from routers import analytics, content_studio, personalization
+from services import recommendation_index, view_buffer, sentiment_service, browser_pool, news_scheduler, keyphrase, stability_service, openai_service
+from database import init_db, db_state, dispose_async_engine, pool_status
 
 # --- KHỞI TẠO APP ---
-load_dotenv() # Đọc biến môi trường từ .env
-app = FastAPI(title="Media.C API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Tạo bảng / bổ sung cột (không chạy lúc import database.py). Lỗi DB -> server vẫn lên, /health/ready báo 503
+    try:
+        await asyncio.to_thread(init_db)
+    except Exception as e:
+        print(f"[DB] Không khởi tạo được database: {e}")
+    # Nạp chỉ mục gợi ý (trong thread nền) + chạy tác vụ tính lại IDF định kỳ
+    recommendation_index.start_background_worker()
+    # Ghi lượt xem (/log_view) xuống DB theo lô ở thread nền
+    view_buffer.view_buffer.start()
+    sentiment_service.sentiment_queue.start()
+    # Nạp model cảm xúc + client Groq ở nền: server nhận request ngay, /health/ready báo khi nạp xong
+    model_warm_up = asyncio.create_task(sentiment_service.warm_up())
+    groq_warm_up = asyncio.create_task(asyncio.to_thread(openai_service.get_groq_async_client))
+    warm_up = asyncio.create_task(browser_pool.browser_pool.warm_up())
+    # Làm mới định kỳ các từ khóa tin tức đang theo dõi (NEWS_TRACKED_KEYWORDS)
+    scheduler = asyncio.create_task(news_scheduler.run_scheduler())
+    # IDF cho trích xuất chủ đề, tính từ bảng articles
+    idf_refresher = asyncio.create_task(keyphrase.run_idf_refresher())
+    yield
+    idf_refresher.cancel()
+    scheduler.cancel()
+    warm_up.cancel()
+    groq_warm_up.cancel()
+    model_warm_up.cancel()
+    sentiment_service.sentiment_queue.stop()
+    browser_pool.browser_pool.close()
+    await stability_service.stability_client.close()
+    # Ghi nốt lượt xem còn trong bộ đệm trước khi tắt
+    await asyncio.to_thread(view_buffer.view_buffer.stop)
+    recommendation_index.stop_background_worker()
+    await dispose_async_engine()
+
+app = FastAPI(title="Media.C API", lifespan=lifespan)
 
 # --- CẤU HÌNH CORS (Cho phép Frontend gọi API) ---
 origins = ["http://localhost:3000"]
@@ -38,4 +77,25 @@ app.include_router(personalization.router)
 def read_root():
     return {"message": "Welcome to Media.C API - System Ready"}
 
+# === LIVENESS / READINESS (cho Docker / load balancer) ===
+@app.get("/health/live")
+def liveness():
+    """ Process còn sống và event loop còn phản hồi """
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    """ 200 khi DB đã khởi tạo, model cảm xúc đã nạp và chỉ mục gợi ý đã sẵn sàng; 503 trong lúc khởi động """
+    checks = {
+        "database": db_state["ready"],
+        "sentiment_model": sentiment_service.model_state["status"] == "ready",
+        "recommend_index": recommendation_index.article_index.loaded,
+    }
+    ready = all(checks.values())
+    if not ready:
+        response.status_code = 503
+    return {"status": "ready" if ready else "starting", "checks": checks,
+            "sentiment_model": sentiment_service.model_state, "database_error": db_state["error"],
+            "db_pool": pool_status()}
+
 # Lệnh chạy server: uvicorn main:app --reload
\ No newline at end of file
@@ -0,0 +1,38 @@
+# backend/precompute_recommendations.py
+# Job tính sẵn top-N gợi ý cho toàn bộ user và ghi vào bảng `recommendations`.
+# Chạy định kỳ (cron):  python precompute_recommendations.py --top-n 10
+import argparse
+import time
+
+from database import SessionLocal, UserDB, init_db
+from services.recommendation_index import (
+    article_index, user_profiles, sync_index_from_db, ensure_user_profile,
+    recommend_batch, store_recommendations
+)
+
+parser = argparse.ArgumentParser(description="Tính sẵn gợi ý cho tất cả người dùng")
+parser.add_argument("--top-n", type=int, default=3, help="Số bài gợi ý mỗi user")
+parser.add_argument("--chunk-size", type=int, default=512, help="Số user chấm điểm trong 1 phép nhân ma trận")
+args = parser.parse_args()
+
+start = time.time()
+init_db()
+db = SessionLocal()
+try:
+    print("Đang nạp chỉ mục bài báo và hồ sơ người dùng...")
+    sync_index_from_db(db)
+    user_profiles.load()
+    user_ids = [uid for (uid,) in db.query(UserDB.id).all()]
+    # Hồ sơ trên đĩa có thể cũ hơn InteractionDB: ensure_user_profile đối chiếu lại lịch sử (thêm bài đã đọc còn thiếu)
+    for uid in user_ids:
+        ensure_user_profile(db, uid)
+
+    print(f"Đang chấm điểm {len(user_ids)} user x {len(article_index.article_ids)} bài báo...")
+    results = recommend_batch(user_ids, top_n=args.top_n, chunk_size=args.chunk_size)
+    store_recommendations(db, results)
+    user_profiles.save()
+finally:
+    db.close()
+
+total = sum(len(recs) for recs in results.values())
+print(f"Đã ghi {total} gợi ý cho {len(user_ids)} user trong {time.time() - start:.1f}s!")
@@ -0,0 +1,44 @@
+# backend/rebuild_trends.py
+# Dựng lại chỉ mục xu hướng chủ đề (bảng topic_trends) từ các bài báo đã có trong DB.
+# Chỉ cần chạy 1 lần cho dữ liệu cũ; bài mới được cộng vào chỉ mục ngay lúc ingest.
+#   python rebuild_trends.py --batch-size 500
+import argparse
+import time
+from collections import defaultdict
+
+from database import SessionLocal, ArticleDB, TopicTrendDB, init_db
+from services.trending import record_article_phrases, hour_bucket
+
+parser = argparse.ArgumentParser(description="Dựng lại bảng topic_trends từ bảng articles")
+parser.add_argument("--batch-size", type=int, default=500, help="Số bài mỗi lô (mỗi lô commit 1 lần)")
+args = parser.parse_args()
+
+start = time.time()
+init_db()
+db = SessionLocal()
+last_id = 0
+done = skipped = 0
+try:
+    db.query(TopicTrendDB).delete()
+    db.commit()
+    while True:
+        batch = db.query(ArticleDB.id, ArticleDB.category, ArticleDB.title, ArticleDB.content, ArticleDB.created_at) \
+            .filter(ArticleDB.id > last_id).order_by(ArticleDB.id).limit(args.batch_size).all()
+        if not batch:
+            break
+        by_bucket = defaultdict(list)
+        for a in batch:
+            if a.created_at is None:  # Bài ingest trước khi có cột created_at: không biết giờ -> bỏ qua
+                skipped += 1
+                continue
+            by_bucket[hour_bucket(a.created_at)].append((a.category, a.title, a.content))
+        for bucket, articles in by_bucket.items():
+            record_article_phrases(db, articles, ingested_at=bucket)
+        db.commit()
+        last_id = batch[-1].id
+        done += sum(len(articles) for articles in by_bucket.values())
+        print(f"  ... {done} bài (id <= {last_id})")
+finally:
+    db.close()
+
+print(f"Đã dựng lại xu hướng từ {done} bài báo ({skipped} bài không có created_at) trong {time.time() - start:.1f}s!")
@@ -1,27 +1,32 @@
 # backend/routers/analytics.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 import os
-import requests
-from bs4 import BeautifulSoup
-import time
+import csv
+import json
+import uuid
+import asyncio
+from collections import Counter
 
-# Các thư viện AI
-from transformers import pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-
-# Các thư viện Selenium (cho URL động)
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
+# Fetch trang: HTTP thường trước, Selenium (pool) khi cần
+from services.browser_pool import browser_pool
+from services.page_fetcher import fetch_article_text, tier_stats, MIN_CONTENT_LENGTH
+from services.url_cache import url_cache, page_key, content_hash
 
 # Import Database (Để lưu tin tức vào MySQL)
-# Lưu ý: database.py nằm ở thư mục cha (backend/), nên import thẳng
-from database import SessionLocal, ArticleDB 
-from sqlalchemy.exc import IntegrityError
+from database import get_async_db
+from services.news_api_service import fetch_news, analyze_and_store_news, stored_news_query, format_stored_news
+from services.news_scheduler import tracked_keyword, last_refreshed
+from services.keyphrase import keyphrase_extractor
+from services.trending import top_rising_async
+from services.stream_clustering import cluster_csv_stream, iter_csv_chunks, MissingColumnError, DEFAULT_COLUMN, DEFAULT_CHUNK_SIZE, MAX_CHUNK_SIZE
+from services import sentiment_service
+from services.sentiment_service import analyze_sentiment, sentiment_queue
+from services.long_sentiment import analyze_documents
 
 # --- KHỞI TẠO ROUTER ---
 router = APIRouter(
@@ -29,26 +34,38 @@ router = APIRouter(
     tags=["Analytics Module 3"]
 )
 
-# --- 1. TẢI MÔ HÌNH AI (CHẠY OFFLINE) ---
-LOCAL_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "local_model")
-sentiment_analyzer = None
+# --- 1. MÔ HÌNH AI: nạp trong services/sentiment_service.py, gọi qua hàng đợi gom lô ---
+# (Không gọi trực tiếp sentiment_analyzer trong handler async để tránh chặn event loop)
 
-if os.path.exists(LOCAL_MODEL_PATH):
-    try:
-        print(f"[Analytics] Đang tải mô hình từ: {LOCAL_MODEL_PATH}...")
-        sentiment_analyzer = pipeline("sentiment-analysis", model=LOCAL_MODEL_PATH)
-        print("[Analytics] Mô hình cảm xúc đã sẵn sàng!")
-    except Exception as e:
-        print(f"!!! LỖI TẢI MODEL: {e}")
-else:
-    print(f"!!! CẢNH BÁO: Không tìm thấy thư mục '{LOCAL_MODEL_PATH}'.")
+# Model nạp nền lúc khởi động (warm-up) -> trong lúc đang nạp trả 503 kèm Retry-After
+def require_model():
+    if sentiment_service.sentiment_analyzer is None:
+        if sentiment_service.model_state["status"] in ("not_loaded", "loading"):
+            raise HTTPException(status_code=503, detail="Model cảm xúc đang được tải, vui lòng thử lại sau.",
+                                headers={"Retry-After": "5"})
+        raise HTTPException(status_code=503, detail="Model cảm xúc chưa được tải.")
 
-# --- 2. KHỞI TẠO VECTORIZERS ---
-# Dùng để trích xuất chủ đề (Cụm 2-3 từ)
-topic_vectorizer = TfidfVectorizer(ngram_range=(2, 3))
+# --- 2. TRÍCH XUẤT CHỦ ĐỀ / GOM CỤM ---
+# Chủ đề (Cụm 2-3 từ): keyphrase_extractor dùng IDF tính sẵn từ bảng articles, không fit lại mỗi request.
+# Gom cụm (Từ đơn - hiệu quả hơn cho K-Means): vectorizer tạo mới trong từng request (không dùng chung trạng thái).
+def _cluster_texts(texts, num_clusters: int):
+    # Các thư viện AI (import khi dùng lần đầu, không làm chậm khởi động server)
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.cluster import KMeans
 
-# Dùng để gom cụm (Từ đơn - hiệu quả hơn cho K-Means)
-cluster_vectorizer = TfidfVectorizer(ngram_range=(1, 1), max_features=1000)
+    cluster_vectorizer = TfidfVectorizer(ngram_range=(1, 1), max_features=1000)
+    vectorized_data = cluster_vectorizer.fit_transform(texts)
+    kmeans = KMeans(n_clusters=num_clusters, random_state=42, n_init='auto')
+    kmeans.fit(vectorized_data)
+    return kmeans.labels_
+
+def _cluster_phrases(cluster_texts):
+    """ Cụm từ đặc trưng của từng nhóm (đếm n-gram + IDF: chạy trong thread, không chặn event loop) """
+    clusters_with_phrases = {}
+    for i, texts in enumerate(cluster_texts):
+        top_phrases = keyphrase_extractor.extract(texts, top_k=10, min_score=0)
+        clusters_with_phrases[f"Nhóm {i+1}"] = [p["text"] for p in top_phrases] or ["(Dữ liệu ít)"]
+    return clusters_with_phrases
 
 # --- 3. ĐỊNH NGHĨA INPUT MODELS ---
 class TextInput(BaseModel):
@@ -60,6 +77,7 @@ class NewsInput(BaseModel):
 
 class UrlInput(BaseModel):
     url: HttpUrl
+    long_document: bool = True  # True: chấm cả bài theo cửa sổ token + từng đoạn; False: chỉ ~256 token đầu (như cũ)
 
 class ClusterInput(BaseModel):
     texts: List[str]
@@ -70,217 +88,187 @@ class ClusterInput(BaseModel):
 # === API 1: PHÂN TÍCH CẢM XÚC ===
 @router.post("/sentiment")
 async def analyze_sentiment_route(input_data: TextInput):
-    if sentiment_analyzer is None:
-        raise HTTPException(status_code=503, detail="Model cảm xúc chưa được tải.")
+    require_model()
     
     try:
-        results = sentiment_analyzer(input_data.texts, truncation=True)
-        processed_results = []
-        
-        for res in results:
-            original_label = res['label'].upper()
-            final_label = "Trung lập"
-            
-            if original_label == "POS": final_label = "Tích cực"
-            elif original_label == "NEG": final_label = "Tiêu cực"
-                
-            processed_results.append({"label": final_label, "score": res['score']})
-            
+        processed_results = await analyze_sentiment(input_data.texts)
         return {"status": "success", "results": processed_results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi phân tích cảm xúc: {e}")
 
+# === API 1c: CẢM XÚC VĂN BẢN DÀI (CỬA SỔ TOKEN CHỒNG LẤN + TỪNG ĐOẠN) ===
+@router.post("/sentiment/document")
+async def analyze_document_sentiment_route(input_data: TextInput):
+    require_model()
+
+    try:
+        return {"status": "success", "results": await analyze_documents(input_data.texts)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi phân tích cảm xúc: {e}")
+
+# === API 1b: PHÂN TÍCH CẢM XÚC HÀNG LOẠT (FILE CSV, STREAM NDJSON) ===
+MAX_BULK_BATCH_SIZE = 2048  # Mỗi lô giữ trọn trong RAM (văn bản + kết quả) trước khi trả 1 dòng NDJSON
+
+@router.post("/sentiment/bulk")
+async def bulk_sentiment_route(
+    file: UploadFile = File(...),
+    column: str = Form(DEFAULT_COLUMN),
+    batch_size: int = Form(256)
+):
+    """
+    Đọc file theo từng lô cố định, mỗi lô xong trả ngay 1 dòng NDJSON:
+    {"type": "batch", "offset", "results", "processed"} ... cuối cùng {"type": "summary", "counts"}.
+    """
+    require_model()
+    if not 1 <= batch_size <= MAX_BULK_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"batch_size phải từ 1 đến {MAX_BULK_BATCH_SIZE}.")
+
+    job_id = uuid.uuid4().hex
+    chunks = iter_csv_chunks(file.file, column, batch_size)
+    # Đọc lô đầu trước khi trả 200: sai tên cột / file hỏng -> 400 thay vì lỗi giữa stream
+    try:
+        first_batch = await asyncio.to_thread(next, chunks, None)
+    except MissingColumnError as e:
+        await file.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    except (UnicodeDecodeError, csv.Error) as e:
+        await file.close()
+        raise HTTPException(status_code=400, detail=f"File CSV không hợp lệ: {e}")
+
+    async def stream_results():
+        counts = Counter()
+        processed = 0
+        batch = first_batch
+        yield json.dumps({"type": "start", "job_id": job_id, "filename": file.filename}, ensure_ascii=False) + "\n"
+        try:
+            while batch is not None:
+                results = await analyze_sentiment(batch)
+                counts.update(r["label"] for r in results)
+                yield json.dumps({"type": "batch", "job_id": job_id, "offset": processed,
+                                  "results": results, "processed": processed + len(batch)}, ensure_ascii=False) + "\n"
+                processed += len(batch)
+                batch = await asyncio.to_thread(next, chunks, None)
+            yield json.dumps({"type": "summary", "job_id": job_id, "total": processed,
+                              "counts": dict(counts)}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "job_id": job_id, "processed": processed,
+                              "detail": f"Lỗi phân tích cảm xúc: {e}"}, ensure_ascii=False) + "\n"
+        finally:
+            await file.close()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 # === API 2: TRÍCH XUẤT CHỦ ĐỀ ===
 @router.post("/topics")
 async def extract_topics_route(input_data: TextInput):
-    full_text = " ".join(input_data.texts)
     try:
-        tfidf_matrix = topic_vectorizer.fit_transform([full_text])
-        feature_names = topic_vectorizer.get_feature_names_out()
-        scores = tfidf_matrix.toarray().flatten()
-        
-        word_scores = [{"text": phrase, "value": int(scores[i] * 1000)} 
-                       for i, phrase in enumerate(feature_names) if scores[i] > 0.01]
-        
-        topics = sorted(word_scores, key=lambda x: x['value'], reverse=True)[:50]
+        topics = await asyncio.to_thread(keyphrase_extractor.extract, input_data.texts, top_k=50)
         return {"status": "success", "topics": topics}
-    except ValueError:
-        return {"status": "success", "topics": []}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi trích xuất chủ đề: {e}")
 
 # === API 3: LẤY TIN TỨC + LƯU DB + PHÂN TÍCH ===
 @router.post("/news")
-async def analyze_news_topic_route(input_data: NewsInput):
+async def analyze_news_topic_route(input_data: NewsInput, db: AsyncSession = Depends(get_async_db)):
+    # Từ khóa đang được theo dõi -> trả thẳng kết quả đã tính sẵn trong DB
+    keyword = tracked_keyword(input_data.keyword)
+    if keyword:
+        rows = (await db.execute(stored_news_query(keyword, input_data.limit))).all()
+        stored = await asyncio.to_thread(format_stored_news, rows)
+        if stored:
+            stored["refreshed_at"] = last_refreshed.get(keyword)
+            return stored
+
     NEWS_API_KEY = os.getenv("NEWS_API_KEY")
     if not NEWS_API_KEY:
         raise HTTPException(status_code=503, detail="NEWS_API_KEY chưa được cấu hình.")
     
     print(f"[News] Đang tìm kiếm: {input_data.keyword}")
-    search_url = "https://newsapi.org/v2/everything"
-    headers = {"Authorization": f"Bearer {NEWS_API_KEY}"}
-    params = {
-        'q': input_data.keyword,
-        'language': 'vi',
-        'pageSize': input_data.limit,
-        'sortBy': 'publishedAt'
-    }
     
     try:
         # 1. Gọi NewsAPI
-        response = requests.get(search_url, headers=headers, params=params)
-        response.raise_for_status()
-        articles_raw = response.json().get("articles", [])
+        articles_raw = await asyncio.to_thread(fetch_news, input_data.keyword, input_data.limit, NEWS_API_KEY)
         
         if not articles_raw:
             return {"status": "success", "sentiments": [], "topics": [], "articles": [], "message": "Không tìm thấy bài báo nào."}
 
-        # 2. Xử lý và Lưu vào Database
-        db = SessionLocal()
-        saved_count = 0
-        articles_processed = []
-        texts_to_analyze = []
-        
-        for article in articles_raw:
-            title = article.get('title', '')
-            description = article.get('description', '')
-            url = article.get('url', '')
-            image_url = article.get('urlToImage', '')
-
-            if description and title:
-                # Chuẩn bị text để phân tích AI
-                texts_to_analyze.append(f"{title}. {description}")
-                
-                # Chuẩn bị object trả về Frontend
-                articles_processed.append({
-                    "title": title, 
-                    "description": description, 
-                    "url": url, 
-                    "sentiment_label": "Chưa rõ", 
-                    "sentiment_score": 0.0
-                })
-
-                # Lưu vào MySQL (Bỏ qua nếu trùng URL)
-                try:
-                    exists = db.query(ArticleDB).filter(ArticleDB.url == url).first()
-                    if not exists:
-                        new_article = ArticleDB(
-                            category=input_data.keyword,
-                            title=title, content=description, url=url, image_url=image_url
-                        )
-                        db.add(new_article)
-                        db.commit()
-                        saved_count += 1
-                except Exception:
-                    db.rollback()
-        
-        db.close()
-        print(f"[DB] Đã lưu {saved_count} bài báo mới vào Database.")
-
-        if not texts_to_analyze:
+        # 2. Phân tích (cảm xúc + chủ đề) rồi lưu cả kết quả vào Database
+        result = await analyze_and_store_news(input_data.keyword, articles_raw, db)
+        if result is None:
             return {"status": "success", "message": "Không có bài báo nào đủ nội dung."}
-
-        # 3. Chạy AI: Phân tích Cảm xúc
-        processed_sentiments_chart = []
-        if sentiment_analyzer:
-            sentiment_results = sentiment_analyzer(texts_to_analyze, truncation=True)
-            
-            for i, res in enumerate(sentiment_results):
-                lbl = "Trung lập"
-                if res['label'] == 'POS': lbl = "Tích cực"
-                elif res['label'] == 'NEG': lbl = "Tiêu cực"
-                
-                if i < len(articles_processed):
-                    articles_processed[i]['sentiment_label'] = lbl
-                    articles_processed[i]['sentiment_score'] = res['score']
-                
-                processed_sentiments_chart.append({"label": lbl, "score": res['score']})
-
-        # 4. Chạy AI: Trích xuất Chủ đề
-        full_text = " ".join(texts_to_analyze)
-        topics = []
-        try:
-            tfidf = topic_vectorizer.fit_transform([full_text])
-            names = topic_vectorizer.get_feature_names_out()
-            scores = tfidf.toarray().flatten()
-            words = [{"text": n, "value": int(s*1000)} for i, (n, s) in enumerate(zip(names, scores)) if s > 0.01]
-            topics = sorted(words, key=lambda x: x['value'], reverse=True)[:50]
-        except ValueError:
-            topics = []
-
-        return {
-            "status": "success",
-            "sentiments": processed_sentiments_chart,
-            "topics": topics,
-            "articles": articles_processed
-        }
+        return result
 
     except Exception as e:
         print(f"Lỗi News: {e}")
         raise HTTPException(status_code=500, detail=f"Lỗi xử lý tin tức: {e}")
 
-# === API 4: PHÂN TÍCH URL (SELENIUM) ===
+# === API 4: PHÂN TÍCH URL (HTTP / SELENIUM) ===
 @router.post("/url")
 async def analyze_url_route(input_data: UrlInput):
-    if sentiment_analyzer is None:
-        raise HTTPException(status_code=503, detail="Model chưa tải.")
+    require_model()
     
     url_str = str(input_data.url)
+    mode = "long" if input_data.long_document else "truncate"
+    cache_url = page_key(url_str, mode)  # Kết quả của 2 chế độ khác nhau -> key riêng (cả khi trả ngay / 304)
+
+    # Kết quả còn trong TTL -> trả ngay, không đụng tới mạng / model
+    entry, cached = url_cache.lookup(cache_url)
+    if cached is not None and url_cache.is_fresh(entry):
+        return dict(cached, fetch_tier="cache", cache="fresh")
+
     print(f"[URL] Đang cào dữ liệu từ: {url_str}")
     
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-
-    driver = None
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-        driver.get(url_str)
-        time.sleep(5) # Chờ load
-        html_content = driver.page_source
-        driver.quit()
-        
-        soup = BeautifulSoup(html_content, 'lxml')
-        main_content = soup.find('article') or soup.find('main') or soup.body
-        if not main_content:
+        # HTTP thường trước (kèm ETag / Last-Modified nếu đã cache), chỉ dùng Chrome (pool) khi nội dung trích được quá ngắn
+        fetched = await fetch_article_text(
+            url_str,
+            etag=entry["etag"] if cached is not None else None,
+            last_modified=entry["last_modified"] if cached is not None else None,
+        )
+        if fetched["not_modified"] and cached is not None:
+            url_cache.touch(cache_url, entry, fetched["etag"], fetched["last_modified"])
+            return dict(cached, fetch_tier=fetched["tier"], cache="revalidated")
+
+        article_text = fetched["text"]
+        if article_text is None:
              raise HTTPException(status_code=400, detail="Không tìm thấy nội dung chính.")
-             
-        for s in main_content(['script', 'style', 'nav', 'footer', 'header']): s.decompose()
-        article_text = main_content.get_text(separator='\n\n', strip=True) # Giữ đoạn văn
         
-        if len(article_text) < 50:
+        if len(article_text) < MIN_CONTENT_LENGTH:
              raise HTTPException(status_code=400, detail="Nội dung quá ngắn hoặc bị chặn.")
 
-        # Chạy AI
-        sentiment_results = sentiment_analyzer([article_text], truncation=True)
-        processed_sentiments = []
-        for res in sentiment_results:
-            lbl = "Trung lập"
-            if res['label'] == 'POS': lbl = "Tích cực"
-            elif res['label'] == 'NEG': lbl = "Tiêu cực"
-            processed_sentiments.append({"label": lbl, "score": res['score']})
+        # Nội dung giống hệt lần phân tích trước (cùng hash, cùng chế độ) -> dùng lại kết quả
+        digest = content_hash(f"{mode}\0{article_text}")
+        result = url_cache.result_for_content(digest)
+        cache_status = "content_match"
+        if result is None:
+            cache_status = "miss"
 
-        topics = []
-        try:
-            tfidf = topic_vectorizer.fit_transform([article_text])
-            names = topic_vectorizer.get_feature_names_out()
-            scores = tfidf.toarray().flatten()
-            words = [{"text": n, "value": int(s*1000)} for i, (n, s) in enumerate(zip(names, scores)) if s > 0.01]
-            topics = sorted(words, key=lambda x: x['value'], reverse=True)[:50]
-        except ValueError:
-            topics = []
-
-        return {
-            "status": "success", 
-            "sentiments": processed_sentiments, 
-            "topics": topics,
-            "content": article_text # Trả về nội dung để đọc
-        }
+            # Chạy AI
+            document = None
+            if input_data.long_document:
+                document = (await analyze_documents([article_text]))[0]
+                processed_sentiments = [{"label": document["document"]["label"], "score": document["document"]["score"]}]
+            else:
+                processed_sentiments = await analyze_sentiment([article_text])
+
+            topics = await asyncio.to_thread(keyphrase_extractor.extract, article_text, top_k=50)
+
+            result = {
+                "status": "success", 
+                "sentiments": processed_sentiments, 
+                "topics": topics,
+                "content": article_text # Trả về nội dung để đọc
+            }
+            if document is not None:
+                result.update(document_sentiment=document["document"], paragraphs=document["paragraphs"],
+                              windows=document["windows"], truncated=document["truncated"])
+
+        url_cache.store(cache_url, digest, result, fetched["tier"], fetched["etag"], fetched["last_modified"])
+        return dict(result, fetch_tier=fetched["tier"], cache=cache_status) # fetch_tier: "http" hoặc "browser"
 
+    except HTTPException:
+        raise
     except Exception as e:
-        if driver: driver.quit()
         print(f"Lỗi URL: {e}")
         raise HTTPException(status_code=500, detail=f"Lỗi xử lý URL: {e}")
 
@@ -291,28 +279,66 @@ async def cluster_analysis_route(input_data: ClusterInput):
          return {"status": "success", "clusters": {}, "message": "Không đủ dữ liệu để gom cụm."}
          
     try:
-        vectorized_data = cluster_vectorizer.fit_transform(input_data.texts)
-        kmeans = KMeans(n_clusters=input_data.num_clusters, random_state=42, n_init='auto')
-        kmeans.fit(vectorized_data)
-        labels = kmeans.labels_
+        labels = await asyncio.to_thread(_cluster_texts, input_data.texts, input_data.num_clusters)
         
-        cluster_texts = [""] * input_data.num_clusters
+        cluster_texts = [[] for _ in range(input_data.num_clusters)]
         for i, text in enumerate(input_data.texts):
-            cluster_texts[labels[i]] += text + " "
+            cluster_texts[labels[i]].append(text)
             
-        clusters_with_phrases = {}
-        for i in range(input_data.num_clusters):
-            try:
-                tfidf = topic_vectorizer.fit_transform([cluster_texts[i]])
-                names = topic_vectorizer.get_feature_names_out()
-                scores = tfidf.toarray().flatten()
-                phrase_scores = [{"text": n, "value": s} for n, s in zip(names, scores)]
-                top_phrases = sorted(phrase_scores, key=lambda x: x['value'], reverse=True)[:10]
-                clusters_with_phrases[f"Nhóm {i+1}"] = [p["text"] for p in top_phrases]
-            except ValueError:
-                clusters_with_phrases[f"Nhóm {i+1}"] = ["(Dữ liệu ít)"]
+        clusters_with_phrases = await asyncio.to_thread(_cluster_phrases, cluster_texts)
                 
         return {"status": "success", "clusters": clusters_with_phrases}
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Lỗi gom cụm: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Lỗi gom cụm: {e}")
+
+# === API 5b: GOM CỤM STREAMING (FILE CSV LỚN) ===
+@router.post("/cluster/stream")
+async def cluster_stream_route(
+    file: UploadFile = File(...),
+    num_clusters: int = Form(4),
+    column: str = Form(DEFAULT_COLUMN),
+    chunk_size: int = Form(DEFAULT_CHUNK_SIZE)
+):
+    """ Gom cụm file CSV bình luận (cột BinhLuan) theo từng chunk, bộ nhớ không phụ thuộc kích thước file """
+    if num_clusters < 2 or not num_clusters <= chunk_size <= MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=400, detail=f"num_clusters >= 2 và num_clusters <= chunk_size <= {MAX_CHUNK_SIZE}.")
+    try:
+        result = await asyncio.to_thread(cluster_csv_stream, file.file, num_clusters, column, chunk_size)
+    except MissingColumnError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"File CSV không hợp lệ: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi gom cụm: {e}")
+    finally:
+        await file.close()
+
+    if result is None:
+        return {"status": "success", "clusters": {}, "message": "Không đủ dữ liệu để gom cụm."}
+    return {"status": "success", **result}
+
+# === API 5c: CHỦ ĐỀ ĐANG TĂNG (TỪ CHỈ MỤC topic_trends, KHÔNG QUÉT LẠI NỘI DUNG BÀI) ===
+@router.get("/trending")
+async def trending_topics_route(hours: int = 24, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                category: Optional[str] = None, top_k: int = 20, min_count: int = 2,
+                                db: AsyncSession = Depends(get_async_db)):
+    """ Cửa sổ [start, end) (UTC), mặc định `hours` giờ gần nhất; so với cửa sổ liền trước cùng độ dài """
+    # DB lưu giờ UTC không kèm múi giờ
+    to_utc = lambda dt: dt.astimezone(timezone.utc).replace(tzinfo=None) if dt and dt.tzinfo else dt
+    end = to_utc(end) or datetime.utcnow()
+    start = to_utc(start) or end - timedelta(hours=hours)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Thời điểm bắt đầu phải trước thời điểm kết thúc.")
+
+    try:
+        result = await top_rising_async(db, start, end, category=category, top_k=top_k, min_count=min_count)
+        return {"status": "success", "category": category, **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi truy vấn xu hướng: {e}")
+
+# === API 6: METRICS HÀNG ĐỢI MODEL (Tinh chỉnh batch size / max wait) ===
+@router.get("/metrics/inference")
+async def inference_metrics_route():
+    return {"status": "success", "sentiment": sentiment_queue.metrics(), "sentiment_cache": sentiment_service.cache_metrics(),
+            "browser_pool": browser_pool.stats(), "keyphrase_idf": keyphrase_extractor.stats(), "url_fetch_tiers": tier_stats(), "url_cache": url_cache.stats()}
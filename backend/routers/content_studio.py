@@ -1,14 +1,19 @@
 # backend/routers/content_studio.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import StreamingResponse, Response, FileResponse
 from pydantic import BaseModel
-from typing import Optional
-import os
-import openai  # Dùng thư viện openai để gọi Groq
+from typing import Optional, Literal
+import json
+import asyncio
 from dotenv import load_dotenv
-import requests
-import io
 import base64
-from PIL import Image
+
+# Client Groq (chuẩn OpenAI): cấu hình trong services/openai_service.py (GROQ_API_KEY, GROQ_BASE_URL)
+from services.openai_service import get_groq_client, get_groq_async_client, GROQ_MODEL, chat_messages, stream_groq_text
+from services.openai_service import completion_cache_key, get_cached_completion, cache_completion, cache_metrics
+# Ảnh kết quả / ảnh upload lưu theo hash nội dung, phục vụ qua /content/images/{hash}
+from services.image_store import image_store
+from services.stability_service import stability_client, StabilityError
 
 # --- KHỞI TẠO ROUTER ---
 router = APIRouter(
@@ -16,49 +21,48 @@ router = APIRouter(
     tags=["Content Studio Module 1"]
 )
 
-# --- CẤU HÌNH API KEYS ---
+# --- CẤU HÌNH API KEYS (GROQ_*, STABILITY_* đọc trong services/) ---
 load_dotenv()
-STABILITY_API_KEY = os.getenv("STABILITY_API_KEY")
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-# Cấu hình Client cho Groq (Dùng chuẩn OpenAI)
-if GROQ_API_KEY:
-    groq_client = openai.OpenAI(
-        base_url="https://api.groq.com/openai/v1",
-        api_key=GROQ_API_KEY
-    )
-else:
-    groq_client = None
 
 # --- ĐỊNH NGHĨA INPUT ---
 class TextGenerateInput(BaseModel):
-    prompt: str; task_type: str
+    prompt: str; task_type: str; use_cache: bool = False  # Nội dung sáng tạo: mặc định luôn gọi Groq
 
 class ImageFromTextInput(BaseModel):
     prompt: str; negative_prompt: str = ""; style_preset: Optional[str] = ""
 
+# Ảnh đầu vào: base64 (data URL) hoặc hash của ảnh đã có trong kho (upload qua POST /content/images hoặc ảnh đã tạo)
 class ImageFromImageInput(BaseModel):
-    prompt: str; init_image_base64: str; strength: float = 0.6; negative_prompt: str = ""
+    prompt: str; init_image_base64: Optional[str] = None; init_image_hash: Optional[str] = None; strength: float = 0.6; negative_prompt: str = ""
 
 class ImageUpscaleInput(BaseModel):
-    init_image_base64: str
+    init_image_base64: Optional[str] = None; init_image_hash: Optional[str] = None
+
+# Kiểu trả về ảnh: base64 trong JSON (mặc định, như cũ) | url (chỉ hash + đường dẫn) | binary (bytes ảnh)
+ImageResponseFormat = Literal["base64", "url", "binary"]
 
 # === HÀM HELPER: GỌI GROQ ĐỂ XỬ LÝ VĂN BẢN (Thay thế HF) ===
-def query_groq_text(system_content, user_content):
+def query_groq_text(system_content, user_content, temperature: float = 0.7, use_cache: bool = False):
+    cache_key = completion_cache_key(system_content, user_content, GROQ_MODEL, temperature) if use_cache else None
+    if cache_key:
+        cached = get_cached_completion(cache_key)
+        if cached is not None:
+            return cached
+    groq_client = get_groq_client()
     if not groq_client:
         raise HTTPException(status_code=503, detail="GROQ_API_KEY chưa được cấu hình.")
     
     try:
         completion = groq_client.chat.completions.create(
-            model="llama-3.1-8b-instant", # <-- ĐÃ CẬP NHẬT MODEL MỚI NHẤT
-            messages=[
-                {"role": "system", "content": system_content},
-                {"role": "user", "content": user_content}
-            ],
-            temperature=0.7,
+            model=GROQ_MODEL, # <-- ĐÃ CẬP NHẬT MODEL MỚI NHẤT
+            messages=chat_messages(system_content, user_content),
+            temperature=temperature,
             max_tokens=1024,
         )
-        return completion.choices[0].message.content
+        text = completion.choices[0].message.content
+        if cache_key:
+            cache_completion(cache_key, text)
+        return text
     except Exception as e:
         print(f"Lỗi Groq: {e}")
         raise HTTPException(status_code=500, detail=f"Lỗi Groq API: {str(e)}")
@@ -71,68 +75,179 @@ def translate_prompt_to_english(prompt: str) -> str:
     except UnicodeEncodeError:
         print(f"[Translate] Đang dịch: '{prompt}'")
         system_msg = "You are a translator. Translate the following Vietnamese text to English. Return ONLY the translation, no explanation text."
-        return query_groq_text(system_msg, prompt).replace('"', '').strip()
-
-# === CÁC HÀM STABILITY AI (GIỮ NGUYÊN KHÔNG ĐỔI) ===
-def check_stability_key():
-    if not STABILITY_API_KEY: raise HTTPException(status_code=503, detail="STABILITY_API_KEY thiếu.")
-
-def stability_text_to_image(prompt: str, negative_prompt: str, style_preset: str):
-    check_stability_key(); url = "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/text-to-image"; headers = { "Authorization": f"Bearer {STABILITY_API_KEY}", "Accept": "application/json" }; text_prompts = [{"text": prompt, "weight": 1.0}];
-    if negative_prompt: text_prompts.append({"text": negative_prompt, "weight": -1.0});
-    payload = {"text_prompts": text_prompts, "cfg_scale": 7, "height": 1024, "width": 1024, "samples": 1, "steps": 30};
-    if style_preset and style_preset != "": payload["style_preset"] = style_preset;
-    response = requests.post(url, headers=headers, json=payload, timeout=30);
-    if not response.ok: raise HTTPException(status_code=response.status_code, detail=response.json())
-    return response.json()["artifacts"][0]["base64"]
-
-def stability_image_to_image(prompt: str, negative_prompt: str, init_image_bytes: bytes, strength: float):
-    check_stability_key(); url = "https://api.stability.ai/v1/generation/stable-diffusion-xl-1024-v1-0/image-to-image"; headers = {"Authorization": f"Bearer {STABILITY_API_KEY}", "Accept": "application/json"};
-    text_prompts = [{"text": prompt, "weight": 1.0}, {"text": negative_prompt, "weight": -1.0} if negative_prompt else None]; text_prompts = [p for p in text_prompts if p is not None];
-    files = {'init_image': init_image_bytes, 'text_prompts[0][text]': (None, text_prompts[0]['text']), 'text_prompts[1][text]': (None, text_prompts[1]['text']) if len(text_prompts) > 1 else None, 'text_prompts[1][weight]': (None, str(text_prompts[1]['weight'])) if len(text_prompts) > 1 else None, 'image_strength': (None, str(strength)), 'cfg_scale': (None, '7.0'), 'samples': (None, '1'), 'steps': (None, '30')}; files = {k: v for k, v in files.items() if v is not None};
-    response = requests.post(url, headers=headers, files=files, timeout=30);
-    if not response.ok: raise HTTPException(status_code=response.status_code, detail=response.json())
-    return response.json()["artifacts"][0]["base64"]
-
-def stability_upscale_image(init_image_bytes: bytes):
-    check_stability_key(); url = "https://api.stability.ai/v1/generation/esrgan-v1-x2plus/image-to-image/upscale"; headers = {"Authorization": f"Bearer {STABILITY_API_KEY}", "Accept": "application/json"}; files = { 'image': init_image_bytes }; response = requests.post(url, headers=headers, files=files, timeout=30);
-    if not response.ok: raise HTTPException(status_code=response.status_code, detail=response.json())
-    return response.json()["artifacts"][0]["base64"]
+        # Dịch: temperature 0 (kết quả ổn định) + luôn dùng cache -> sửa ảnh nhiều lần với cùng prompt không gọi lại Groq
+        return query_groq_text(system_msg, prompt.strip(), temperature=0.0, use_cache=True).replace('"', '').strip()
+
+# === CÁC HÀM STABILITY AI (Client async dùng chung: services/stability_service.py) ===
+async def stability_call(method, *args):
+    """ Gọi 1 API Stability (trả về bytes PNG), lỗi từ Stability -> HTTPException cùng status """
+    try:
+        return await method(*args)
+    except StabilityError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
 
 # --- API 1: TẠO VĂN BẢN (DÙNG GROQ) ---
-@router.post("/generate-text")
-async def generate_text(input_data: TextGenerateInput):
+def text_prompts(input_data: TextGenerateInput):
     system_prompt = "Bạn là trợ lý Marketing chuyên nghiệp tại Việt Nam. Hãy viết nội dung sáng tạo, hấp dẫn bằng tiếng Việt."
     user_prompt = f"Yêu cầu: {input_data.task_type}. {input_data.prompt}"
+    return system_prompt, user_prompt
+
+@router.post("/generate-text")
+async def generate_text(input_data: TextGenerateInput):
+    system_prompt, user_prompt = text_prompts(input_data)
     
     print("[Content] Gọi Groq (Llama 3.1)...")
-    generated_text = query_groq_text(system_prompt, user_prompt)
+    # Client đồng bộ -> chạy trong thread để không chặn event loop
+    generated_text = await asyncio.to_thread(query_groq_text, system_prompt, user_prompt, use_cache=input_data.use_cache)
     return {"status": "success", "generated_text": generated_text}
 
 
+# --- API 1b: TẠO VĂN BẢN DẠNG STREAM (SSE, TRẢ TỪNG TOKEN) ---
+def sse_event(data, event: str = None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/generate-text/stream")
+async def generate_text_stream(input_data: TextGenerateInput, request: Request):
+    """
+    Sự kiện: data {"delta"} cho từng đoạn text -> event "done" {"generated_text"} | event "error" {"detail"}.
+    Client ngắt kết nối -> dừng đọc và đóng stream tới Groq.
+    """
+    system_prompt, user_prompt = text_prompts(input_data)
+    cache_key = completion_cache_key(system_prompt, user_prompt, GROQ_MODEL) if input_data.use_cache else None
+    cached = get_cached_completion(cache_key) if cache_key else None
+    if cached is not None:
+        # Cache hit: trả nguyên văn bản trong 1 sự kiện
+        async def cached_events():
+            yield sse_event({"delta": cached})
+            yield sse_event({"generated_text": cached, "cached": True}, event="done")
+        return StreamingResponse(cached_events(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    if not get_groq_async_client():
+        raise HTTPException(status_code=503, detail="GROQ_API_KEY chưa được cấu hình.")
+
+    async def events():
+        tokens = stream_groq_text(system_prompt, user_prompt)
+        parts = []
+        try:
+            async for delta in tokens:
+                if await request.is_disconnected():
+                    print(f"[Content] Client ngắt kết nối, dừng stream Groq sau {len(parts)} đoạn.")
+                    break
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+            else:
+                if cache_key:
+                    cache_completion(cache_key, "".join(parts))
+                yield sse_event({"generated_text": "".join(parts)}, event="done")
+        except Exception as e:
+            print(f"Lỗi Groq: {e}")
+            yield sse_event({"detail": f"Lỗi Groq API: {str(e)}"}, event="error")
+        finally:
+            await tokens.aclose()
+
+    print("[Content] Stream Groq (Llama 3.1)...")
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# --- METRICS CACHE GROQ + CLIENT STABILITY ---
+@router.get("/metrics/cache")
+async def groq_cache_metrics():
+    return {"status": "success", "groq_cache": cache_metrics(), "stability": stability_client.stats()}
+
+
+# === HÀM HELPER: ẢNH ĐẦU VÀO / KẾT QUẢ ===
+def load_input_image(init_image_base64: Optional[str], init_image_hash: Optional[str]):
+    """ (bytes, hash) của ảnh đầu vào; ảnh base64 cũng được lưu vào kho để lần sau gửi hash """
+    if init_image_hash:
+        data = image_store.get(init_image_hash)
+        if data is None: raise HTTPException(status_code=404, detail="Không tìm thấy ảnh với hash này.")
+        return data, init_image_hash
+    if not init_image_base64:
+        raise HTTPException(status_code=400, detail="Thiếu ảnh đầu vào (init_image_base64 hoặc init_image_hash).")
+    data = base64.b64decode(init_image_base64.split(',')[-1])
+    return data, image_store.put(data)
+
+def image_response(image_hash: str, response_format: str, image_bytes: bytes = None):
+    headers = {"X-Image-Hash": image_hash}
+    if response_format == "binary":
+        return FileResponse(image_store.path(image_hash), media_type=image_store.media_type(image_hash), headers=headers)
+    result = {"status": "success", "image_hash": image_hash, "image_url": f"{router.prefix}/images/{image_hash}"}
+    if response_format == "base64":
+        if image_bytes is None: image_bytes = image_store.get(image_hash)
+        result["image_base64"] = base64.b64encode(image_bytes).decode("ascii")
+    return result
+
+async def upscale_stored(image_hash: str, image_bytes: bytes = None) -> str:
+    """ Upscale ảnh trong kho; ảnh đã upscale trước đó -> trả lại kết quả cũ, không gọi Stability """
+    cached = await asyncio.to_thread(image_store.get_derived, "upscale", image_hash)
+    if cached: return cached
+    if image_bytes is None: image_bytes = await asyncio.to_thread(image_store.get, image_hash)
+    result = await stability_call(stability_client.upscale, image_bytes)
+    result_hash = await asyncio.to_thread(image_store.put, result)
+    await asyncio.to_thread(image_store.set_derived, "upscale", image_hash, result_hash)
+    return result_hash
+
+
 # --- API 2, 3, 4: HÌNH ẢNH (Dịch bằng Groq -> Vẽ bằng Stability) ---
 @router.post("/generate-text-to-image")
-def generate_text_to_image(input_data: ImageFromTextInput):
+async def generate_text_to_image(input_data: ImageFromTextInput, response_format: ImageResponseFormat = "base64"):
     try:
-        en_prompt = translate_prompt_to_english(input_data.prompt)
-        img = stability_text_to_image(en_prompt, input_data.negative_prompt, input_data.style_preset)
-        return {"status": "success", "image_base64": img}
+        en_prompt = await asyncio.to_thread(translate_prompt_to_english, input_data.prompt)
+        img = await stability_call(stability_client.text_to_image, en_prompt, input_data.negative_prompt, input_data.style_preset)
+        image_hash = await asyncio.to_thread(image_store.put, img)
+        return await asyncio.to_thread(image_response, image_hash, response_format, img)
+    except HTTPException: raise
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/generate-image-to-image")
-def generate_image_to_image(input_data: ImageFromImageInput):
+async def generate_image_to_image(input_data: ImageFromImageInput, response_format: ImageResponseFormat = "base64"):
     try:
-        en_prompt = translate_prompt_to_english(input_data.prompt)
-        img_bytes = io.BytesIO(base64.b64decode(input_data.init_image_base64.split(',')[-1]))
-        img = stability_image_to_image(en_prompt, input_data.negative_prompt, img_bytes, input_data.strength)
-        return {"status": "success", "image_base64": img}
+        en_prompt = await asyncio.to_thread(translate_prompt_to_english, input_data.prompt)
+        img_bytes, _ = await asyncio.to_thread(load_input_image, input_data.init_image_base64, input_data.init_image_hash)
+        img = await stability_call(stability_client.image_to_image, en_prompt, input_data.negative_prompt, img_bytes, input_data.strength)
+        image_hash = await asyncio.to_thread(image_store.put, img)
+        return await asyncio.to_thread(image_response, image_hash, response_format, img)
+    except HTTPException: raise
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/upscale-image")
-def upscale_image(input_data: ImageUpscaleInput):
+async def upscale_image(input_data: ImageUpscaleInput, response_format: ImageResponseFormat = "base64"):
+    try:
+        img_bytes, image_hash = await asyncio.to_thread(load_input_image, input_data.init_image_base64, input_data.init_image_hash)
+        result_hash = await upscale_stored(image_hash, img_bytes)
+        return await asyncio.to_thread(image_response, result_hash, response_format)
+    except HTTPException: raise
+    except Exception as e: raise HTTPException(status_code=500, detail=str(e))
+
+
+# --- API 5: KHO ẢNH THEO HASH (Upload multipart, xem ảnh có cache, upscale theo hash) ---
+@router.post("/images")
+async def upload_image(file: UploadFile = File(...)):
+    data = await file.read()
+    if not data:
+        raise HTTPException(status_code=400, detail="File ảnh rỗng.")
+    image_hash = await asyncio.to_thread(image_store.put, data)  # Hash + ghi file: không chặn event loop
+    return {"status": "success", "image_hash": image_hash, "image_url": f"{router.prefix}/images/{image_hash}"}
+
+@router.get("/images/{image_hash}")
+def get_image(image_hash: str, request: Request):
+    if not image_store.exists(image_hash):
+        raise HTTPException(status_code=404, detail="Không tìm thấy ảnh.")
+    # Nội dung không bao giờ đổi theo hash -> cache vĩnh viễn ở trình duyệt / CDN
+    headers = {"ETag": f'"{image_hash}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") in (f'"{image_hash}"', image_hash):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(image_store.path(image_hash), media_type=image_store.media_type(image_hash), headers=headers)
+
+@router.post("/images/{image_hash}/upscale")
+async def upscale_image_by_hash(image_hash: str, response_format: ImageResponseFormat = "url"):
+    if not image_store.exists(image_hash):
+        raise HTTPException(status_code=404, detail="Không tìm thấy ảnh.")
     try:
-        img_bytes = io.BytesIO(base64.b64decode(input_data.init_image_base64.split(',')[-1]))
-        img = stability_upscale_image(img_bytes)
-        return {"status": "success", "image_base64": img}
+        result_hash = await upscale_stored(image_hash)
+        return await asyncio.to_thread(image_response, result_hash, response_format)
+    except HTTPException: raise
     except Exception as e: raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
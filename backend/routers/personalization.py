@@ -1,13 +1,19 @@
 # backend/routers/personalization.py
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List
-from sqlalchemy.orm import Session
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import linear_kernel
+from fastapi import APIRouter, HTTPException, Depends, Query
+import json
+import asyncio
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import các model DB mới
-from database import get_db, ArticleDB, UserDB, InteractionDB
+from database import get_async_db, SessionLocal, ArticleDB, UserDB, InteractionDB, RecommendationDB
+from services.recommendation_index import (
+    article_index, user_profiles, sync_index_from_db, users_without_profile, rebuild_user_profile, recommend_batch
+)
+from services.view_buffer import view_buffer
 
 router = APIRouter(
     prefix="/personalization",
@@ -22,88 +28,281 @@ class LogInteraction(BaseModel):
     user_id: int
     article_id: int
 
-# --- HÀM GỢI Ý (CONTENT-BASED) ---
-def get_content_based_recommendations(db: Session, user_id: int, top_n: int = 3):
-    # 1. Lấy lịch sử đọc từ DB (thay vì RAM)
-    interactions = db.query(InteractionDB).filter(InteractionDB.user_id == user_id).all()
-    viewed_ids = [i.article_id for i in interactions]
+class BatchRecommendInput(BaseModel):
+    user_ids: List[int] = Field(..., max_length=1000)
+    top_n: int = Field(3, ge=1, le=50)
+
+# --- OUTPUT MODELS (DANH SÁCH: KHÔNG KÈM NỘI DUNG ĐẦY ĐỦ, CHỈ ĐOẠN TÓM TẮT) ---
+class ArticleSummary(BaseModel):
+    id: int
+    category: Optional[str] = None
+    title: Optional[str] = None
+    summary: Optional[str] = None # SUMMARY_CHARS ký tự đầu của content, cắt ngay trong SQL
+    url: Optional[str] = None
+    image_url: Optional[str] = None
+    sentiment_label: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    topics: list = []
+
+class HistoryItem(ArticleSummary):
+    viewed_at: Optional[datetime] = None
 
-    if not viewed_ids: return []
+class ArticlePage(BaseModel):
+    status: str = "success"
+    articles: List[ArticleSummary]
+    next_cursor: Optional[str] = None # Truyền lại vào ?cursor= để lấy trang tiếp theo; None = hết
 
-    # 2. Lấy danh sách bài báo
-    all_articles_db = db.query(ArticleDB).all()
-    all_articles = [{"id": a.id, "title": a.title, "content": a.content, "category": a.category, "url": a.url} for a in all_articles_db]
+class HistoryPage(BaseModel):
+    status: str = "success"
+    history: List[HistoryItem]
+    next_cursor: Optional[str] = None
 
-    # 3. Tách bài đã xem và chưa xem
-    viewed_articles = [art for art in all_articles if art["id"] in viewed_ids]
-    candidate_articles = [art for art in all_articles if art["id"] not in viewed_ids]
-    
-    if not candidate_articles: return []
+SUMMARY_CHARS = 300
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-    # 4. Tạo User Profile (Gộp nội dung đã đọc)
-    user_profile_text = " ".join([f"{art['title']} {art['content']}" for art in viewed_articles])
-    candidate_texts = [f"{art['title']} {art['content']}" for art in candidate_articles]
+# --- HÀM PHỤ: ĐỊNH DẠNG BÀI BÁO ---
+def _article_with_analysis(art: ArticleDB):
+    """ Bài báo kèm kết quả phân tích đã lưu lúc ingest (không gọi model) """
+    return {
+        "id": art.id, "category": art.category, "title": art.title, "content": art.content,
+        "url": art.url, "image_url": art.image_url,
+        "sentiment_label": art.sentiment_label, "sentiment_score": art.sentiment_score,
+        "topics": json.loads(art.topics) if art.topics else [],
+    }
 
-    # 5. Tính TF-IDF & Cosine
+# Chỉ SELECT các cột cần cho danh sách (không kéo cả cột content TEXT về)
+SUMMARY_COLUMNS = (
+    ArticleDB.id, ArticleDB.category, ArticleDB.title,
+    func.substr(ArticleDB.content, 1, SUMMARY_CHARS).label("summary"),
+    ArticleDB.url, ArticleDB.image_url,
+    ArticleDB.sentiment_label, ArticleDB.sentiment_score, ArticleDB.topics,
+)
+
+def _summary_fields(row):
+    fields = dict(row._mapping)
+    fields["topics"] = json.loads(fields["topics"]) if fields.get("topics") else []
+    return fields
+
+def _parse_history_cursor(cursor: str):
+    """ Cursor lịch sử = "<timestamp ISO>|<interaction id>" (bản ghi cuối của trang trước) """
     try:
-        tfidf = TfidfVectorizer(stop_words=None)
-        all_texts = [user_profile_text] + candidate_texts
-        tfidf_matrix = tfidf.fit_transform(all_texts)
-        cosine_sim = linear_kernel(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
-        
-        related_indices = cosine_sim.argsort()[:-top_n-1:-1]
-        recommendations = []
-        for i in related_indices:
-            if cosine_sim[i] > 0.05:
-                rec = candidate_articles[i]
-                rec["score"] = float(cosine_sim[i])
-                recommendations.append(rec)
-        return recommendations
-    except ValueError: return []
+        ts, interaction_id = cursor.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(interaction_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ.")
+
+def _to_recommendation(art: ArticleDB, score: float):
+    return {"id": art.id, "title": art.title, "content": art.content, "category": art.category, "url": art.url, "score": score}
+
+# --- HÀM GỢI Ý (CONTENT-BASED) ---
+# Truy vấn DB: await trên session async. Việc nặng CPU (build / đồng bộ chỉ mục TF-IDF, dựng hồ sơ,
+# nhân ma trận) chạy trong thread qua asyncio.to_thread, chỉ mục dùng session sync của riêng nó.
+def _sync_index():
+    db = SessionLocal()
+    try:
+        return sync_index_from_db(db)
+    finally:
+        db.close()
+
+def _rebuild_profiles(histories):
+    # Lịch sử có bài chỉ mục chưa có -> đồng bộ chỉ mục rồi dựng lại (không lưu hồ sơ thiếu bài)
+    behind = {uid: history for uid, history in histories.items() if not rebuild_user_profile(uid, history)}
+    if behind:
+        _sync_index()
+        for uid, history in behind.items():
+            rebuild_user_profile(uid, history)
+
+async def _prepare_profiles(db: AsyncSession, user_ids):
+    """ Nạp chỉ mục nếu chưa có, dựng hồ sơ cho user chưa có hồ sơ (1 truy vấn lịch sử cho cả nhóm) """
+    if not article_index.loaded:
+        await asyncio.to_thread(_sync_index)
+    missing = await asyncio.to_thread(users_without_profile, user_ids)
+    if not missing:
+        return
+    result = await db.execute(
+        select(InteractionDB.user_id, InteractionDB.article_id, InteractionDB.timestamp)
+        .where(InteractionDB.user_id.in_(missing)).order_by(InteractionDB.timestamp))
+    histories = {uid: [] for uid in missing}
+    for uid, article_id, ts in result.all():
+        histories[uid].append((article_id, ts))
+    await asyncio.to_thread(_rebuild_profiles, histories)
+
+def _score_user(user_id: int, top_n: int):
+    profile_vec = user_profiles.vector(user_id)
+    if profile_vec is None:
+        return []
+    return article_index.top_n(profile_vec, exclude_ids=user_profiles.viewed(user_id), top_n=top_n)
+
+def _add_view(user_id: int, article_id: int):
+    """ Cộng bài vào hồ sơ: O(số term của bài), không đụng tới lịch sử """
+    if not user_profiles.has(user_id):
+        return  # Hồ sơ chưa dựng được -> lần sau dựng từ lịch sử (lượt xem này sẽ nằm trong InteractionDB)
+    if not user_profiles.add_view(user_id, article_id):
+        # Bài chưa có trong chỉ mục (vừa được thêm từ nơi khác) -> đồng bộ rồi thử lại
+        _sync_index()
+        user_profiles.add_view(user_id, article_id)
+
+# User đã biết tồn tại (đăng nhập / đã kiểm tra 1 lần): /log_view không phải SELECT lại mỗi lượt xem
+_known_users = set()
+
+async def _user_exists(db: AsyncSession, user_id: int) -> bool:
+    if user_id not in _known_users:
+        if await db.scalar(select(UserDB.id).where(UserDB.id == user_id)) is None:
+            return False
+        _known_users.add(user_id)
+    return True
+
+def _article_indexed(article_id: int) -> bool:
+    """ Bài có trong chỉ mục (tra trong RAM). Chỉ đồng bộ chỉ mục khi id mới hơn bài cuối đã index. """
+    if article_id in article_index.id_to_row:
+        return True
+    if article_id <= article_index.last_article_id():
+        return False  # Không tồn tại hoặc đã bị xóa
+    _sync_index()
+    return article_id in article_index.id_to_row
+
+async def _load_articles(db: AsyncSession, article_ids):
+    if not article_ids:
+        return {}
+    result = await db.execute(select(ArticleDB).where(ArticleDB.id.in_(article_ids)))
+    return {a.id: a for a in result.scalars()}
+
+async def get_content_based_recommendations(db: AsyncSession, user_id: int, top_n: int = 3):
+    # 1. Chỉ mục TF-IDF được build sẵn (lưu trên đĩa), không fit lại mỗi request
+    # 2. Vector hồ sơ người dùng đã lưu sẵn (cập nhật ở /log_view), không quét lịch sử
+    await _prepare_profiles(db, [user_id])
+
+    # 3. 1 phép nhân sparse với ma trận bài báo, loại bài đã xem
+    top = await asyncio.to_thread(_score_user, user_id, top_n)
+    if not top: return []
+
+    # 4. Chỉ lấy thông tin của top-N bài từ DB
+    articles = await _load_articles(db, [aid for aid, _ in top])
+    return [_to_recommendation(articles[aid], score) for aid, score in top if aid in articles]
+
+async def get_precomputed_recommendations(db: AsyncSession, user_id: int):
+    """
+    Gợi ý đã tính sẵn bởi job precompute_recommendations.py (1 truy vấn theo user_id).
+    Job có thể chấm điểm trên hồ sơ cũ hơn DB -> loại bài user đã đọc ngay trong truy vấn
+    (NOT EXISTS dò theo unique index (user_id, article_id) của interactions).
+    """
+    already_read = select(InteractionDB.id).where(
+        InteractionDB.user_id == RecommendationDB.user_id,
+        InteractionDB.article_id == RecommendationDB.article_id)
+    result = await db.execute(
+        select(RecommendationDB.score, ArticleDB)
+        .join(ArticleDB, RecommendationDB.article_id == ArticleDB.id)
+        .where(RecommendationDB.user_id == user_id, ~already_read.exists())
+        .order_by(RecommendationDB.rank))
+    return [_to_recommendation(art, score) for score, art in result.all()]
 
 # --- API ENDPOINTS ---
+# DB đi qua engine async (database.get_async_db): handler chờ DB mà không chặn event loop.
+# Lưu ý: AsyncSession.run_sync chạy ngay trên event loop -> không dùng cho việc nặng CPU
 
 @router.post("/login")
-async def login_user(user_input: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_input: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """ Tạo user mới hoặc lấy user cũ (Giả lập đăng nhập) """
-    user = db.query(UserDB).filter(UserDB.username == user_input.username).first()
+    user = await db.scalar(select(UserDB).where(UserDB.username == user_input.username))
     if not user:
         user = UserDB(username=user_input.username)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+    _known_users.add(user.id)
     return {"status": "success", "user_id": user.id, "username": user.username}
 
-@router.get("/articles")
-async def get_articles(db: Session = Depends(get_db)):
-    """ Lấy danh sách bài báo """
-    articles = db.query(ArticleDB).order_by(ArticleDB.id.desc()).limit(50).all()
-    return {"status": "success", "articles": articles}
+@router.get("/articles", response_model=ArticlePage)
+async def get_articles(cursor: Optional[int] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                       db: AsyncSession = Depends(get_async_db)):
+    """ Danh sách bài báo mới nhất (tóm tắt), phân trang keyset: cursor = id bài cuối của trang trước """
+    query = select(*SUMMARY_COLUMNS)
+    if cursor is not None:
+        query = query.where(ArticleDB.id < cursor) # Đi theo khóa chính, không OFFSET -> trang sau nhanh như trang đầu
+    rows = (await db.execute(query.order_by(ArticleDB.id.desc()).limit(limit))).all()
+    next_cursor = str(rows[-1].id) if len(rows) == limit else None
+    return {"articles": [_summary_fields(r) for r in rows], "next_cursor": next_cursor}
+
+@router.get("/articles/{article_id}")
+async def get_article(article_id: int, db: AsyncSession = Depends(get_async_db)):
+    """ Chi tiết 1 bài báo (nội dung đầy đủ, dùng khi mở bài để đọc) """
+    art = await db.get(ArticleDB, article_id)
+    if not art:
+        raise HTTPException(status_code=404, detail="Không tìm thấy bài báo.")
+    return {"status": "success", "article": _article_with_analysis(art)}
 
 @router.post("/log_view")
-async def log_view(data: LogInteraction, db: Session = Depends(get_db)):
-    """ Lưu hành động đọc vào DB """
-    # Kiểm tra xem đã đọc bài này chưa để tránh trùng lặp (hoặc có thể cho phép lưu nhiều lần để tính tần suất)
-    existing = db.query(InteractionDB).filter(InteractionDB.user_id == data.user_id, InteractionDB.article_id == data.article_id).first()
-    if not existing:
-        interaction = InteractionDB(user_id=data.user_id, article_id=data.article_id)
-        db.add(interaction)
-        db.commit()
+async def log_view(data: LogInteraction, db: AsyncSession = Depends(get_async_db)):
+    """ Ghi nhận hành động đọc: vào bộ đệm trong RAM, thread nền ghi xuống DB theo lô (services/view_buffer.py) """
+    # Kiểm tra trong RAM (user đã biết, chỉ mục bài báo), không SELECT mỗi lượt xem.
+    # Dòng lọt qua mà vẫn sai khóa ngoại sẽ bị bộ đệm loại khi ghi lô (services/view_buffer.py)
+    if not await _user_exists(db, data.user_id):
+        raise HTTPException(status_code=404, detail="Không tìm thấy người dùng.")
+    if not article_index.loaded:
+        await asyncio.to_thread(_sync_index)
+    if not await asyncio.to_thread(_article_indexed, data.article_id):
+        raise HTTPException(status_code=404, detail="Không tìm thấy bài báo.")
+    view_buffer.add(data.user_id, data.article_id)
+
+    # Cập nhật vector hồ sơ (dựng từ lịch sử nếu user chưa có hồ sơ)
+    await _prepare_profiles(db, [data.user_id])
+    await asyncio.to_thread(_add_view, data.user_id, data.article_id)
     return {"status": "success"}
 
-@router.get("/history/{user_id}")
-async def get_history(user_id: int, db: Session = Depends(get_db)):
-    """ Lấy lịch sử đọc từ DB """
-    interactions = db.query(InteractionDB).filter(InteractionDB.user_id == user_id).order_by(InteractionDB.timestamp.desc()).all()
-    # Lấy thông tin bài báo chi tiết
-    history_articles = []
-    for i in interactions:
-        if i.article: # Kiểm tra bài báo còn tồn tại không
-            history_articles.append(i.article)
-    return {"status": "success", "history": history_articles}
+@router.get("/metrics/views")
+async def view_buffer_metrics():
+    """ Bộ đệm ghi lượt xem: số lượt đang chờ, số lô đã ghi, lỗi gần nhất """
+    return {"status": "success", "view_buffer": view_buffer.metrics()}
+
+@router.get("/history/{user_id}", response_model=HistoryPage)
+async def get_history(user_id: int, cursor: Optional[str] = None,
+                      limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_async_db)):
+    """ Lịch sử đọc (mới nhất trước): 1 truy vấn JOIN bài báo thay vì 1 SELECT / tương tác """
+    # INNER JOIN: bài báo đã bị xóa thì tự bỏ qua; index (user_id, timestamp) phục vụ lọc + sắp xếp
+    query = select(InteractionDB.id.label("interaction_id"), InteractionDB.timestamp.label("viewed_at"), *SUMMARY_COLUMNS) \
+        .join(ArticleDB, InteractionDB.article_id == ArticleDB.id) \
+        .where(InteractionDB.user_id == user_id)
+    if cursor:
+        ts, interaction_id = _parse_history_cursor(cursor)
+        query = query.where(or_(InteractionDB.timestamp < ts,
+                                and_(InteractionDB.timestamp == ts, InteractionDB.id < interaction_id)))
+    rows = (await db.execute(query.order_by(InteractionDB.timestamp.desc(), InteractionDB.id.desc()).limit(limit))).all()
+    history = [_summary_fields(r) for r in rows]
+
+    next_cursor = None
+    if len(rows) == limit and rows[-1].viewed_at is not None:
+        next_cursor = f"{rows[-1].viewed_at.isoformat()}|{rows[-1].interaction_id}"
+
+    # Trang đầu: thêm các lượt xem còn trong bộ đệm (chưa ghi xuống DB) lên trước
+    pending = view_buffer.pending_for(user_id) if not cursor else []
+    if pending:
+        seen = {h["id"] for h in history}
+        pending = [(aid, ts) for aid, ts in pending if aid not in seen]
+        articles = {}
+        if pending:
+            result = await db.execute(select(*SUMMARY_COLUMNS).where(ArticleDB.id.in_([aid for aid, _ in pending])))
+            articles = {r.id: r for r in result.all()}
+        history = [dict(_summary_fields(articles[aid]), viewed_at=ts) for aid, ts in pending if aid in articles] + history
+    return {"history": history, "next_cursor": next_cursor}
 
 @router.get("/recommend/{user_id}")
-async def get_recommendations_api(user_id: int, db: Session = Depends(get_db)):
-    """ Lấy gợi ý cho User ID cụ thể """
-    recs = get_content_based_recommendations(db, user_id)
-    return {"status": "success", "recommendations": recs}
\ No newline at end of file
+async def get_recommendations_api(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    """ Lấy gợi ý cho User ID cụ thể (ưu tiên kết quả tính sẵn) """
+    # Lượt xem mới chưa ghi xuống DB -> kết quả tính sẵn đã cũ (sẽ bị xóa khi ghi), tính trực tiếp từ hồ sơ
+    recs = await get_precomputed_recommendations(db, user_id) if not view_buffer.has_pending(user_id) else []
+    if not recs:
+        recs = await get_content_based_recommendations(db, user_id)
+    return {"status": "success", "recommendations": recs}
+
+@router.post("/recommend/batch")
+async def get_batch_recommendations_api(input_data: BatchRecommendInput, db: AsyncSession = Depends(get_async_db)):
+    """ Gợi ý cho nhiều user trong 1 lần nhân ma trận (dùng cho fan-out trang chủ) """
+    await _prepare_profiles(db, input_data.user_ids)
+
+    results = await asyncio.to_thread(recommend_batch, input_data.user_ids, top_n=input_data.top_n)
+    articles = await _load_articles(db, {aid for recs in results.values() for aid, _ in recs})
+    recommendations = {
+        uid: [_to_recommendation(articles[aid], score) for aid, score in recs if aid in articles]
+        for uid, recs in results.items()
+    }
+    return {"status": "success", "recommendations": recommendations}
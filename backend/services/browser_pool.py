@@ -0,0 +1,149 @@
+# backend/services/browser_pool.py
+import os
+import asyncio
+import threading
+
+# --- CẤU HÌNH ---
+POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))            # Số Chrome chạy song song tối đa
+MAX_PAGES_PER_DRIVER = int(os.getenv("BROWSER_MAX_PAGES", "50"))  # Tái tạo driver sau N trang (tránh rò bộ nhớ)
+READY_TIMEOUT = float(os.getenv("BROWSER_READY_TIMEOUT", "10"))   # Giây chờ trang sẵn sàng tối đa
+READY_SELECTOR = os.getenv("BROWSER_READY_SELECTOR", "")          # VD: "article, main" -> chờ thêm phần tử này xuất hiện
+PREWARM = int(os.getenv("BROWSER_PREWARM", "0"))                   # Số driver khởi động sẵn lúc server start
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+
+
+# === POOL CHROME HEADLESS DÙNG LẠI GIỮA CÁC REQUEST ===
+class BrowserPool:
+    """
+    Giữ tối đa `size` phiên WebDriver đã khởi động sẵn.
+    - Chờ driver rảnh bằng asyncio.Semaphore (không chặn các endpoint khác).
+    - Lệnh Selenium (blocking) chạy trong thread pool.
+    - Driver bị tái tạo sau `max_pages` trang hoặc khi gặp lỗi (crash).
+    """
+
+    def __init__(self, size: int = POOL_SIZE, max_pages: int = MAX_PAGES_PER_DRIVER,
+                 ready_timeout: float = READY_TIMEOUT, ready_selector: str = READY_SELECTOR):
+        self.size = size
+        self.max_pages = max_pages
+        self.ready_timeout = ready_timeout
+        self.ready_selector = ready_selector
+        self._semaphore = asyncio.Semaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._driver_path = None
+
+    # --- Tạo / hủy driver (blocking, gọi trong thread) ---
+    def _create_driver(self):
+        # Selenium / webdriver_manager chỉ import khi cần mở Chrome lần đầu (không làm chậm khởi động server)
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = ChromeDriverManager().install()  # Chỉ tải / kiểm tra 1 lần
+        chrome_options = Options()
+        chrome_options.add_argument("--headless")
+        chrome_options.add_argument("--no-sandbox")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        chrome_options.add_argument(f"user-agent={USER_AGENT}")
+        driver = webdriver.Chrome(service=Service(self._driver_path), options=chrome_options)
+        driver.set_page_load_timeout(self.ready_timeout + 20)
+        return _PooledDriver(driver)
+
+    @staticmethod
+    def _quit(slot):
+        try:
+            slot.driver.quit()
+        except Exception:
+            pass
+
+    def _page_ready(self, driver):
+        from selenium.webdriver.common.by import By
+
+        if driver.execute_script("return document.readyState") != "complete":
+            return False
+        return not self.ready_selector or bool(driver.find_elements(By.CSS_SELECTOR, self.ready_selector))
+
+    def _load(self, slot, url: str) -> str:
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        slot.driver.get(url)
+        try:
+            WebDriverWait(slot.driver, self.ready_timeout, poll_frequency=0.2).until(self._page_ready)
+        except TimeoutException:
+            print(f"[BrowserPool] Hết {self.ready_timeout}s chờ trang sẵn sàng, lấy nội dung hiện có: {url}")
+        return slot.driver.page_source
+
+    def _discard(self, slot):
+        """ Đóng driver ở thread riêng, không chờ (gọi được cả khi request đang bị hủy) """
+        threading.Thread(target=self._quit, args=(slot,), name="browser-quit", daemon=True).start()
+
+    def _release(self, slot):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(slot)
+                return
+        self._discard(slot)
+
+    async def _acquire(self):
+        with self._lock:
+            slot = self._idle.pop() if self._idle else None
+        if slot is not None:
+            return slot
+        creating = asyncio.ensure_future(asyncio.to_thread(self._create_driver))
+        try:
+            return await asyncio.shield(creating)
+        except asyncio.CancelledError:
+            # Request bị hủy lúc Chrome đang khởi động -> driver tạo xong vẫn được đưa vào pool, không bị rò
+            creating.add_done_callback(lambda t: None if t.cancelled() or t.exception() else self._release(t.result()))
+            raise
+
+    # --- API ---
+    async def fetch_html(self, url: str) -> str:
+        async with self._semaphore:
+            slot = await self._acquire()
+            try:
+                html = await asyncio.to_thread(self._load, slot, url)
+            except BaseException:
+                # Driver hỏng / crash, hoặc request bị hủy (client ngắt kết nối, timeout) trong khi thread
+                # vẫn đang dùng driver -> bỏ hẳn driver (không trả về pool), lần sau tạo mới
+                self._discard(slot)
+                raise
+            slot.pages += 1
+            if slot.pages >= self.max_pages:
+                self._discard(slot)
+            else:
+                self._release(slot)
+            return html
+
+    async def warm_up(self, count: int = PREWARM):
+        """ Khởi động sẵn driver để request đầu tiên không phải chờ Chrome """
+        for _ in range(min(count, self.size)):
+            try:
+                slot = await asyncio.to_thread(self._create_driver)
+            except Exception as e:
+                print(f"[BrowserPool] Không khởi động được Chrome: {e}")
+                return
+            self._release(slot)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for slot in idle:
+            self._quit(slot)
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "max_pages": self.max_pages, "ready_timeout": self.ready_timeout}
+
+
+browser_pool = BrowserPool()
@@ -0,0 +1,88 @@
+# backend/services/image_store.py
+import os
+import re
+import hashlib
+import tempfile
+
+# --- CẤU HÌNH ---
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(os.path.dirname(__file__), "..", "image_data"))
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Nhận dạng định dạng theo byte đầu file
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def media_type(head: bytes) -> str:
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+# === KHO ẢNH ĐỊA CHỈ HÓA THEO NỘI DUNG (SHA-256) ===
+class ImageStore:
+    """
+    Ảnh lưu 1 lần theo hash nội dung: <dir>/<2 ký tự đầu>/<hash>.
+    Ảnh trùng không ghi lại; kết quả biến đổi (vd. upscale) được ghi nhớ theo hash ảnh gốc.
+    """
+
+    def __init__(self, root: str = IMAGE_STORE_DIR):
+        self.root = os.path.abspath(root)
+
+    def valid_hash(self, image_hash: str) -> bool:
+        return bool(image_hash and _HASH_PATTERN.match(image_hash))
+
+    def path(self, image_hash: str) -> str:
+        return os.path.join(self.root, image_hash[:2], image_hash)
+
+    def _write_atomic(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def put(self, data: bytes) -> str:
+        image_hash = hashlib.sha256(data).hexdigest()
+        path = self.path(image_hash)
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+        return image_hash
+
+    def exists(self, image_hash: str) -> bool:
+        return self.valid_hash(image_hash) and os.path.exists(self.path(image_hash))
+
+    def get(self, image_hash: str):
+        """ bytes của ảnh, None nếu không có """
+        if not self.exists(image_hash):
+            return None
+        with open(self.path(image_hash), "rb") as f:
+            return f.read()
+
+    def media_type(self, image_hash: str) -> str:
+        with open(self.path(image_hash), "rb") as f:
+            return media_type(f.read(16))
+
+    def _derived_path(self, kind: str, image_hash: str) -> str:
+        return os.path.join(self.root, "derived", kind, image_hash)
+
+    def get_derived(self, kind: str, image_hash: str):
+        """ Hash ảnh kết quả đã lưu cho (phép biến đổi, ảnh gốc), None nếu chưa có """
+        path = self._derived_path(kind, image_hash)
+        if not self.valid_hash(image_hash) or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            result_hash = f.read().strip()
+        return result_hash if self.exists(result_hash) else None
+
+    def set_derived(self, kind: str, image_hash: str, result_hash: str):
+        self._write_atomic(self._derived_path(kind, image_hash), result_hash.encode())
+
+
+image_store = ImageStore()
@@ -0,0 +1,80 @@
+# backend/services/ingestion.py
+from sqlalchemy import insert, update, bindparam, or_
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+
+from database import SessionLocal, ArticleDB
+from services.recommendation_index import article_index
+from services.trending import record_article_phrases
+
+ANALYSIS_FIELDS = ("sentiment_label", "sentiment_score", "sentiment_model", "topics", "analyzed_at")
+ARTICLE_FIELDS = ("category", "title", "content", "url", "image_url") + ANALYSIS_FIELDS
+
+
+def _insert_ignore(dialect_name: str):
+    """ INSERT bỏ qua dòng trùng khóa unique (cột url), theo từng loại DB """
+    if dialect_name == "mysql":
+        return mysql.insert(ArticleDB).prefix_with("IGNORE")
+    if dialect_name == "sqlite":
+        return sqlite.insert(ArticleDB).on_conflict_do_nothing(index_elements=["url"])
+    if dialect_name == "postgresql":
+        return postgresql.insert(ArticleDB).on_conflict_do_nothing(index_elements=["url"])
+    return insert(ArticleDB)
+
+
+# === GHI BÀI BÁO THEO LÔ (DÙNG CHUNG CHO MỌI NGUỒN TIN) ===
+def bulk_ingest_articles(rows, db=None):
+    """
+    rows: list dict {category, title, content, url, image_url} (+ các cột phân tích nếu đã phân tích lúc ingest).
+    - Bỏ trùng URL ngay trong bộ nhớ.
+    - 1 transaction: 1 SELECT các URL đã có + 1 INSERT IGNORE cho cả lô + 1 SELECT lấy id bài mới.
+    - Bài đã có nhưng chưa phân tích (hoặc phân tích bằng model cũ): cập nhật cột phân tích, cùng transaction.
+    - Bài mới được nối vào chỉ mục gợi ý và chỉ mục xu hướng chủ đề (topic_trends).
+    Trả về {"inserted", "skipped", "duplicates_in_batch", "articles": [(id, title, content) của bài mới]}.
+    """
+    unique = {}
+    for row in rows:
+        url = row.get("url")
+        if url and url not in unique:
+            unique[url] = {f: row.get(f) for f in ARTICLE_FIELDS}
+    duplicates_in_batch = len(rows) - len(unique)
+    if not unique:
+        return {"inserted": 0, "skipped": len(rows), "duplicates_in_batch": duplicates_in_batch, "articles": []}
+
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        urls = list(unique.keys())
+        existing = {u for (u,) in db.query(ArticleDB.url).filter(ArticleDB.url.in_(urls)).all()}
+        new_rows = [r for u, r in unique.items() if u not in existing]
+        analyzed_existing = [r for u, r in unique.items() if u in existing and r.get("analyzed_at")]
+        if analyzed_existing:
+            table = ArticleDB.__table__
+            stale = or_(table.c.sentiment_model.is_(None), table.c.sentiment_model != bindparam("b_sentiment_model"))
+            db.execute(
+                update(table).where(table.c.url == bindparam("b_url"), stale)
+                .values({f: bindparam(f"b_{f}") for f in ANALYSIS_FIELDS}),
+                [{"b_url": r["url"], **{f"b_{f}": r[f] for f in ANALYSIS_FIELDS}} for r in analyzed_existing]
+            )
+        new_articles = []
+        if new_rows:
+            db.execute(_insert_ignore(db.get_bind().dialect.name), new_rows)
+            inserted_rows = db.query(ArticleDB.id, ArticleDB.title, ArticleDB.content, ArticleDB.category) \
+                .filter(ArticleDB.url.in_([r["url"] for r in new_rows])).all()
+            new_articles = [(a.id, a.title, a.content) for a in inserted_rows]
+            # Chỉ mục xu hướng chủ đề: cộng số đếm bucket giờ hiện tại, cùng transaction
+            record_article_phrases(db, [(a.category, a.title, a.content) for a in inserted_rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if own_session:
+            db.close()
+
+    # Nối bài mới vào chỉ mục gợi ý (IDF sẽ được tính lại ở background)
+    if new_articles and article_index.loaded:
+        article_index.add_articles(new_articles)
+
+    inserted = len(new_articles)
+    return {"inserted": inserted, "skipped": len(rows) - inserted, "articles": new_articles,
+            "duplicates_in_batch": duplicates_in_batch}
@@ -0,0 +1,101 @@
+# backend/services/keyphrase.py
+import os
+import math
+import asyncio
+from collections import Counter
+
+from services.recommendation_index import tokenize
+
+# --- CẤU HÌNH ---
+NGRAM_RANGE = (2, 3)                                                   # Cụm 2-3 từ (giống topic_vectorizer cũ)
+MAX_CORPUS_PHRASES = int(os.getenv("KEYPHRASE_MAX_PHRASES", "300000"))   # Giới hạn số cụm từ giữ IDF
+REFRESH_INTERVAL = int(os.getenv("KEYPHRASE_REFRESH_INTERVAL", "3600"))  # Giây giữa 2 lần tính lại IDF từ DB
+
+
+def iter_phrases(text: str, ngram_range=NGRAM_RANGE):
+    """ Sinh cụm n-từ giống analyzer 'word' của sklearn (lowercase + token_pattern mặc định) """
+    tokens = tokenize(text)
+    lo, hi = ngram_range
+    for n in range(lo, hi + 1):
+        for i in range(len(tokens) - n + 1):
+            yield " ".join(tokens[i:i + n])
+
+
+# === TRÍCH XUẤT CỤM TỪ KHÓA (THAY CHO topic_vectorizer DÙNG CHUNG) ===
+class KeyphraseExtractor:
+    """
+    Chấm điểm cụm 2-3 từ = TF (trong văn bản của request) x IDF (tính sẵn trên bảng articles).
+    IDF là 1 snapshot chỉ đọc, được thay nguyên khối khi làm mới -> mỗi request chỉ dùng
+    biến cục bộ, không có trạng thái dùng chung nào bị ghi, chạy song song an toàn.
+    """
+
+    def __init__(self):
+        self._snapshot = ({}, 1.0, 0)  # (idf theo cụm từ, idf cho cụm từ chưa gặp, số tài liệu)
+
+    def build_idf(self, texts):
+        """ texts: iterable văn bản của corpus. Trả về snapshot mới (không gán). """
+        df = Counter()
+        n_docs = 0
+        for text in texts:
+            n_docs += 1
+            df.update(set(iter_phrases(text)))
+            if len(df) > 2 * MAX_CORPUS_PHRASES:
+                df = Counter(dict(df.most_common(MAX_CORPUS_PHRASES)))
+        idf = {p: math.log((1 + n_docs) / (1 + c)) + 1 for p, c in df.most_common(MAX_CORPUS_PHRASES)}
+        return idf, math.log(1 + n_docs) + 1, n_docs
+
+    def refresh_from_db(self, db, chunk_size: int = 1000):
+        from database import ArticleDB
+
+        def corpus():
+            for title, content in db.query(ArticleDB.title, ArticleDB.content).yield_per(chunk_size):
+                yield f"{title or ''}. {content or ''}"
+
+        self._snapshot = self.build_idf(corpus())
+        print(f"[Keyphrase] Đã tính IDF cho {len(self._snapshot[0])} cụm từ từ {self._snapshot[2]} bài báo.")
+
+    def extract(self, texts, top_k: int = 50, min_score: float = 0.01):
+        """
+        texts: str hoặc list[str] (TF được cộng dồn, không cần nối chuỗi).
+        Trả về [{"text", "value"}] với value = int(điểm chuẩn hóa L2 * 1000), giống API cũ.
+        """
+        if isinstance(texts, str):
+            texts = [texts]
+        idf, default_idf, _ = self._snapshot
+        tf = Counter()
+        for text in texts:
+            tf.update(iter_phrases(text))
+        if not tf:
+            return []
+        scores = {p: c * idf.get(p, default_idf) for p, c in tf.items()}
+        norm = math.sqrt(sum(s * s for s in scores.values()))
+        words = [{"text": p, "value": int(s / norm * 1000)} for p, s in scores.items() if s / norm > min_score]
+        return sorted(words, key=lambda x: x['value'], reverse=True)[:top_k]
+
+    def stats(self):
+        idf, _, n_docs = self._snapshot
+        return {"phrases": len(idf), "documents": n_docs}
+
+
+keyphrase_extractor = KeyphraseExtractor()
+
+
+# === LÀM MỚI IDF ĐỊNH KỲ (CHẠY TRONG THREAD, KHÔNG CHẶN EVENT LOOP) ===
+def _refresh():
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        keyphrase_extractor.refresh_from_db(db)
+    finally:
+        db.close()
+
+async def run_idf_refresher():
+    while True:
+        try:
+            await asyncio.to_thread(_refresh)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Keyphrase] Lỗi tính IDF: {e}")
+        await asyncio.sleep(REFRESH_INTERVAL)
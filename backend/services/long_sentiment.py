@@ -0,0 +1,106 @@
+# backend/services/long_sentiment.py
+import os
+import re
+import asyncio
+
+from services import sentiment_service
+from services.sentiment_service import analyze_sentiment
+
+# --- CẤU HÌNH ---
+WINDOW_TOKENS = int(os.getenv("SENTIMENT_WINDOW_TOKENS", "0"))    # 0 = theo model_max_length của tokenizer
+WINDOW_OVERLAP = int(os.getenv("SENTIMENT_WINDOW_OVERLAP", "32"))  # Số token chồng lấn giữa 2 cửa sổ liền nhau
+MAX_WINDOWS = int(os.getenv("SENTIMENT_MAX_WINDOWS", "128"))       # Giới hạn số cửa sổ / văn bản (giới hạn chi phí)
+PREVIEW_CHARS = 200
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_WORD = re.compile(r"\S+")
+
+
+def split_paragraphs(text: str):
+    """ Đoạn văn cách nhau bởi dòng trống (extract_main_text nối các khối bằng '\\n\\n') """
+    return [p.strip() for p in _PARAGRAPH_SPLIT.split(text) if p.strip()]
+
+
+def _window_size(tokenizer) -> int:
+    if WINDOW_TOKENS:
+        return WINDOW_TOKENS
+    max_length = getattr(tokenizer, "model_max_length", 512) if tokenizer is not None else 512
+    return min(max_length, 512) - 2  # Chừa chỗ cho token đặc biệt <s> ... </s>
+
+
+def token_spans(text: str, tokenizer):
+    """ (start, end) theo ký tự của từng token. Tokenizer không trả offset -> tách theo khoảng trắng. """
+    if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+        offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        return [(s, e) for s, e in offsets if e > s]
+    return [m.span() for m in _WORD.finditer(text)]
+
+
+def paragraph_windows(paragraph: str, tokenizer, size: int, overlap: int):
+    """ [(text cửa sổ, trọng số)]; trọng số = số token mới của cửa sổ (không tính lại phần chồng lấn) """
+    spans = token_spans(paragraph, tokenizer)
+    if len(spans) <= size:
+        return [(paragraph, max(len(spans), 1))]
+    stride = max(size - overlap, 1)
+    windows = []
+    for start in range(0, len(spans), stride):
+        chunk = spans[start:start + size]
+        weight = len(chunk) if start == 0 else len(chunk) - overlap
+        windows.append((paragraph[chunk[0][0]:chunk[-1][1]], weight))
+        if start + size >= len(spans):
+            break
+    return windows
+
+
+def split_document(text: str):
+    """ (danh sách đoạn văn, [(chỉ số đoạn, text cửa sổ, trọng số)], bị cắt bớt?) """
+    tokenizer = getattr(sentiment_service.sentiment_analyzer, "tokenizer", None)
+    size = _window_size(tokenizer)
+    overlap = min(WINDOW_OVERLAP, size // 2)
+    paragraphs = split_paragraphs(text)
+    plan = [(i, window, weight)
+            for i, paragraph in enumerate(paragraphs)
+            for window, weight in paragraph_windows(paragraph, tokenizer, size, overlap)]
+    return paragraphs, plan[:MAX_WINDOWS], len(plan) > MAX_WINDOWS
+
+
+def weighted_vote(results, weights):
+    """ Bỏ phiếu theo độ dài: mỗi nhãn nhận tổng (trọng số x điểm); score = phần của nhãn thắng """
+    mass = {}
+    for res, weight in zip(results, weights):
+        mass[res["label"]] = mass.get(res["label"], 0.0) + weight * res["score"]
+    total = float(sum(weights)) or 1.0
+    label = max(mass, key=mass.get)
+    return {"label": label, "score": round(mass[label] / total, 4),
+            "distribution": {k: round(v / total, 4) for k, v in mass.items()}}
+
+
+# === PHÂN TÍCH CẢM XÚC VĂN BẢN DÀI (CỬA SỔ TOKEN CHỒNG LẤN) ===
+async def analyze_documents(texts):
+    """
+    Mỗi văn bản -> đoạn văn -> cửa sổ token chồng lấn. Cửa sổ của TẤT CẢ văn bản được gửi trong 1 lần
+    analyze_sentiment (cache + hàng đợi gom lô) -> chi phí theo số cửa sổ, không theo số request.
+    Trả về mỗi văn bản: {"document", "paragraphs", "windows", "truncated"}.
+    """
+    splits = await asyncio.to_thread(lambda: [split_document(t) for t in texts])
+    all_windows = [window for _, plan, _ in splits for _, window, _ in plan]
+    results = await analyze_sentiment(all_windows) if all_windows else []
+
+    output, pos = [], 0
+    for paragraphs, plan, truncated in splits:
+        doc_results = results[pos:pos + len(plan)]
+        pos += len(plan)
+        by_paragraph = {}
+        for (i, _, weight), res in zip(plan, doc_results):
+            entry = by_paragraph.setdefault(i, ([], []))
+            entry[0].append(res)
+            entry[1].append(weight)
+        output.append({
+            "document": weighted_vote(doc_results, [w for _, _, w in plan]) if doc_results else None,
+            "paragraphs": [{"index": i, "text": paragraphs[i][:PREVIEW_CHARS], "windows": len(res),
+                            **weighted_vote(res, weights)}
+                           for i, (res, weights) in sorted(by_paragraph.items())],
+            "windows": len(plan),
+            "truncated": truncated,
+        })
+    return output
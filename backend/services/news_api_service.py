@@ -0,0 +1,177 @@
+# backend/services/news_api_service.py
+import json
+import asyncio
+from datetime import datetime
+import requests
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, ArticleDB
+from services import sentiment_service
+from services.sentiment_service import analyze_sentiment, current_model_revision
+from services.ingestion import bulk_ingest_articles
+from services.keyphrase import keyphrase_extractor
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+
+# === 1. GỌI NEWSAPI ===
+def fetch_news(keyword: str, limit: int, api_key: str):
+    headers = {"Authorization": f"Bearer {api_key}"}
+    params = {
+        'q': keyword,
+        'language': 'vi',
+        'pageSize': limit,
+        'sortBy': 'publishedAt'
+    }
+    response = requests.get(NEWS_API_URL, headers=headers, params=params, timeout=20)
+    response.raise_for_status()
+    return response.json().get("articles", [])
+
+
+# === 2. TRÍCH XUẤT CHỦ ĐỀ (Cụm 2-3 từ, IDF tính sẵn từ bảng articles) ===
+def extract_topics(text: str, top_k: int = 50):
+    return keyphrase_extractor.extract(text, top_k=top_k)
+
+def per_article_topics(texts, top_k: int = 10):
+    """ Chủ đề nổi bật của từng bài """
+    return [keyphrase_extractor.extract(text, top_k=top_k) for text in texts]
+
+def merge_topics(topic_lists, top_k: int = 50):
+    """ Cộng điểm chủ đề đã lưu của nhiều bài """
+    totals = {}
+    for topics in topic_lists:
+        for t in topics:
+            totals[t["text"]] = totals.get(t["text"], 0) + t["value"]
+    merged = [{"text": k, "value": v} for k, v in totals.items()]
+    return sorted(merged, key=lambda x: x['value'], reverse=True)[:top_k]
+
+
+# === 3. PIPELINE: PHÂN TÍCH + LƯU (dùng chung cho /news và scheduler) ===
+async def load_analyzed(db, urls):
+    """ Kết quả phân tích đã lưu (đúng model hiện tại) của các URL đã có trong DB (session async) """
+    revision = await current_model_revision()
+    result = await db.execute(
+        select(ArticleDB.url, ArticleDB.sentiment_label, ArticleDB.sentiment_score, ArticleDB.topics)
+        .where(ArticleDB.url.in_(urls), ArticleDB.sentiment_model == revision))
+    return {r.url: r for r in result.all()}
+
+async def analyze_and_store_news(keyword: str, articles_raw, db=None):
+    """ db: AsyncSession của request (/news). Không truyền (scheduler) -> mở session async riêng. """
+    if db is None:
+        async with AsyncSessionLocal() as own_db:
+            return await analyze_and_store_news(keyword, articles_raw, own_db)
+
+    articles_processed = []
+    for article in articles_raw:
+        title = article.get('title', '')
+        description = article.get('description', '')
+        if description and title:
+            articles_processed.append({
+                "title": title,
+                "description": description,
+                "url": article.get('url', ''),
+                "image_url": article.get('urlToImage', ''),
+                "sentiment_label": "Chưa rõ",
+                "sentiment_score": 0.0
+            })
+
+    if not articles_processed:
+        return None
+    texts_to_analyze = [f"{item['title']}. {item['description']}" for item in articles_processed]
+
+    # Bài đã phân tích lúc ingest -> dùng lại, chỉ chạy model cho bài mới
+    analyzed = await load_analyzed(db, [item["url"] for item in articles_processed])
+    pending = [i for i, item in enumerate(articles_processed) if item["url"] not in analyzed]
+    article_topics = [None] * len(articles_processed)
+    for i, item in enumerate(articles_processed):
+        stored = analyzed.get(item["url"])
+        if stored:
+            item['sentiment_label'] = stored.sentiment_label
+            item['sentiment_score'] = stored.sentiment_score
+            article_topics[i] = json.loads(stored.topics) if stored.topics else []
+
+    # Cảm xúc (qua cache + hàng đợi gom lô)
+    model_ready = sentiment_service.sentiment_analyzer is not None
+    if model_ready and pending:
+        results = await analyze_sentiment([texts_to_analyze[i] for i in pending])
+        for i, res in zip(pending, results):
+            articles_processed[i]['sentiment_label'] = res['label']
+            articles_processed[i]['sentiment_score'] = res['score']
+    processed_sentiments_chart = [
+        {"label": item['sentiment_label'], "score": item['sentiment_score']}
+        for item in articles_processed if model_ready or item["url"] in analyzed
+    ]
+
+    # Chủ đề: toàn bộ lô (trả về) + từng bài mới (lưu DB)
+    topics = await asyncio.to_thread(extract_topics, " ".join(texts_to_analyze))
+    if pending:
+        new_topics = await asyncio.to_thread(per_article_topics, [texts_to_analyze[i] for i in pending])
+        for i, t in zip(pending, new_topics):
+            article_topics[i] = t
+
+    now = datetime.utcnow()
+    revision = await current_model_revision() if model_ready else None
+    rows_to_save = [{
+        "category": keyword,
+        "title": articles_processed[i]["title"], "content": articles_processed[i]["description"],
+        "url": articles_processed[i]["url"], "image_url": articles_processed[i]["image_url"],
+        "sentiment_label": articles_processed[i]["sentiment_label"] if model_ready else None,
+        "sentiment_score": articles_processed[i]["sentiment_score"] if model_ready else None,
+        "sentiment_model": revision,
+        "topics": json.dumps(article_topics[i], ensure_ascii=False),
+        "analyzed_at": now if model_ready else None,
+    } for i in pending]
+
+    # Lưu vào MySQL (Bỏ qua nếu trùng URL), chạy trong thread để không chặn event loop
+    ingest = {"inserted": 0, "skipped": len(articles_processed) - len(rows_to_save)}
+    if rows_to_save:
+        try:
+            result = await asyncio.to_thread(bulk_ingest_articles, rows_to_save)
+            ingest = {"inserted": result["inserted"], "skipped": ingest["skipped"] + result["skipped"]}
+        except Exception as e:
+            print(f"[DB] Lỗi lưu bài báo: {e}")
+    print(f"[DB] Đã lưu {ingest['inserted']} bài báo mới vào Database ({ingest['skipped']} bài đã có).")
+
+    return {
+        "status": "success",
+        "sentiments": processed_sentiments_chart,
+        "topics": topics,
+        "articles": [{k: v for k, v in item.items() if k != "image_url"} for item in articles_processed],
+        "inserted": ingest["inserted"],
+        "skipped": ingest["skipped"],
+        "source": "live"
+    }
+
+
+# === 4. ĐỌC KẾT QUẢ ĐÃ TÍNH SẴN TỪ DB ===
+def stored_news_query(keyword: str, limit: int):
+    """ Các cột cần cho kết quả đã lưu của 1 từ khóa (bài mới nhất trước) """
+    return select(ArticleDB.title, ArticleDB.content, ArticleDB.url, ArticleDB.sentiment_label,
+                  ArticleDB.sentiment_score, ArticleDB.topics) \
+        .where(ArticleDB.category == keyword).order_by(ArticleDB.id.desc()).limit(limit)
+
+def format_stored_news(rows):
+    """ Bài báo + cảm xúc + chủ đề (gộp) từ các dòng của stored_news_query. None nếu chưa có dữ liệu. """
+    if not rows:
+        return None
+    articles, sentiments, topic_lists = [], [], []
+    for a in rows:
+        label = a.sentiment_label or "Chưa rõ"
+        score = a.sentiment_score or 0.0
+        articles.append({"title": a.title, "description": a.content, "url": a.url,
+                         "sentiment_label": label, "sentiment_score": score})
+        if a.sentiment_label:
+            sentiments.append({"label": label, "score": score})
+        if a.topics:
+            topic_lists.append(json.loads(a.topics))
+    return {
+        "status": "success",
+        "sentiments": sentiments,
+        "topics": merge_topics(topic_lists),
+        "articles": articles,
+        "source": "database"
+    }
+
+def load_stored_news(db, keyword: str, limit: int):
+    """ Bản sync (session thường) cho job / script """
+    return format_stored_news(db.execute(stored_news_query(keyword, limit)).all())
@@ -0,0 +1,64 @@
+# backend/services/news_scheduler.py
+import os
+import asyncio
+from datetime import datetime
+
+from services import sentiment_service
+from services.news_api_service import fetch_news, analyze_and_store_news
+
+# --- CẤU HÌNH ---
+# VD: NEWS_TRACKED_KEYWORDS="kinh tế,bóng đá,công nghệ"
+TRACKED_KEYWORDS = [k.strip() for k in os.getenv("NEWS_TRACKED_KEYWORDS", "").split(",") if k.strip()]
+REFRESH_INTERVAL = int(os.getenv("NEWS_REFRESH_INTERVAL", "900"))  # Giây giữa 2 lần làm mới
+REFRESH_LIMIT = int(os.getenv("NEWS_REFRESH_LIMIT", "40"))
+MODEL_POLL_INTERVAL = 1.0  # Giây giữa 2 lần kiểm tra model cảm xúc đã nạp xong chưa
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+_tracked = {normalize_keyword(k): k for k in TRACKED_KEYWORDS}
+last_refreshed = {}  # keyword -> datetime
+
+
+def tracked_keyword(keyword: str):
+    """ Tên từ khóa đang được theo dõi (đúng category đã lưu trong DB), None nếu không theo dõi """
+    return _tracked.get(normalize_keyword(keyword))
+
+
+async def refresh_keyword(keyword: str):
+    api_key = os.getenv("NEWS_API_KEY")
+    if not api_key:
+        return
+    articles_raw = await asyncio.to_thread(fetch_news, keyword, REFRESH_LIMIT, api_key)
+    result = await analyze_and_store_news(keyword, articles_raw)
+    last_refreshed[keyword] = datetime.utcnow()
+    if result:
+        print(f"[Scheduler] '{keyword}': {result['inserted']} bài mới.")
+
+
+async def wait_for_model() -> bool:
+    """ Chờ warm-up nạp xong model cảm xúc. False nếu nạp lỗi (không có kết quả phân tích để lưu). """
+    while sentiment_service.model_state["status"] in ("not_loaded", "loading"):
+        await asyncio.sleep(MODEL_POLL_INTERVAL)
+    return sentiment_service.model_state["status"] == "ready"
+
+
+# === VÒNG LẶP NỀN: LÀM MỚI CÁC TỪ KHÓA ĐANG THEO DÕI ===
+async def run_scheduler():
+    if not _tracked:
+        return
+    print(f"[Scheduler] Theo dõi {len(_tracked)} từ khóa, làm mới mỗi {REFRESH_INTERVAL}s.")
+    while True:
+        # Chạy cùng lúc với warm-up: làm mới trước khi model sẵn sàng sẽ lưu bài không có cảm xúc
+        if not await wait_for_model():
+            print(f"[Scheduler] Model cảm xúc lỗi ({sentiment_service.model_state['error']}), bỏ qua lượt làm mới.")
+            await asyncio.sleep(REFRESH_INTERVAL)
+            continue
+        for keyword in _tracked.values():
+            try:
+                await refresh_keyword(keyword)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Scheduler] Lỗi làm mới '{keyword}': {e}")
+        await asyncio.sleep(REFRESH_INTERVAL)
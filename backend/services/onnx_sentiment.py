@@ -0,0 +1,147 @@
+# backend/services/onnx_sentiment.py
+# Backend suy luận CPU cho model cảm xúc: ONNX Runtime + lượng tử hóa động int8.
+# Bật bằng SENTIMENT_BACKEND=onnx (mặc định vẫn là pipeline PyTorch của transformers).
+import os
+import json
+import time
+
+import numpy as np
+
+# --- CẤU HÌNH ---
+ONNX_DIR_NAME = "onnx"                                                       # Thư mục con trong local_model
+ONNX_THREADS = int(os.getenv("SENTIMENT_ONNX_THREADS", "0"))                 # 0 = tự chọn (số nhân vật lý ước lượng)
+LENGTH_BUCKETS = tuple(int(x) for x in os.getenv("SENTIMENT_LENGTH_BUCKETS", "16,32,64,128,256").split(","))
+
+
+def default_thread_count() -> int:
+    # Hyper-threading: 2 luồng logic / nhân -> dùng số nhân vật lý, để lại CPU cho event loop + DB
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def bucket_length(length: int, buckets=LENGTH_BUCKETS) -> int:
+    """ Độ dài pad lên bucket gần nhất >= length (ít shape khác nhau, ít token pad thừa) """
+    for b in buckets:
+        if length <= b:
+            return b
+    return length
+
+
+# === EXPORT 1 LẦN: PyTorch -> ONNX (fp32) -> int8 (lượng tử hóa động) ===
+def export_onnx(model_path: str, revision: str, out_dir: str = None) -> str:
+    """
+    Xuất model sang ONNX rồi lượng tử hóa động int8 (trọng số Linear/MatMul).
+    Ghi kèm revision của model gốc: model đổi -> tự export lại. Trả về đường dẫn file int8.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    out_dir = out_dir or os.path.join(model_path, ONNX_DIR_NAME)
+    os.makedirs(out_dir, exist_ok=True)
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    int8_path = os.path.join(out_dir, "model.int8.onnx")
+
+    start = time.perf_counter()
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path).eval()
+    sample = tokenizer(["xin chào", "mẫu để export"], padding=True, return_tensors="pt")
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (sample["input_ids"], sample["attention_mask"]), fp32_path,
+            input_names=["input_ids", "attention_mask"], output_names=["logits"],
+            dynamic_axes={"input_ids": {0: "batch", 1: "sequence"},
+                          "attention_mask": {0: "batch", 1: "sequence"},
+                          "logits": {0: "batch"}},
+            opset_version=14,
+        )
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    with open(os.path.join(out_dir, "export.json"), "w") as f:
+        json.dump({"revision": revision, "exported_at": time.time()}, f)
+    print(f"[Analytics] Đã export model ONNX int8 ({time.perf_counter() - start:.1f}s): {int8_path}")
+    return int8_path
+
+
+def ensure_onnx_model(model_path: str, revision: str) -> str:
+    out_dir = os.path.join(model_path, ONNX_DIR_NAME)
+    int8_path = os.path.join(out_dir, "model.int8.onnx")
+    try:
+        with open(os.path.join(out_dir, "export.json")) as f:
+            exported = json.load(f).get("revision")
+    except (OSError, ValueError):
+        exported = None
+    if exported == revision and os.path.exists(int8_path):
+        return int8_path
+    return export_onnx(model_path, revision, out_dir)
+
+
+# === PIPELINE ONNX (THAY THẾ TRỰC TIẾP pipeline("sentiment-analysis")) ===
+class OnnxSentimentPipeline:
+    """
+    Gọi giống pipeline của transformers: analyzer(texts, truncation=True, batch_size=N)
+    -> [{"label": "POS"/"NEG"/"NEU", "score": float}] đúng thứ tự đầu vào.
+    Văn bản được sắp theo độ dài rồi chia lô theo bucket độ dài, mỗi lô chỉ pad tới bucket của nó.
+    """
+
+    def __init__(self, model_path: str, onnx_path: str, threads: int = ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoConfig, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.id2label = {int(k): v for k, v in AutoConfig.from_pretrained(model_path).id2label.items()}
+        self.max_length = min(self.tokenizer.model_max_length, max(LENGTH_BUCKETS))
+        self.pad_id = self.tokenizer.pad_token_id
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or default_thread_count()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.threads = options.intra_op_num_threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+    def _run_batch(self, encoded):
+        width = bucket_length(max(len(ids) for ids in encoded))
+        input_ids = np.full((len(encoded), width), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(encoded), width), dtype=np.int64)
+        for row, ids in enumerate(encoded):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        logits = self.session.run(["logits"], {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+        logits = logits - logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs
+
+    def __call__(self, texts, truncation: bool = True, batch_size: int = None, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        if not texts:
+            return []
+        encoded = self.tokenizer(list(texts), truncation=truncation, max_length=self.max_length)["input_ids"]
+        order = sorted(range(len(encoded)), key=lambda i: len(encoded[i]))
+        batch_size = batch_size or len(encoded)
+        # Chia lô: tối đa batch_size câu và chỉ gồm các câu cùng bucket độ dài -> câu ngắn không bị pad theo câu dài
+        batches, current = [], []
+        for i in order:
+            if current and (len(current) >= batch_size or
+                            bucket_length(len(encoded[i])) != bucket_length(len(encoded[current[0]]))):
+                batches.append(current)
+                current = []
+            current.append(i)
+        batches.append(current)
+
+        results = [None] * len(encoded)
+        for idx in batches:
+            probs = self._run_batch([encoded[i] for i in idx])
+            for i, p in zip(idx, probs):
+                best = int(p.argmax())
+                results[i] = {"label": self.id2label[best], "score": float(p[best])}
+        return results
+
+
+def load_onnx_pipeline(model_path: str, revision: str) -> OnnxSentimentPipeline:
+    onnx_path = ensure_onnx_model(model_path, revision)
+    analyzer = OnnxSentimentPipeline(model_path, onnx_path)
+    print(f"[Analytics] Backend ONNX int8, {analyzer.threads} luồng, bucket độ dài {LENGTH_BUCKETS}")
+    return analyzer
@@ -0,0 +1,99 @@
+# backend/services/openai_service.py
+import os
+import json
+import hashlib
+import threading
+from dotenv import load_dotenv
+
+from utils.cache import LRUCache, SqliteStore
+
+# --- CẤU HÌNH GROQ ---
+load_dotenv()
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")  # Trỏ sang fake_groq_server.py khi test
+GROQ_MODEL = "llama-3.1-8b-instant"
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "60"))
+
+# Client đồng bộ (gọi trong thread) + client async (stream, không chặn event loop).
+# Thư viện openai import mất ~1s -> tạo client khi dùng lần đầu, không tạo lúc import.
+_clients = {}
+_clients_lock = threading.Lock()
+
+def _get_client(kind: str):
+    if not GROQ_API_KEY:
+        return None
+    with _clients_lock:
+        if kind not in _clients:
+            import openai  # Dùng thư viện openai để gọi Groq (API chuẩn OpenAI)
+            client_cls = openai.OpenAI if kind == "sync" else openai.AsyncOpenAI
+            _clients[kind] = client_cls(base_url=GROQ_BASE_URL, api_key=GROQ_API_KEY, timeout=GROQ_TIMEOUT)
+        return _clients[kind]
+
+def get_groq_client():
+    return _get_client("sync")
+
+def get_groq_async_client():
+    return _get_client("async")
+
+
+def chat_messages(system_content, user_content):
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": user_content}
+    ]
+
+
+# === STREAM TỪNG TOKEN TỪ GROQ ===
+async def stream_groq_text(system_content, user_content, temperature: float = 0.7, max_tokens: int = 1024):
+    """ Async generator: trả từng đoạn text ngay khi Groq sinh ra """
+    stream = await get_groq_async_client().chat.completions.create(
+        model=GROQ_MODEL,
+        messages=chat_messages(system_content, user_content),
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        # Người gọi dừng sớm (client ngắt kết nối) -> đóng kết nối tới Groq, không sinh tiếp token
+        await stream.close()
+
+
+# === CACHE PHẢN HỒI GROQ (key = system prompt + user prompt + model + temperature) ===
+GROQ_CACHE_SIZE = int(os.getenv("GROQ_CACHE_SIZE", "2000"))
+GROQ_CACHE_TTL = float(os.getenv("GROQ_CACHE_TTL", str(7 * 24 * 3600)))  # Giây
+# Đặt GROQ_CACHE_PATH="" để tắt lưu xuống đĩa
+GROQ_CACHE_PATH = os.getenv("GROQ_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "cache_data", "groq_cache.sqlite"))
+
+def completion_cache_key(system_content, user_content, model: str = GROQ_MODEL, temperature: float = 0.7) -> str:
+    raw = json.dumps([system_content, user_content, model, float(temperature)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+groq_cache = LRUCache(GROQ_CACHE_SIZE, ttl=GROQ_CACHE_TTL)
+groq_store = None
+if GROQ_CACHE_PATH:
+    try:
+        groq_store = SqliteStore(GROQ_CACHE_PATH, table="groq", ttl=GROQ_CACHE_TTL)
+    except Exception as e:
+        print(f"[Content] Không mở được cache Groq trên đĩa: {e}")
+
+def get_cached_completion(key: str):
+    text = groq_cache.get(key)
+    if text is None and groq_store is not None:
+        text = groq_store.get_many([key]).get(key)
+        if text is not None:
+            groq_cache.set(key, text)
+    return text
+
+def cache_completion(key: str, text: str):
+    groq_cache.set(key, text)
+    if groq_store is not None:
+        groq_store.set_many([(key, text)])
+
+def cache_metrics():
+    stats = groq_cache.stats()
+    stats["disk_store"] = bool(groq_store)
+    return stats
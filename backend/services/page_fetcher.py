@@ -0,0 +1,84 @@
+# backend/services/page_fetcher.py
+import os
+import asyncio
+import threading
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+from services.browser_pool import browser_pool, USER_AGENT
+
+# --- CẤU HÌNH ---
+MIN_CONTENT_LENGTH = 50  # Cùng ngưỡng "Nội dung quá ngắn" của /analytics/url
+HTTP_TIMEOUT = float(os.getenv("FETCH_HTTP_TIMEOUT", "10"))
+HTTP_POOL_SIZE = int(os.getenv("FETCH_HTTP_POOL_SIZE", "20"))
+
+# Session dùng chung -> giữ kết nối keep-alive giữa các request
+http_session = requests.Session()
+http_session.headers.update({"User-Agent": USER_AGENT, "Accept-Language": "vi,en;q=0.8"})
+_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+http_session.mount("http://", _adapter)
+http_session.mount("https://", _adapter)
+
+_tier_counts = Counter()
+_tier_lock = threading.Lock()
+
+
+def extract_main_text(html_content: str):
+    """ Lấy nội dung chính (article / main / body), giữ đoạn văn. None nếu không có. """
+    soup = BeautifulSoup(html_content, 'lxml')
+    main_content = soup.find('article') or soup.find('main') or soup.body
+    if not main_content:
+        return None
+    for s in main_content(['script', 'style', 'nav', 'footer', 'header']): s.decompose()
+    return main_content.get_text(separator='\n\n', strip=True)
+
+
+def _http_get(url: str, headers=None):
+    response = http_session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+# === FETCH 2 TẦNG: HTTP THƯỜNG -> SELENIUM ===
+async def fetch_article_text(url: str, etag: str = None, last_modified: str = None):
+    """
+    Trả về dict {text, tier, etag, last_modified, not_modified}.
+    - tier = "http" nếu trang render sẵn phía server, "browser" nếu phải dùng Chrome.
+    - Truyền etag / last_modified của lần trước để gửi request có điều kiện;
+      not_modified = True (text = None) khi server trả 304.
+    """
+    headers = {}
+    if etag: headers["If-None-Match"] = etag
+    if last_modified: headers["If-Modified-Since"] = last_modified
+    validators = {"etag": None, "last_modified": None}
+    try:
+        response = await asyncio.to_thread(_http_get, url, headers)
+        validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        if response.status_code == 304:
+            _count("not_modified")
+            return {"text": None, "tier": "http", "not_modified": True,
+                    "etag": validators["etag"] or etag, "last_modified": validators["last_modified"] or last_modified}
+        # Giải mã + BeautifulSoup tốn CPU -> chạy trong thread, không chặn event loop
+        text = await asyncio.to_thread(lambda: extract_main_text(response.text))
+        if text and len(text) >= MIN_CONTENT_LENGTH:
+            _count("http")
+            return {"text": text, "tier": "http", "not_modified": False, **validators}
+    except requests.RequestException as e:
+        print(f"[Fetch] HTTP thường thất bại, chuyển sang Selenium: {e}")
+
+    html_content = await browser_pool.fetch_html(url)
+    _count("browser")
+    text = await asyncio.to_thread(extract_main_text, html_content)
+    return {"text": text, "tier": "browser", "not_modified": False, **validators}
+
+
+def _count(tier: str):
+    with _tier_lock:
+        _tier_counts[tier] += 1
+
+def tier_stats():
+    with _tier_lock:
+        return dict(_tier_counts)
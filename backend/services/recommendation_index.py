@@ -0,0 +1,581 @@
+# backend/services/recommendation_index.py
+import os
+import re
+import json
+import time
+import pickle
+import threading
+import numpy as np
+from scipy import sparse
+
+
+def normalize(*args, **kwargs):
+    # sklearn import mất ~1-2s -> chỉ nạp khi dùng lần đầu (trong thread nền), không nạp lúc import module
+    from sklearn.preprocessing import normalize as sk_normalize
+    return sk_normalize(*args, **kwargs)
+
+# --- CẤU HÌNH ---
+INDEX_DIR = os.getenv("RECOMMEND_INDEX_DIR", os.path.join(os.path.dirname(__file__), "..", "index_data"))
+REWEIGHT_INTERVAL = int(os.getenv("RECOMMEND_REWEIGHT_INTERVAL", "600"))  # Giây giữa 2 lần tính lại IDF
+PROFILE_SAVE_INTERVAL = int(os.getenv("PROFILE_SAVE_INTERVAL", "60"))       # Giây giữa 2 lần ghi hồ sơ đã đổi xuống đĩa
+PROFILE_HALF_LIFE_DAYS = float(os.getenv("PROFILE_HALF_LIFE_DAYS", "30"))    # Bài đọc cách đây 1 half-life nặng bằng 1/2 bài mới
+MIN_SCORE = 0.05
+
+# Cùng token_pattern mặc định của TfidfVectorizer để kết quả không đổi so với trước
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+def tokenize(text: str):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def article_text(title, content) -> str:
+    return f"{title or ''} {content or ''}"
+
+
+# === MA TRẬN CSR NỐI THÊM HÀNG (BỘ ĐỆM TĂNG GẤP ĐÔI) ===
+def _reserve(arr, size: int):
+    if size <= len(arr):
+        return arr
+    grown = np.empty(max(size, 2 * len(arr)), dtype=arr.dtype)
+    grown[:len(arr)] = arr
+    return grown
+
+
+class _GrowableCSR:
+    """
+    indptr / indices / data giữ trong mảng có dung lượng dư: nối k hàng chỉ chép O(nnz của k hàng)
+    (khấu hao), không chép lại cả ma trận như sparse.vstack. matrix() trả về csr dùng chung bộ nhớ.
+    """
+
+    def __init__(self, matrix=None, n_cols: int = 0):
+        matrix = sparse.csr_matrix((0, n_cols), dtype=np.float64) if matrix is None else sparse.csr_matrix(matrix)
+        self.n_rows, self.n_cols = matrix.shape
+        self.nnz = matrix.nnz
+        self.indptr = np.asarray(matrix.indptr, dtype=np.int32).copy()
+        self.indices = np.asarray(matrix.indices, dtype=np.int32).copy()
+        self.data = np.asarray(matrix.data, dtype=np.float64).copy()
+        self._view = None
+
+    def append(self, block):
+        block = sparse.csr_matrix(block)
+        rows, nnz = block.shape[0], block.nnz
+        self.indptr = _reserve(self.indptr, self.n_rows + 1 + rows)
+        self.indices = _reserve(self.indices, self.nnz + nnz)
+        self.data = _reserve(self.data, self.nnz + nnz)
+        self.indptr[self.n_rows + 1:self.n_rows + 1 + rows] = block.indptr[1:] - block.indptr[0] + self.nnz
+        self.indices[self.nnz:self.nnz + nnz] = block.indices[block.indptr[0]:block.indptr[-1]]
+        self.data[self.nnz:self.nnz + nnz] = block.data[block.indptr[0]:block.indptr[-1]]
+        self.n_rows += rows
+        self.nnz += nnz
+        self.n_cols = max(self.n_cols, block.shape[1])
+        self._view = None
+
+    def resize_cols(self, n_cols: int):
+        if n_cols != self.n_cols:
+            self.n_cols = n_cols
+            self._view = None
+
+    def matrix(self):
+        # Cùng 1 object cho tới lần thay đổi sau (ArticleIndex.transposed dựa vào điều này)
+        if self._view is None:
+            self._view = sparse.csr_matrix(
+                (self.data[:self.nnz], self.indices[:self.nnz], self.indptr[:self.n_rows + 1]),
+                shape=(self.n_rows, self.n_cols), copy=False)
+        return self._view
+
+
+# === CHỈ MỤC TF-IDF (LƯU XUỐNG ĐĨA, CẬP NHẬT TĂNG DẦN) ===
+class ArticleIndex:
+    """
+    Lưu vocabulary, IDF và ma trận tài liệu (sparse) của toàn bộ bài báo.
+    - Bài mới được nối thêm vào cuối ma trận (không fit lại).
+    - IDF được tính lại định kỳ ở background từ document frequency.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self.lock = threading.RLock()
+        self.vocabulary = {}                 # term -> cột
+        self.df = np.zeros(0, dtype=np.int64)  # số tài liệu chứa term
+        self.idf = np.zeros(0, dtype=np.float64)
+        self._counts = _GrowableCSR()  # TF thô
+        self._docs = _GrowableCSR()    # TF-IDF đã chuẩn hóa L2
+        self.article_ids = []
+        self.id_to_row = {}
+        self.dirty = False  # Có bài mới chưa được tính lại IDF
+        self.loaded = False
+        self._doc_t = (None, None)  # (doc_matrix nguồn, doc_matrix.T dạng csc) dùng lại giữa các lần recommend_batch
+
+    @property
+    def counts(self):
+        return self._counts.matrix()
+
+    @counts.setter
+    def counts(self, matrix):
+        self._counts = _GrowableCSR(matrix)
+
+    @property
+    def doc_matrix(self):
+        return self._docs.matrix()
+
+    @doc_matrix.setter
+    def doc_matrix(self, matrix):
+        self._docs = _GrowableCSR(matrix)
+
+    # --- Tính IDF (giống smooth_idf=True của sklearn) ---
+    def _compute_idf(self, df, n_docs):
+        return np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+
+    def _count_rows(self, texts):
+        """ Đếm TF cho danh sách văn bản, mở rộng vocabulary nếu gặp term mới """
+        indptr, indices, values = [0], [], []
+        for text in texts:
+            row = {}
+            for tok in tokenize(text):
+                col = self.vocabulary.get(tok)
+                if col is None:
+                    col = len(self.vocabulary)
+                    self.vocabulary[tok] = col
+                row[col] = row.get(col, 0) + 1
+            indices.extend(row.keys())
+            values.extend(row.values())
+            indptr.append(len(indices))
+        n_terms = len(self.vocabulary)
+        return sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), n_terms)
+        )
+
+    def _weight(self, counts):
+        if counts.shape[0] == 0 or counts.shape[1] == 0:
+            return sparse.csr_matrix(counts.shape, dtype=np.float64)
+        return normalize(counts @ sparse.diags(self.idf), norm="l2", copy=False).tocsr()
+
+    def _resize_terms(self, n_terms):
+        old = len(self.df)
+        if n_terms == old:
+            return
+        self.df = np.concatenate([self.df, np.zeros(n_terms - old, dtype=np.int64)])
+        self.idf = np.concatenate([self.idf, np.zeros(n_terms - old, dtype=np.float64)])
+        self._counts.resize_cols(n_terms)
+        self._docs.resize_cols(n_terms)
+
+    # --- Xây mới toàn bộ ---
+    def build(self, articles):
+        """ articles: list (id, title, content) """
+        with self.lock:
+            self.vocabulary = {}
+            self.df = np.zeros(0, dtype=np.int64)
+            self.idf = np.zeros(0, dtype=np.float64)
+            self.counts = sparse.csr_matrix((0, 0), dtype=np.float64)
+            self.doc_matrix = sparse.csr_matrix((0, 0), dtype=np.float64)
+            self.article_ids = []
+            self.id_to_row = {}
+            self.loaded = True
+            self.add_articles(articles)
+            self.reweight()
+
+    # --- Thêm bài mới (tăng dần) ---
+    def add_articles(self, articles):
+        """ Nối bài mới vào chỉ mục, bỏ qua bài đã có. Trả về số bài được thêm. """
+        with self.lock:
+            new = [a for a in articles if a[0] not in self.id_to_row]
+            if not new:
+                return 0
+            counts = self._count_rows([article_text(a[1], a[2]) for a in new])
+            self._resize_terms(counts.shape[1])
+            self.df += np.bincount(counts.indices, minlength=counts.shape[1])
+            # Term mới chưa có IDF -> tính tạm từ df hiện tại, lần reweight sau sẽ chuẩn lại
+            n_docs = len(self.article_ids) + len(new)
+            missing = self.idf == 0
+            self.idf[missing] = self._compute_idf(self.df[missing], n_docs)
+
+            # Nối vào bộ đệm: không chép lại ma trận cũ như sparse.vstack
+            self._counts.append(counts)
+            self._docs.append(self._weight(counts))
+            for a in new:
+                self.id_to_row[a[0]] = len(self.article_ids)
+                self.article_ids.append(a[0])
+            self.dirty = True
+            return len(new)
+
+    def reweight(self):
+        """ Tính lại IDF theo df hiện tại và chuẩn hóa lại toàn bộ ma trận """
+        with self.lock:
+            self.idf = self._compute_idf(self.df, len(self.article_ids))
+            self.doc_matrix = self._weight(self.counts)
+            self.dirty = False
+
+    # --- Truy vấn ---
+    def transform(self, text: str):
+        """ Vector hóa văn bản theo vocabulary hiện có (không thêm term mới) """
+        row = {}
+        for tok in tokenize(text):
+            col = self.vocabulary.get(tok)
+            if col is not None:
+                row[col] = row.get(col, 0) + 1
+        if not row:
+            return sparse.csr_matrix((1, len(self.vocabulary)), dtype=np.float64)
+        vec = sparse.csr_matrix(
+            (np.asarray(list(row.values()), dtype=np.float64), (np.zeros(len(row), dtype=np.int64), np.asarray(list(row.keys()), dtype=np.int64))),
+            shape=(1, len(self.vocabulary))
+        )
+        return normalize(vec @ sparse.diags(self.idf), norm="l2", copy=False).tocsr()
+
+    def top_n(self, query_vec, exclude_ids=(), top_n: int = 3, min_score: float = MIN_SCORE):
+        """ 1 phép nhân sparse + argpartition. Trả về list (article_id, score). """
+        with self.lock:
+            if not self.article_ids or query_vec.nnz == 0:
+                return []
+            if query_vec.shape[1] < self.doc_matrix.shape[1]:
+                query_vec = query_vec.copy()
+                query_vec.resize((1, self.doc_matrix.shape[1]))
+            scores = np.asarray((self.doc_matrix @ query_vec.T).todense()).ravel()
+            for aid in exclude_ids:
+                row = self.id_to_row.get(aid)
+                if row is not None:
+                    scores[row] = -1.0
+            k = min(top_n, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.article_ids[i], float(scores[i])) for i in top if scores[i] > min_score]
+
+    # --- Lưu / nạp đĩa ---
+    def save(self):
+        with self.lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            files = {
+                "doc_matrix.npz": lambda p: sparse.save_npz(p, self.doc_matrix),
+                "counts.npz": lambda p: sparse.save_npz(p, self.counts),
+                "idf.npy": lambda p: np.save(p, self.idf),
+                "df.npy": lambda p: np.save(p, self.df),
+                "article_ids.npy": lambda p: np.save(p, np.asarray(self.article_ids, dtype=np.int64)),
+            }
+            for name, writer in files.items():
+                tmp = os.path.join(self.index_dir, "tmp_" + name)
+                writer(tmp)
+                os.replace(tmp, os.path.join(self.index_dir, name))
+            tmp = os.path.join(self.index_dir, "tmp_vocabulary.json")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.vocabulary, f, ensure_ascii=False)
+            os.replace(tmp, os.path.join(self.index_dir, "vocabulary.json"))
+
+    def load(self) -> bool:
+        try:
+            with open(os.path.join(self.index_dir, "vocabulary.json"), encoding="utf-8") as f:
+                vocabulary = json.load(f)
+            doc_matrix = sparse.load_npz(os.path.join(self.index_dir, "doc_matrix.npz")).tocsr()
+            counts = sparse.load_npz(os.path.join(self.index_dir, "counts.npz")).tocsr()
+            idf = np.load(os.path.join(self.index_dir, "idf.npy"))
+            df = np.load(os.path.join(self.index_dir, "df.npy"))
+            article_ids = np.load(os.path.join(self.index_dir, "article_ids.npy")).tolist()
+        except (OSError, ValueError) as e:
+            print(f"[RecommendIndex] Không nạp được chỉ mục từ đĩa: {e}")
+            return False
+        with self.lock:
+            self.vocabulary, self.doc_matrix, self.counts = vocabulary, doc_matrix, counts
+            self.idf, self.df, self.article_ids = idf, df, article_ids
+            self.id_to_row = {aid: i for i, aid in enumerate(article_ids)}
+            self.dirty = False
+            self.loaded = True
+        return True
+
+    def transposed(self):
+        """ doc_matrix.T (vocab x bài, csc): chỉ tính lại khi ma trận đổi (thêm bài / reweight / nạp) """
+        with self.lock:
+            source, doc_t = self._doc_t
+            if source is not self.doc_matrix:
+                doc_t = self.doc_matrix.T.tocsc()
+                self._doc_t = (self.doc_matrix, doc_t)
+            return doc_t
+
+    def last_article_id(self) -> int:
+        return max(self.article_ids) if self.article_ids else 0
+
+    def row_vector(self, article_id):
+        """ (indices, values) của 1 bài trong ma trận TF-IDF, None nếu chưa index """
+        with self.lock:
+            row = self.id_to_row.get(article_id)
+            if row is None:
+                return None
+            start, end = self.doc_matrix.indptr[row], self.doc_matrix.indptr[row + 1]
+            return self.doc_matrix.indices[start:end].copy(), self.doc_matrix.data[start:end].copy()
+
+
+article_index = ArticleIndex()
+
+
+# === VECTOR HỒ SƠ NGƯỜI DÙNG (LƯU SẴN, CẬP NHẬT KHI /log_view) ===
+class UserProfileStore:
+    """
+    Hồ sơ = tổng có suy giảm theo thời gian của các vector bài đã đọc.
+    Thay vì nhân toàn bộ hồ sơ với hệ số suy giảm mỗi lần cập nhật, bài mới được cộng với
+    trọng số 2^((t - t0) / half_life) (cosine không phụ thuộc tỉ lệ), nên mỗi lần cập nhật chỉ
+    tốn O(nnz của bài). Khi trọng số quá lớn thì chuẩn hóa lại về mốc t0 mới.
+    """
+    MAX_WEIGHT = 1e6
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.path = os.path.join(index_dir, "user_profiles.pkl")
+        self.lock = threading.RLock()
+        self.profiles = {}  # user_id -> {"t0": float, "weights": {cột: float}, "viewed": set(article_id)}
+        self.unverified = set()  # Hồ sơ nạp từ đĩa, có thể thiếu lượt xem sau lần ghi cuối (crash) -> đối chiếu lại DB
+        self.dirty = False
+        self.loaded = False
+
+    def _decay_weight(self, profile, ts):
+        return 2.0 ** ((ts - profile["t0"]) / (PROFILE_HALF_LIFE_DAYS * 86400.0))
+
+    def has(self, user_id) -> bool:
+        return user_id in self.profiles
+
+    def touch(self, user_id: int):
+        """ Đánh dấu user đã có hồ sơ (kể cả rỗng) để không phải dựng lại từ lịch sử """
+        with self.lock:
+            self.unverified.discard(user_id)
+            if user_id not in self.profiles:
+                self.profiles[user_id] = {"t0": time.time(), "weights": {}, "viewed": set()}
+                self.dirty = True
+
+    def add_view(self, user_id: int, article_id: int, ts: float = None) -> bool:
+        """ Cộng vector bài vào hồ sơ. False nếu bài chưa có trong chỉ mục. """
+        vec = article_index.row_vector(article_id)
+        if vec is None:
+            return False
+        ts = time.time() if ts is None else ts
+        with self.lock:
+            profile = self.profiles.setdefault(user_id, {"t0": ts, "weights": {}, "viewed": set()})
+            if article_id in profile["viewed"]:
+                return True
+            weight = self._decay_weight(profile, ts)
+            if weight > self.MAX_WEIGHT:
+                # Hiếm khi xảy ra: đưa mốc t0 về hiện tại
+                profile["weights"] = {c: w / weight for c, w in profile["weights"].items()}
+                profile["t0"], weight = ts, 1.0
+            weights = profile["weights"]
+            for col, val in zip(vec[0].tolist(), vec[1].tolist()):
+                weights[col] = weights.get(col, 0.0) + weight * val
+            profile["viewed"].add(article_id)
+            self.dirty = True
+        return True
+
+    def vector(self, user_id: int):
+        """ Vector hồ sơ dạng csr (1 x vocab), None nếu user chưa có hồ sơ """
+        with self.lock:
+            profile = self.profiles.get(user_id)
+            if not profile or not profile["weights"]:
+                return None
+            cols = np.fromiter(profile["weights"].keys(), dtype=np.int64)
+            vals = np.fromiter(profile["weights"].values(), dtype=np.float64)
+        vec = sparse.csr_matrix((vals, (np.zeros(len(cols), dtype=np.int64), cols)), shape=(1, len(article_index.vocabulary)))
+        return normalize(vec, norm="l2", copy=False)
+
+    def viewed(self, user_id: int):
+        with self.lock:
+            profile = self.profiles.get(user_id)
+            return set(profile["viewed"]) if profile else set()
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(self.profiles, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self.dirty = False
+
+    def load(self):
+        """ Nạp hồ sơ từ đĩa 1 lần. Hồ sơ đã có trong bộ nhớ (mới hơn bản trên đĩa) được giữ nguyên. """
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            try:
+                with open(self.path, "rb") as f:
+                    stored = pickle.load(f)
+            except FileNotFoundError:
+                return
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                print(f"[UserProfiles] Không nạp được hồ sơ từ đĩa: {e}")
+                return
+            stored.update(self.profiles)
+            self.unverified = set(stored) - set(self.profiles)
+            self.profiles = stored
+
+
+user_profiles = UserProfileStore()
+
+
+# === GỢI Ý THEO LÔ (NHIỀU USER / 1 PHÉP NHÂN MA TRẬN) ===
+def recommend_batch(user_ids, top_n: int = 3, chunk_size: int = 512, min_score: float = MIN_SCORE):
+    """
+    Chấm điểm nhiều user cùng lúc: U (users x vocab) @ D.T (vocab x bài), kết quả giữ dạng sparse.
+    Top-N của từng hàng chọn bằng argpartition trên các điểm khác 0 của hàng (indptr / data),
+    bài đã đọc bị loại theo hàng. Trả về dict user_id -> list (article_id, score).
+    """
+    results = {uid: [] for uid in user_ids}
+    with article_index.lock:
+        if not article_index.article_ids or top_n < 1:
+            return results
+        doc_t = article_index.transposed()
+        article_ids = np.asarray(article_index.article_ids)
+        id_to_row = article_index.id_to_row
+
+    active = [(uid, vec) for uid in user_ids if (vec := user_profiles.vector(uid)) is not None]
+    for start in range(0, len(active), chunk_size):
+        chunk = active[start:start + chunk_size]
+        vecs = []
+        for _, vec in chunk:
+            if vec.shape[1] != doc_t.shape[0]:
+                vec = vec.copy()
+                vec.resize((1, doc_t.shape[0]))
+            vecs.append(vec)
+        scores = (sparse.vstack(vecs, format="csr") @ doc_t).tocsr()
+
+        for i, (uid, _) in enumerate(chunk):
+            begin, end = scores.indptr[i], scores.indptr[i + 1]
+            cols, vals = scores.indices[begin:end], scores.data[begin:end]
+            viewed = [row for aid in user_profiles.viewed(uid) if (row := id_to_row.get(aid)) is not None]
+            keep = vals > min_score
+            if viewed:
+                keep &= ~np.isin(cols, viewed)
+            cols, vals = cols[keep], vals[keep]
+            if len(vals) > top_n:
+                part = np.argpartition(-vals, top_n - 1)[:top_n]
+                cols, vals = cols[part], vals[part]
+            order = np.argsort(-vals)
+            results[uid] = [(int(article_ids[c]), float(v)) for c, v in zip(cols[order], vals[order])]
+    return results
+
+
+def store_recommendations(db, results):
+    """ Ghi kết quả recommend_batch vào bảng recommendations (thay thế kết quả cũ của các user này) """
+    from database import RecommendationDB
+
+    user_ids = list(results.keys())
+    for start in range(0, len(user_ids), 1000):
+        db.query(RecommendationDB).filter(RecommendationDB.user_id.in_(user_ids[start:start + 1000])) \
+            .delete(synchronize_session=False)
+    db.bulk_insert_mappings(RecommendationDB, [
+        {"user_id": uid, "article_id": aid, "rank": rank, "score": score}
+        for uid, recs in results.items() for rank, (aid, score) in enumerate(recs)
+    ])
+    db.commit()
+
+
+def users_without_profile(user_ids):
+    """
+    Các user cần dựng hồ sơ từ lịch sử: chưa có hồ sơ, hoặc hồ sơ nạp từ đĩa chưa đối chiếu với DB
+    (lượt xem sau lần ghi cuối bị mất nếu server dừng đột ngột). Nạp hồ sơ từ đĩa ở lần gọi đầu.
+    """
+    user_profiles.load()
+    with user_profiles.lock:
+        return [uid for uid in user_ids if not user_profiles.has(uid) or uid in user_profiles.unverified]
+
+
+def rebuild_user_profile(user_id: int, history) -> bool:
+    """
+    Dựng hồ sơ từ lịch sử [(article_id, timestamp)] đã sắp theo thời gian (bài đã có trong hồ sơ được bỏ qua,
+    nên gọi lại trên hồ sơ nạp từ đĩa chỉ cộng thêm các lượt xem bị thiếu).
+    False (không lưu gì) nếu chỉ mục chưa nạp hoặc chưa có bài mới hơn bài cuối đã index:
+    người gọi đồng bộ chỉ mục rồi gọi lại. Bài cũ hơn mà không có trong chỉ mục = đã bị xóa, bỏ qua.
+    """
+    with article_index.lock:
+        if not article_index.loaded:
+            return False
+        last_id = article_index.last_article_id()
+        if any(aid > last_id and aid not in article_index.id_to_row for aid, _ in history):
+            return False
+    for article_id, ts in history:
+        user_profiles.add_view(user_id, article_id, ts.timestamp() if ts else None)
+    user_profiles.touch(user_id)
+    return True
+
+
+def ensure_user_profile(db, user_id: int):
+    """ User chưa có hồ sơ (dữ liệu cũ) -> dựng lại 1 lần từ InteractionDB """
+    from database import InteractionDB
+
+    if not users_without_profile([user_id]):
+        return
+    history = db.query(InteractionDB.article_id, InteractionDB.timestamp) \
+        .filter(InteractionDB.user_id == user_id).order_by(InteractionDB.timestamp).all()
+    if not rebuild_user_profile(user_id, history):
+        sync_index_from_db(db)
+        rebuild_user_profile(user_id, history)
+
+
+# === ĐỒNG BỘ VỚI DATABASE ===
+def sync_index_from_db(db):
+    """ Nạp chỉ mục (đĩa hoặc build mới), sau đó thêm các bài có id lớn hơn bài cuối đã index """
+    from database import ArticleDB
+
+    if not article_index.loaded and not article_index.load():
+        rows = db.query(ArticleDB.id, ArticleDB.title, ArticleDB.content).all()
+        article_index.build(rows)
+        article_index.save()
+        print(f"[RecommendIndex] Đã xây chỉ mục mới với {len(rows)} bài báo.")
+        return len(rows)
+
+    rows = db.query(ArticleDB.id, ArticleDB.title, ArticleDB.content) \
+        .filter(ArticleDB.id > article_index.last_article_id()).all()
+    return article_index.add_articles(rows)
+
+
+# === TÁC VỤ NỀN: TÍNH LẠI IDF ĐỊNH KỲ ===
+_stop_event = threading.Event()
+_worker = None
+
+def _background_loop():
+    from database import SessionLocal
+
+    # Nạp / dựng chỉ mục lần đầu ngay trong thread nền (không chặn server khởi động)
+    db = SessionLocal()
+    try:
+        sync_index_from_db(db)
+    except Exception as e:
+        print(f"[RecommendIndex] Lỗi khởi tạo chỉ mục: {e}")
+    finally:
+        db.close()
+    user_profiles.load()
+
+    # Hồ sơ ghi xuống đĩa thường xuyên (chỉ khi có thay đổi), IDF tính lại thưa hơn
+    last_reweight = time.monotonic()
+    while not _stop_event.wait(min(PROFILE_SAVE_INTERVAL, REWEIGHT_INTERVAL)):
+        try:
+            user_profiles.save()
+        except Exception as e:
+            print(f"[UserProfiles] Lỗi ghi hồ sơ: {e}")
+        if time.monotonic() - last_reweight < REWEIGHT_INTERVAL:
+            continue
+        last_reweight = time.monotonic()
+        db = SessionLocal()
+        try:
+            sync_index_from_db(db)
+            if article_index.dirty:
+                article_index.reweight()
+                article_index.save()
+                print(f"[RecommendIndex] Đã tính lại IDF ({len(article_index.article_ids)} bài).")
+        except Exception as e:
+            print(f"[RecommendIndex] Lỗi cập nhật nền: {e}")
+        finally:
+            db.close()
+
+def start_background_worker():
+    global _worker
+    if _worker is not None:
+        return
+    _stop_event.clear()
+    _worker = threading.Thread(target=_background_loop, name="recommend-index", daemon=True)
+    _worker.start()
+
+def stop_background_worker():
+    global _worker
+    _stop_event.set()
+    if _worker is not None:
+        _worker.join(timeout=5)
+        _worker = None
+    if article_index.loaded:
+        article_index.save()
+    user_profiles.save()
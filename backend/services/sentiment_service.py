@@ -0,0 +1,336 @@
+# backend/services/sentiment_service.py
+import os
+import re
+import json
+import time
+import hashlib
+import unicodedata
+import queue
+import asyncio
+import threading
+from collections import Counter, deque
+
+from utils.cache import LRUCache, SqliteStore
+
+# --- 1. TẢI MÔ HÌNH AI (CHẠY OFFLINE) ---
+# Không tải lúc import: server khởi động ngay, model được nạp bởi tác vụ warm-up nền (main.py)
+# hoặc lần dùng đầu tiên. sentiment_analyzer = None cho tới khi nạp xong.
+LOCAL_MODEL_PATH = os.path.join(os.path.dirname(__file__), "..", "local_model")
+# torch: pipeline transformers (mặc định) | onnx: ONNX Runtime int8 cho máy chỉ có CPU (services/onnx_sentiment.py)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch").lower()
+sentiment_analyzer = None
+model_state = {"status": "not_loaded", "error": None, "load_seconds": None,  # not_loaded | loading | ready | error
+               "backend": SENTIMENT_BACKEND}
+_load_lock = threading.Lock()
+
+def load_model():
+    """ Nạp pipeline (blocking, gọi trong thread). Gọi nhiều lần / song song chỉ nạp 1 lần. Trả về pipeline hoặc None. """
+    global sentiment_analyzer
+    with _load_lock:
+        if sentiment_analyzer is not None or model_state["status"] == "error":
+            return sentiment_analyzer
+        if not os.path.exists(LOCAL_MODEL_PATH):
+            print(f"!!! CẢNH BÁO: Không tìm thấy thư mục '{LOCAL_MODEL_PATH}'.")
+            model_state.update(status="error", error="Không tìm thấy thư mục local_model")
+            return None
+        model_state["status"] = "loading"
+        start = time.perf_counter()
+        try:
+            print(f"[Analytics] Đang tải mô hình ({SENTIMENT_BACKEND}) từ: {LOCAL_MODEL_PATH}...")
+            weights_revision()  # Hash file model ngay trong thread nạp, trước khi báo "ready"
+            if SENTIMENT_BACKEND == "onnx":
+                from services.onnx_sentiment import load_onnx_pipeline
+                sentiment_analyzer = load_onnx_pipeline(LOCAL_MODEL_PATH, weights_revision())
+            else:
+                from transformers import pipeline  # Import nặng (torch) -> chỉ khi nạp model
+                sentiment_analyzer = pipeline("sentiment-analysis", model=LOCAL_MODEL_PATH)
+            model_state.update(status="ready", load_seconds=round(time.perf_counter() - start, 2))
+            print(f"[Analytics] Mô hình cảm xúc đã sẵn sàng! ({model_state['load_seconds']}s)")
+        except Exception as e:
+            model_state.update(status="error", error=str(e))
+            print(f"!!! LỖI TẢI MODEL: {e}")
+        return sentiment_analyzer
+
+async def warm_up():
+    """ Nạp model + chạy thử 1 câu trong thread nền (lần gọi thật đầu tiên không phải chờ) """
+    analyzer = await asyncio.to_thread(load_model)
+    if analyzer is not None:
+        await asyncio.to_thread(analyzer, ["khởi động"], truncation=True)
+
+def map_label(label: str) -> str:
+    """ POS/NEG/NEU của model -> nhãn tiếng Việt trả về Frontend """
+    label = label.upper()
+    if label == "POS": return "Tích cực"
+    if label == "NEG": return "Tiêu cực"
+    return "Trung lập"
+
+
+# --- 2. HÀNG ĐỢI GOM LÔ (DYNAMIC MICRO-BATCHING) ---
+MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("SENTIMENT_MAX_WAIT_MS", "10"))
+
+class BatchingInferenceQueue:
+    """
+    Gom văn bản từ nhiều request đồng thời thành 1 lô (tối đa max_batch_size văn bản hoặc chờ
+    tối đa max_wait_ms), chạy model trên 1 thread riêng rồi trả kết quả về future của từng request.
+    Event loop không bị chặn trong lúc model chạy.
+    """
+
+    def __init__(self, infer_fn, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS, name: str = "sentiment"):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._carry = None  # Phần tử lấy ra nhưng không vừa lô trước -> mở đầu lô sau (chỉ thread worker dùng)
+        self._thread = None
+        self._lock = threading.Lock()
+        # --- Metrics ---
+        self.pending_texts = 0
+        self.batches_total = 0
+        self.texts_total = 0
+        self.batch_sizes = Counter()
+        self.latencies = deque(maxlen=1000)  # Thời gian từ lúc vào hàng đợi tới lúc có kết quả (giây)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    async def submit(self, texts):
+        """ Gửi danh sách văn bản, trả về list kết quả đúng thứ tự """
+        if not texts:
+            return []
+        self.start()
+        loop = asyncio.get_running_loop()
+        futures = []
+        # Request lớn được chia nhỏ để xen kẽ với các request khác
+        for i in range(0, len(texts), self.max_batch_size):
+            chunk = list(texts[i:i + self.max_batch_size])
+            fut = loop.create_future()
+            with self._lock:
+                self.pending_texts += len(chunk)
+            self._queue.put((chunk, fut, loop, time.perf_counter()))
+            futures.append(fut)
+        results = []
+        for part in await asyncio.gather(*futures):
+            results.extend(part)
+        return results
+
+    def _collect(self, first):
+        batch, size = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Để vòng lặp chính nhận tín hiệu dừng
+                break
+            if size + len(item[0]) > self.max_batch_size:
+                self._carry = item  # Không vượt max_batch_size: để dành cho lô sau (giữ thứ tự)
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch, size
+
+    def _worker(self):
+        while True:
+            first, self._carry = self._carry or self._queue.get(), None
+            if first is None:
+                return
+            batch, size = self._collect(first)
+            texts = [t for item in batch for t in item[0]]
+            with self._lock:
+                self.pending_texts -= size
+            try:
+                outputs = self.infer_fn(texts)
+                error = None
+            except Exception as e:
+                outputs, error = None, e
+
+            done = time.perf_counter()
+            with self._lock:
+                self.batches_total += 1
+                self.texts_total += size
+                self.batch_sizes[size] += 1
+                self.latencies.extend(done - item[3] for item in batch)
+
+            offset = 0
+            for chunk, fut, loop, _ in batch:
+                if error is not None:
+                    loop.call_soon_threadsafe(_set_exception, fut, error)
+                else:
+                    loop.call_soon_threadsafe(_set_result, fut, outputs[offset:offset + len(chunk)])
+                offset += len(chunk)
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            sizes = dict(sorted(self.batch_sizes.items()))
+            pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else 0.0
+            return {
+                "queue_depth": self.pending_texts,
+                "batches_total": self.batches_total,
+                "texts_total": self.texts_total,
+                "avg_batch_size": round(self.texts_total / self.batches_total, 2) if self.batches_total else 0.0,
+                "batch_size_histogram": sizes,
+                "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99)},
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+def _set_result(fut, value):
+    if not fut.done(): fut.set_result(value)
+
+def _set_exception(fut, error):
+    if not fut.done(): fut.set_exception(error)
+
+
+def _run_sentiment(texts):
+    analyzer = sentiment_analyzer or load_model()
+    # batch_size = cả lô -> 1 forward pass chung cho mọi request trong lô
+    return analyzer(texts, truncation=True, batch_size=len(texts))
+
+sentiment_queue = BatchingInferenceQueue(_run_sentiment)
+
+
+# --- 3. CACHE KẾT QUẢ THEO HASH NỘI DUNG ---
+CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "20000"))
+# Đặt SENTIMENT_CACHE_PATH="" để tắt lưu xuống đĩa
+CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "cache_data", "sentiment_cache.sqlite"))
+
+# Config, trọng số và tokenizer: đổi nội dung file nào cũng đổi revision
+MODEL_FILES = ("config.json", "model.safetensors", "pytorch_model.bin", "tokenizer.json", "tokenizer_config.json",
+               "special_tokens_map.json", "sentencepiece.bpe.model", "vocab.txt", "bpe.codes")
+# sha256 đã tính của từng file, nhớ theo (kích thước, mtime): file trọng số lớn chỉ đọc lại khi bị thay
+DIGEST_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "cache_data", "model_digests.json")
+
+def _file_sha256(path: str) -> str:
+    """ sha256 nội dung file (đọc từng khối 1 MB) """
+    stat = os.stat(path)
+    key, stamp = os.path.abspath(path), [stat.st_size, stat.st_mtime_ns]
+    try:
+        with open(DIGEST_CACHE_PATH, encoding="utf-8") as f:
+            known = json.load(f)
+    except (OSError, ValueError):
+        known = {}
+    if known.get(key, {}).get("stamp") == stamp:
+        return known[key]["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    known[key] = {"stamp": stamp, "sha256": digest.hexdigest()}
+    try:
+        os.makedirs(os.path.dirname(DIGEST_CACHE_PATH), exist_ok=True)
+        tmp = DIGEST_CACHE_PATH + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(known, f)
+        os.replace(tmp, DIGEST_CACHE_PATH)
+    except OSError as e:
+        print(f"[Analytics] Không lưu được hash model: {e}")
+    return known[key]["sha256"]
+
+def _model_revision() -> str:
+    """ Đổi model (config / trọng số / tokenizer) -> đổi revision -> cache cũ tự mất hiệu lực """
+    digest = hashlib.sha256()
+    for name in MODEL_FILES:
+        path = os.path.join(LOCAL_MODEL_PATH, name)
+        if os.path.exists(path):
+            digest.update(f"{name}:{_file_sha256(path)}\0".encode())
+    return digest.hexdigest()[:16]
+
+# Revision tính lười 1 lần (lần đầu phải đọc hết file trọng số ~1 GB): load_model gọi trong thread nạp,
+# import module không tốn gì
+_revisions = {}  # "weights" / "model" -> revision
+_revision_lock = threading.Lock()
+
+def weights_revision() -> str:
+    """ Revision của file model (blocking lần đầu) """
+    with _revision_lock:
+        if "weights" not in _revisions:
+            weights = _model_revision()
+            # Backend int8 cho điểm lệch chút ít so với PyTorch -> cache / cột sentiment_model tách riêng theo backend
+            _revisions["model"] = weights if SENTIMENT_BACKEND == "torch" else \
+                hashlib.sha256(f"{weights}:{SENTIMENT_BACKEND}".encode()).hexdigest()[:16]
+            _revisions["weights"] = weights
+        return _revisions["weights"]
+
+def model_revision() -> str:
+    """ Revision ghi vào cache / cột sentiment_model (blocking lần đầu) """
+    weights_revision()
+    return _revisions["model"]
+
+async def current_model_revision() -> str:
+    """ model_revision() cho code async: chưa qua load_model thì hash file model ngoài event loop """
+    return _revisions.get("model") or await asyncio.to_thread(model_revision)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+def cache_key(text: str) -> str:
+    return hashlib.sha256(f"{model_revision()}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+sentiment_cache = LRUCache(CACHE_SIZE)
+sentiment_store = None
+if CACHE_PATH:
+    try:
+        sentiment_store = SqliteStore(CACHE_PATH, table="sentiment")
+    except Exception as e:
+        print(f"[Analytics] Không mở được cache cảm xúc trên đĩa: {e}")
+
+async def analyze_sentiment(texts):
+    """
+    Phân tích cảm xúc qua cache + hàng đợi gom lô. Trả về list {"label", "score"} với nhãn tiếng Việt.
+    Văn bản trùng nhau trong cùng request chỉ được chấm 1 lần rồi trả về đúng vị trí.
+    """
+    await current_model_revision()
+    keys = [cache_key(t) for t in texts]
+    raw = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        hit = sentiment_cache.get(key)
+        if hit is not None: raw[key] = hit
+        else: missing.append(key)
+
+    # Cache trên đĩa (sqlite): đọc / ghi trong thread, không chặn event loop
+    if missing and sentiment_store is not None:
+        for key, value in (await asyncio.to_thread(sentiment_store.get_many, missing)).items():
+            raw[key] = value
+            sentiment_cache.set(key, value)
+        missing = [k for k in missing if k not in raw]
+
+    if missing:
+        first_text = {}
+        for key, text in zip(keys, texts):
+            first_text.setdefault(key, text)
+        results = await sentiment_queue.submit([first_text[k] for k in missing])
+        new_items = [(k, {"label": res["label"], "score": float(res["score"])}) for k, res in zip(missing, results)]
+        for key, value in new_items:
+            raw[key] = value
+            sentiment_cache.set(key, value)
+        if sentiment_store is not None:
+            await asyncio.to_thread(sentiment_store.set_many, new_items)
+
+    return [{"label": map_label(raw[k]["label"]), "score": raw[k]["score"]} for k in keys]
+
+def cache_metrics():
+    stats = sentiment_cache.stats()
+    stats["model_revision"] = _revisions.get("model")  # None cho tới khi model được nạp
+    stats["backend"] = SENTIMENT_BACKEND
+    stats["disk_store"] = bool(sentiment_store)
+    return stats
@@ -0,0 +1,152 @@
+# backend/services/stability_service.py
+import os
+import json
+import random
+import asyncio
+import hashlib
+
+import httpx
+from dotenv import load_dotenv
+
+# --- CẤU HÌNH ---
+load_dotenv()
+STABILITY_API_KEY = os.getenv("STABILITY_API_KEY")
+STABILITY_BASE_URL = os.getenv("STABILITY_BASE_URL", "https://api.stability.ai")  # Trỏ sang fake_stability_server.py khi test
+MAX_CONCURRENCY = int(os.getenv("STABILITY_MAX_CONCURRENCY", "4"))   # Số request tới Stability chạy song song tối đa
+MAX_RETRIES = int(os.getenv("STABILITY_MAX_RETRIES", "3"))           # Số lần thử lại khi gặp 429 / 5xx / lỗi mạng
+BACKOFF_BASE = float(os.getenv("STABILITY_BACKOFF", "0.5"))          # Giây chờ lần thử lại đầu (nhân đôi mỗi lần)
+TIMEOUT = float(os.getenv("STABILITY_TIMEOUT", "60"))
+
+ENGINE_PATH = "/v1/generation/stable-diffusion-xl-1024-v1-0"
+UPSCALE_PATH = "/v1/generation/esrgan-v1-x2plus/image-to-image/upscale"
+
+
+class StabilityError(Exception):
+    def __init__(self, status_code: int, detail):
+        super().__init__(f"Stability API {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+# === CLIENT ASYNC DÙNG CHUNG (KEEP-ALIVE, GIỚI HẠN SONG SONG, THỬ LẠI, GỘP REQUEST TRÙNG) ===
+class StabilityClient:
+    """
+    - 1 httpx.AsyncClient dùng chung: giữ kết nối keep-alive giữa các request.
+    - asyncio.Semaphore giới hạn số request đang gửi tới Stability.
+    - 429 / 5xx / lỗi mạng: thử lại với backoff lũy thừa (+ jitter, tôn trọng Retry-After).
+    - Request giống hệt nhau đang chạy -> các request sau chờ chung kết quả, không gửi lại.
+    """
+
+    def __init__(self, base_url: str = STABILITY_BASE_URL, max_concurrency: int = MAX_CONCURRENCY,
+                 max_retries: int = MAX_RETRIES, backoff_base: float = BACKOFF_BASE, timeout: float = TIMEOUT):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self._client = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight = {}
+        self.requests = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            )
+        return self._client
+
+    @staticmethod
+    def _payload_key(path: str, json_body=None, data=None, files=None) -> str:
+        digest = hashlib.sha256(path.encode())
+        digest.update(json.dumps([json_body, data], sort_keys=True, ensure_ascii=False).encode())
+        for name, (_, content, _) in sorted((files or {}).items()):
+            digest.update(name.encode() + hashlib.sha256(content).digest())
+        return digest.hexdigest()
+
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.replace(".", "", 1).isdigit():
+            return float(retry_after)
+        return self.backoff_base * (2 ** attempt) * (0.5 + random.random())
+
+    async def _send(self, path: str, json_body=None, data=None, files=None) -> bytes:
+        if not STABILITY_API_KEY:
+            raise StabilityError(503, "STABILITY_API_KEY thiếu.")
+        headers = {"Authorization": f"Bearer {STABILITY_API_KEY}", "Accept": "image/png"}
+        client = self._get_client()
+        attempt = 0
+        while True:
+            response = None
+            async with self._semaphore:
+                self.requests += 1
+                try:
+                    response = await client.post(path, headers=headers, json=json_body, data=data, files=files)
+                except httpx.TransportError as e:
+                    error = e
+                else:
+                    if response.is_success:
+                        return response.content
+                    error = None
+            retryable = response is None or response.status_code == 429 or response.status_code >= 500
+            if not retryable or attempt >= self.max_retries:
+                self.errors += 1
+                if response is None:
+                    raise StabilityError(502, f"Lỗi kết nối Stability: {error}")
+                try: detail = response.json()
+                except ValueError: detail = response.text
+                raise StabilityError(response.status_code, detail)
+            delay = self._retry_delay(attempt, response)
+            print(f"[Stability] Thử lại lần {attempt + 1} sau {delay:.1f}s "
+                  f"({response.status_code if response is not None else error})")
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _post(self, path: str, json_body=None, data=None, files=None) -> bytes:
+        key = self._payload_key(path, json_body, data, files)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._send(path, json_body, data, files))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: 1 client hủy request không làm hủy kết quả dùng chung của các client khác
+        return await asyncio.shield(task)
+
+    # --- Các API của Stability (trả về bytes PNG) ---
+    async def text_to_image(self, prompt: str, negative_prompt: str = "", style_preset: str = ""):
+        text_prompts = [{"text": prompt, "weight": 1.0}]
+        if negative_prompt: text_prompts.append({"text": negative_prompt, "weight": -1.0})
+        payload = {"text_prompts": text_prompts, "cfg_scale": 7, "height": 1024, "width": 1024, "samples": 1, "steps": 30}
+        if style_preset: payload["style_preset"] = style_preset
+        return await self._post(f"{ENGINE_PATH}/text-to-image", json_body=payload)
+
+    async def image_to_image(self, prompt: str, negative_prompt: str, init_image: bytes, strength: float):
+        data = {"text_prompts[0][text]": prompt, "text_prompts[0][weight]": "1.0", "image_strength": str(strength),
+                "cfg_scale": "7.0", "samples": "1", "steps": "30"}
+        if negative_prompt:
+            data.update({"text_prompts[1][text]": negative_prompt, "text_prompts[1][weight]": "-1.0"})
+        files = {"init_image": ("init_image.png", init_image, "image/png")}
+        return await self._post(f"{ENGINE_PATH}/image-to-image", data=data, files=files)
+
+    async def upscale(self, image: bytes):
+        return await self._post(UPSCALE_PATH, files={"image": ("image.png", image, "image/png")})
+
+    def stats(self):
+        return {"max_concurrency": self.max_concurrency, "in_flight": len(self._inflight), "requests": self.requests,
+                "retries": self.retries, "coalesced": self.coalesced, "errors": self.errors}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+stability_client = StabilityClient()
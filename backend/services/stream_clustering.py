@@ -0,0 +1,121 @@
+# backend/services/stream_clustering.py
+import io
+import csv
+import math
+from functools import lru_cache
+from collections import Counter
+
+# --- CẤU HÌNH ---
+DEFAULT_COLUMN = "BinhLuan"          # Cột bình luận của file do generate_data.py sinh ra
+DEFAULT_CHUNK_SIZE = 2000            # Số dòng vector hóa / partial_fit mỗi lần
+MAX_CHUNK_SIZE = 20000               # Chunk giữ trọn trong RAM (văn bản + ma trận TF-IDF)
+MAX_PHRASES_PER_CLUSTER = 5000       # Giới hạn số cụm từ giữ lại cho mỗi nhóm (bộ nhớ cố định)
+
+@lru_cache(maxsize=1)
+def _vectorizers():
+    """ sklearn chỉ được import khi gom cụm lần đầu (import nặng, làm chậm khởi động server) """
+    from sklearn.feature_extraction.text import HashingVectorizer, CountVectorizer
+    # Hashing vectorizer không có trạng thái (không cần fit) -> dùng chung an toàn, vector hóa từng chunk
+    hashing_vectorizer = HashingVectorizer(n_features=2**18, alternate_sign=False, norm="l2")
+    # Chỉ dùng bộ tách cụm 2-3 từ (hàm thuần), không fit
+    phrase_analyzer = CountVectorizer(ngram_range=(2, 3)).build_analyzer()
+    return hashing_vectorizer, phrase_analyzer
+
+
+class MissingColumnError(ValueError):
+    """ File CSV không có cột được yêu cầu """
+
+    def __init__(self, column: str, header):
+        self.column, self.header = column, list(header)
+        super().__init__(f"Không tìm thấy cột '{column}' trong file CSV. Các cột có: {', '.join(self.header)}")
+
+
+def iter_csv_chunks(fileobj, column: str = DEFAULT_COLUMN, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """ Đọc file CSV (utf-8 / utf-8-sig) theo từng chunk văn bản của 1 cột. Không có cột -> MissingColumnError """
+    text_stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text_stream)
+        header = next(reader, None)
+        if header is None:
+            return
+        if column not in header:
+            raise MissingColumnError(column, header)
+        col = header.index(column)
+        chunk = []
+        for row in reader:
+            if len(row) > col and row[col].strip():
+                chunk.append(row[col])
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        text_stream.detach()  # Không đóng file gốc (còn đọc lượt 2)
+
+
+def _prune(counter: Counter, limit: int):
+    """ Giữ lại `limit` cụm từ phổ biến nhất khi bộ đếm phình quá 2 lần giới hạn """
+    if len(counter) > 2 * limit:
+        kept = counter.most_common(limit)
+        counter.clear()
+        counter.update(dict(kept))
+
+
+# === GOM CỤM DẠNG STREAMING (FILE LỚN, BỘ NHỚ CỐ ĐỊNH) ===
+def cluster_csv_stream(fileobj, num_clusters: int = 4, column: str = DEFAULT_COLUMN,
+                       chunk_size: int = DEFAULT_CHUNK_SIZE, top_k: int = 10):
+    """
+    Lượt 1: vector hóa từng chunk bằng HashingVectorizer + MiniBatchKMeans.partial_fit.
+    Lượt 2: gán nhãn từng chunk, cộng dồn số lần xuất hiện cụm 2-3 từ theo từng nhóm.
+    Cụm từ đặc trưng = tần suất trong nhóm x độ hiếm giữa các nhóm (c-TF-IDF).
+    fileobj phải seek được (UploadFile.file là SpooledTemporaryFile).
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    hashing_vectorizer, phrase_analyzer = _vectorizers()
+    kmeans = MiniBatchKMeans(n_clusters=num_clusters, random_state=42, batch_size=chunk_size, n_init=3)
+    total = 0
+    pending = []
+    for chunk in iter_csv_chunks(fileobj, column, chunk_size):
+        pending.extend(chunk)
+        if len(pending) < num_clusters:  # partial_fit lần đầu cần >= num_clusters mẫu
+            continue
+        kmeans.partial_fit(hashing_vectorizer.transform(pending))
+        total += len(pending)
+        pending = []
+    if pending and total:
+        kmeans.partial_fit(hashing_vectorizer.transform(pending))
+        total += len(pending)
+    if total < num_clusters:
+        return None
+
+    fileobj.seek(0)
+    phrase_counts = [Counter() for _ in range(num_clusters)]
+    sizes = [0] * num_clusters
+    for chunk in iter_csv_chunks(fileobj, column, chunk_size):
+        labels = kmeans.predict(hashing_vectorizer.transform(chunk))
+        for text, label in zip(chunk, labels):
+            sizes[label] += 1
+            phrase_counts[label].update(phrase_analyzer(text))
+        for counter in phrase_counts:
+            _prune(counter, MAX_PHRASES_PER_CLUSTER)
+
+    # Số nhóm chứa mỗi cụm từ -> cụm từ xuất hiện ở mọi nhóm bị giảm điểm
+    cluster_freq = Counter()
+    for counter in phrase_counts:
+        cluster_freq.update(counter.keys())
+
+    clusters = {}
+    for i, counter in enumerate(phrase_counts):
+        n_phrases = sum(counter.values()) or 1
+        scored = [(phrase, (count / n_phrases) * math.log(1 + num_clusters / cluster_freq[phrase]))
+                  for phrase, count in counter.items()]
+        top = sorted(scored, key=lambda x: x[1], reverse=True)[:top_k]
+        clusters[f"Nhóm {i+1}"] = [p for p, _ in top] or ["(Dữ liệu ít)"]
+
+    return {
+        "clusters": clusters,
+        "sizes": {f"Nhóm {i+1}": sizes[i] for i in range(num_clusters)},
+        "total": total
+    }
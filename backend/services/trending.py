@@ -0,0 +1,128 @@
+# backend/services/trending.py
+import os
+import math
+import asyncio
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+
+from database import TopicTrendDB
+from services.keyphrase import iter_phrases
+
+# --- CẤU HÌNH ---
+BUCKET = timedelta(hours=1)                                                   # Độ rộng 1 bucket
+MAX_PHRASES_PER_ARTICLE = int(os.getenv("TREND_MAX_PHRASES_PER_ARTICLE", "200"))  # Giới hạn số dòng ghi mỗi bài
+MAX_CANDIDATES = 1000                                                         # Số cụm từ (nhiều nhất trong cửa sổ) đem so sánh
+PHRASE_MAX_LENGTH = 255                                                       # = độ dài cột phrase
+
+
+def hour_bucket(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def article_phrases(title, content):
+    """ Tập cụm 2-3 từ của 1 bài (mỗi cụm tính 1 lần / bài), giữ các cụm lặp nhiều nhất """
+    tf = Counter(p for p in iter_phrases(f"{title or ''}. {content or ''}") if len(p) <= PHRASE_MAX_LENGTH)
+    return [p for p, _ in tf.most_common(MAX_PHRASES_PER_ARTICLE)]
+
+
+def _upsert(dialect_name: str):
+    """ INSERT ... cộng dồn count nếu (bucket, category, phrase) đã có, theo từng loại DB """
+    table = TopicTrendDB.__table__
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(count=table.c.count + stmt.inserted["count"])
+    if dialect_name in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect_name == "sqlite" else postgresql).insert(table)
+        return stmt.on_conflict_do_update(index_elements=["bucket", "category", "phrase"],
+                                          set_={"count": table.c.count + stmt.excluded["count"]})
+    return None
+
+
+# === CẬP NHẬT CHỈ MỤC KHI INGEST ===
+def record_article_phrases(db, articles, ingested_at: datetime = None):
+    """
+    articles: list (category, title, content) của bài MỚI ingest.
+    Cộng số bài chứa từng cụm từ vào bucket giờ hiện tại, trong transaction của người gọi (không commit).
+    """
+    bucket = hour_bucket(ingested_at or datetime.utcnow())
+    counts = Counter()
+    for category, title, content in articles:
+        counts.update((category or "", p) for p in article_phrases(title, content))
+    if not counts:
+        return 0
+    rows = [{"bucket": bucket, "category": c, "phrase": p, "count": n} for (c, p), n in counts.items()]
+
+    stmt = _upsert(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, rows)
+    else:
+        for row in rows:
+            trend = db.query(TopicTrendDB).filter_by(bucket=row["bucket"], category=row["category"],
+                                                     phrase=row["phrase"]).first()
+            if trend:
+                trend.count += row["count"]
+            else:
+                db.add(TopicTrendDB(**row))
+    return len(rows)
+
+
+# === TRUY VẤN CỤM TỪ ĐANG TĂNG (CHỈ CỘNG SỐ ĐẾM CÁC BUCKET, KHÔNG ĐỌC LẠI NỘI DUNG BÀI) ===
+def _window_counts(start, end, category=None, phrases=None):
+    table = TopicTrendDB.__table__
+    total = func.sum(table.c.count).label("total")
+    q = select(table.c.phrase, total).where(table.c.bucket >= start, table.c.bucket < end)
+    if category is not None:
+        q = q.where(table.c.category == category)
+    if phrases is not None:
+        q = q.where(table.c.phrase.in_(phrases))
+    return q.group_by(table.c.phrase), total
+
+
+def _aligned_window(start: datetime, end: datetime):
+    return hour_bucket(start), hour_bucket(end - timedelta(microseconds=1)) + BUCKET
+
+
+def _current_query(start, end, category, min_count):
+    q, total = _window_counts(start, end, category)
+    return q.having(total >= min_count).order_by(total.desc()).limit(MAX_CANDIDATES)
+
+
+def rank_rising(current, previous, top_k: int):
+    """
+    current: [(cụm từ, count)] của cửa sổ hiện tại, previous: {cụm từ: count} của cửa sổ liền trước.
+    Điểm = (count - previous) / sqrt(previous + 1): ưu tiên cụm từ tăng nhiều so với mức nền của chính nó.
+    """
+    rising = []
+    for phrase, count in current:
+        prev = int(previous.get(phrase, 0))
+        count = int(count)
+        if count > prev:
+            rising.append({"text": phrase, "count": count, "previous": prev,
+                           "score": round((count - prev) / math.sqrt(prev + 1), 3)})
+    rising.sort(key=lambda x: (x["score"], x["count"]), reverse=True)
+    return rising[:top_k]
+
+
+def top_rising(db, start: datetime, end: datetime, category: str = None, top_k: int = 20, min_count: int = 2):
+    """ So sánh cửa sổ [start, end) với cửa sổ liền trước cùng độ dài (session sync) """
+    start, end = _aligned_window(start, end)
+    current = db.execute(_current_query(start, end, category, min_count)).all()
+    if not current:
+        return {"start": start, "end": end, "topics": []}
+    q, _ = _window_counts(start - (end - start), start, category, [p for p, _ in current])
+    previous = dict(db.execute(q).all())
+    return {"start": start, "end": end, "topics": rank_rising(current, previous, top_k)}
+
+
+async def top_rising_async(db, start: datetime, end: datetime, category: str = None, top_k: int = 20, min_count: int = 2):
+    """ Như top_rising trên AsyncSession: truy vấn await, xếp hạng chạy trong thread (không chặn event loop) """
+    start, end = _aligned_window(start, end)
+    current = (await db.execute(_current_query(start, end, category, min_count))).all()
+    if not current:
+        return {"start": start, "end": end, "topics": []}
+    q, _ = _window_counts(start - (end - start), start, category, [p for p, _ in current])
+    previous = dict((await db.execute(q)).all())
+    return {"start": start, "end": end, "topics": await asyncio.to_thread(rank_rising, current, previous, top_k)}
@@ -0,0 +1,81 @@
+# backend/services/url_cache.py
+import os
+import time
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from utils.cache import LRUCache
+
+# --- CẤU HÌNH ---
+URL_CACHE_TTL = float(os.getenv("URL_CACHE_TTL", "600"))       # Giây coi kết quả là mới, không cần hỏi lại server
+URL_CACHE_SIZE = int(os.getenv("URL_CACHE_SIZE", "2000"))
+
+# Tham số tracking không làm đổi nội dung trang
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "zarsrc", "zalo_")
+
+
+def normalize_url(url: str) -> str:
+    """ Chuẩn hóa URL: bỏ fragment, bỏ tham số tracking, sắp xếp query, hạ chữ thường host """
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith(_TRACKING_PARAMS))
+    path = parts.path or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+def page_key(url: str, mode: str) -> str:
+    """ Key của 1 trang trong cache: URL chuẩn hóa + chế độ phân tích (mỗi chế độ trả về kết quả khác nhau) """
+    return f"{normalize_url(url)}#{mode}"
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# === CACHE KẾT QUẢ /analytics/url ===
+class UrlResultCache:
+    """
+    2 tầng:
+    - URL chuẩn hóa -> {content_hash, etag, last_modified, fetched_at, fetch_tier}
+    - content_hash  -> kết quả phân tích (sentiment + topics + content)
+    Trang còn trong TTL được trả ngay; hết TTL thì hỏi lại server bằng ETag / Last-Modified,
+    nội dung không đổi (304 hoặc cùng hash) thì dùng lại kết quả, không chạy model.
+    """
+
+    def __init__(self, ttl: float = URL_CACHE_TTL, max_size: int = URL_CACHE_SIZE):
+        self.ttl = ttl
+        self.pages = LRUCache(max_size)
+        self.results = LRUCache(max_size)
+
+    def lookup(self, url: str):
+        """ (entry, result). result != None nếu đã có kết quả cho nội dung hiện tại của URL """
+        entry = self.pages.get(url)
+        if entry is None:
+            return None, None
+        return entry, self.results.get(entry["content_hash"])
+
+    def is_fresh(self, entry) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def touch(self, url: str, entry, etag=None, last_modified=None):
+        """ Server xác nhận nội dung không đổi -> gia hạn TTL """
+        entry = dict(entry, fetched_at=time.time())
+        if etag: entry["etag"] = etag
+        if last_modified: entry["last_modified"] = last_modified
+        self.pages.set(url, entry)
+
+    def result_for_content(self, digest: str):
+        return self.results.get(digest)
+
+    def store(self, url: str, digest: str, result, fetch_tier: str, etag=None, last_modified=None):
+        self.results.set(digest, result)
+        self.pages.set(url, {
+            "content_hash": digest, "etag": etag, "last_modified": last_modified,
+            "fetched_at": time.time(), "fetch_tier": fetch_tier,
+        })
+
+    def stats(self):
+        return {"ttl": self.ttl, "pages": self.pages.stats(), "results": self.results.stats()}
+
+
+url_cache = UrlResultCache()
@@ -0,0 +1,205 @@
+# backend/services/view_buffer.py
+import os
+import time
+import threading
+from datetime import datetime
+
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+from sqlalchemy.exc import IntegrityError, DataError
+
+from database import SessionLocal, InteractionDB, RecommendationDB
+
+# --- CẤU HÌNH ---
+FLUSH_SIZE = int(os.getenv("VIEW_BUFFER_FLUSH_SIZE", "500"))             # Đủ số lượt xem này -> ghi ngay
+FLUSH_INTERVAL = float(os.getenv("VIEW_BUFFER_FLUSH_INTERVAL", "1.0"))   # Hoặc sau tối đa N giây
+MAX_PENDING = int(os.getenv("VIEW_BUFFER_MAX_PENDING", "100000"))        # DB lỗi kéo dài -> bỏ lượt xem mới thay vì tràn RAM
+
+# Lỗi do chính dữ liệu (FK tới user / bài không tồn tại, ...): ghi lại lô y hệt vẫn lỗi -> tách lô tìm dòng hỏng
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+def _insert_ignore(dialect_name: str):
+    """ INSERT bỏ qua dòng trùng (user_id, article_id) -> ghi lại 1 lô nhiều lần vẫn không sinh bản ghi trùng """
+    table = InteractionDB.__table__
+    if dialect_name == "mysql":
+        return mysql.insert(table).prefix_with("IGNORE")
+    if dialect_name in ("sqlite", "postgresql"):
+        return (sqlite if dialect_name == "sqlite" else postgresql).insert(table) \
+            .on_conflict_do_nothing(index_elements=["user_id", "article_id"])
+    return None
+
+
+def write_views(views):
+    """ Ghi 1 lô lượt xem {(user_id, article_id): thời điểm xem} + xóa gợi ý tính sẵn của các user liên quan (1 transaction) """
+    rows = [{"user_id": u, "article_id": a, "timestamp": ts} for (u, a), ts in views.items()]
+    user_ids = {u for u, _ in views}
+    db = SessionLocal()
+    try:
+        stmt = _insert_ignore(db.bind.dialect.name)
+        if stmt is not None:
+            db.execute(stmt, rows)
+        else:
+            # DB khác: kiểm tra từng dòng (chậm hơn nhưng vẫn không trùng)
+            for row in rows:
+                exists = db.query(InteractionDB.id).filter(InteractionDB.user_id == row["user_id"],
+                                                           InteractionDB.article_id == row["article_id"]).first()
+                if not exists:
+                    db.add(InteractionDB(**row))
+        # Gợi ý tính sẵn của các user này không còn đúng nữa
+        db.query(RecommendationDB).filter(RecommendationDB.user_id.in_(user_ids)).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# === BỘ ĐỆM GHI SAU (WRITE-BEHIND) CHO LƯỢT XEM ===
+class ViewBuffer:
+    """
+    /log_view chỉ ghi lượt xem vào bộ nhớ (gộp trùng theo (user, bài)) rồi trả về ngay.
+    Thread nền ghi cả lô xuống DB khi đủ flush_size lượt hoặc sau flush_interval giây.
+    Lô ghi lỗi (mất kết nối, ...) được giữ lại để thử lần sau; lô lỗi do dữ liệu được chia đôi dần
+    tới từng dòng, dòng hỏng bị bỏ (không chặn cả bộ đệm). stop() ghi nốt phần còn lại trước khi tắt server.
+    """
+
+    def __init__(self, write_fn=write_views, flush_size: int = FLUSH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_pending: int = MAX_PENDING):
+        self.write_fn = write_fn
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}      # (user_id, article_id) -> thời điểm xem đầu tiên
+        self._inflight = {}     # Lô đang được ghi (vẫn tính là "chưa có trong DB")
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        # --- Metrics ---
+        self.accepted = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.rejected = 0       # Dòng bị bỏ vì lỗi dữ liệu
+        self.errors = 0
+        self.last_error = None
+        self.last_flush_ms = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._worker, name="view-buffer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        """ Dừng thread nền rồi ghi nốt các lượt xem còn trong bộ đệm """
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        self.flush()
+
+    def add(self, user_id: int, article_id: int) -> bool:
+        """ Ghi nhận 1 lượt xem (không chạm DB). False nếu trùng với lượt đang chờ hoặc bộ đệm đầy. """
+        key = (user_id, article_id)
+        with self._lock:
+            if key in self._pending or key in self._inflight:
+                self.duplicates += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending[key] = datetime.utcnow()
+            self.accepted += 1
+            full = len(self._pending) >= self.flush_size
+        if full:
+            self._wake.set()
+        return True
+
+    def pending_for(self, user_id: int):
+        """ [(article_id, thời điểm xem)] chưa ghi xuống DB của 1 user, mới nhất trước """
+        with self._lock:
+            views = [(a, ts) for (u, a), ts in list(self._inflight.items()) + list(self._pending.items()) if u == user_id]
+        return sorted(views, key=lambda v: v[1], reverse=True)
+
+    def has_pending(self, user_id: int) -> bool:
+        with self._lock:
+            return any(u == user_id for u, _ in list(self._pending) + list(self._inflight))
+
+    def flush(self) -> int:
+        """ Ghi toàn bộ bộ đệm hiện tại thành 1 lô. Trả về số dòng đã gửi xuống DB. """
+        with self._lock:
+            if not self._pending or self._inflight:
+                return 0
+            self._inflight, self._pending = self._pending, {}
+            batch = self._inflight
+        start = time.perf_counter()
+        parts, written, rejected, error = [batch], 0, 0, None
+        while parts:
+            part = parts.pop()
+            try:
+                self.write_fn(part)
+                written += len(part)
+            except ROW_ERRORS as e:
+                if len(part) > 1:
+                    items = list(part.items())
+                    parts += [dict(items[len(items) // 2:]), dict(items[:len(items) // 2])]
+                else:
+                    rejected += 1
+                    error = e
+                    print(f"[ViewBuffer] Bỏ lượt xem {next(iter(part))} (lỗi dữ liệu): {e}")
+            except Exception as e:
+                # Lỗi tạm thời (DB mất kết nối, ...): giữ phần chưa ghi để thử lại lần sau
+                parts.append(part)
+                error = e
+                break
+        unwritten = {key: ts for part in parts for key, ts in part.items()}
+        with self._lock:
+            self._inflight = {}
+            if unwritten:
+                # Trả phần chưa ghi về bộ đệm (lượt xem mới hơn của cùng key không có vì add() đã chặn trùng)
+                self._pending = {**unwritten, **self._pending}
+            if error is not None:
+                self.errors += 1
+                self.last_error = str(error)
+            self.rejected += rejected
+            if written:
+                self.flushes += 1
+                self.rows_written += written
+                self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+        if unwritten:
+            print(f"[ViewBuffer] Lỗi ghi {len(unwritten)} lượt xem, sẽ thử lại: {error}")
+        return written
+
+    def _worker(self):
+        while not self._stopping:
+            self._wake.wait(timeout=self.flush_interval)
+            self._wake.clear()
+            if self._stopping:
+                return
+            self.flush()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending) + len(self._inflight),
+                "accepted": self.accepted,
+                "duplicates": self.duplicates,
+                "dropped": self.dropped,
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "rejected": self.rejected,
+                "avg_batch_size": round(self.rows_written / self.flushes, 2) if self.flushes else 0.0,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "last_flush_ms": self.last_flush_ms,
+                "flush_size": self.flush_size,
+                "flush_interval_s": self.flush_interval,
+            }
+
+
+view_buffer = ViewBuffer()
@@ -0,0 +1,51 @@
+# backend/tests/conftest.py
+# Chạy app trên SQLite (sqlite+aiosqlite), không cần MySQL:  cd backend && python -m pytest -q
+import os
+import tempfile
+
+# Biến môi trường phải có trước khi import database / services (đọc lúc import)
+_TMP_DIR = tempfile.mkdtemp(prefix="mediac_test_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'mediac_test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["RECOMMEND_INDEX_DIR"] = os.path.join(_TMP_DIR, "index_data")
+os.environ["IMAGE_STORE_DIR"] = os.path.join(_TMP_DIR, "image_data")
+os.environ["SENTIMENT_CACHE_PATH"] = ""
+os.environ["GROQ_CACHE_PATH"] = ""
+os.environ["NEWS_TRACKED_KEYWORDS"] = ""
+os.environ["VIEW_BUFFER_FLUSH_INTERVAL"] = "3600"  # Test tự gọi flush() -> kết quả không phụ thuộc thời gian
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture
+def db():
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_articles(db):
+    """ Thêm bài báo vào DB, trả về list id """
+    from database import ArticleDB
+
+    def make(*texts, category="test"):
+        articles = [ArticleDB(category=category, title=title, content=content, url=f"https://example.com/{os.urandom(6).hex()}")
+                    for title, content in texts]
+        db.add_all(articles)
+        db.commit()
+        return [a.id for a in articles]
+    return make
@@ -0,0 +1,88 @@
+# backend/tests/test_analytics.py
+import io
+
+import pytest
+
+from services import sentiment_service
+from services.stream_clustering import iter_csv_chunks, MissingColumnError
+
+CSV = "ID,BinhLuan,Ngay\n1,Sản phẩm tốt,2024-01-01\n2,Giao hàng chậm,2024-01-02\n3,,2024-01-03\n"
+
+
+def test_iter_csv_chunks_reads_requested_column():
+    assert list(iter_csv_chunks(io.BytesIO(CSV.encode("utf-8-sig")), "BinhLuan", 1)) == [["Sản phẩm tốt"], ["Giao hàng chậm"]]
+
+
+def test_iter_csv_chunks_missing_column_lists_headers():
+    with pytest.raises(MissingColumnError) as exc:
+        list(iter_csv_chunks(io.BytesIO(CSV.encode()), "Comment"))
+    assert exc.value.header == ["ID", "BinhLuan", "Ngay"]
+
+
+def test_cluster_stream_unknown_column_is_400(client):
+    res = client.post("/analytics/cluster/stream", data={"column": "Comment", "num_clusters": "2"},
+                      files={"file": ("data.csv", CSV.encode(), "text/csv")})
+    assert res.status_code == 400
+    assert "BinhLuan" in res.json()["detail"]
+
+
+def test_cluster_stream_chunk_size_is_bounded(client):
+    res = client.post("/analytics/cluster/stream", data={"num_clusters": "2", "chunk_size": "10000000"},
+                      files={"file": ("data.csv", CSV.encode(), "text/csv")})
+    assert res.status_code == 400
+
+
+def test_bulk_sentiment_unknown_column_is_400(client, monkeypatch):
+    monkeypatch.setattr(sentiment_service, "sentiment_analyzer", object())  # Kiểm tra cột xảy ra trước khi chạy model
+    res = client.post("/analytics/sentiment/bulk", data={"column": "Comment"},
+                      files={"file": ("data.csv", CSV.encode(), "text/csv")})
+    assert res.status_code == 400
+    assert "ID, BinhLuan, Ngay" in res.json()["detail"]
+
+
+@pytest.mark.parametrize("batch_size", ["0", "1000000"])
+def test_bulk_sentiment_batch_size_is_bounded(client, monkeypatch, batch_size):
+    monkeypatch.setattr(sentiment_service, "sentiment_analyzer", object())
+    res = client.post("/analytics/sentiment/bulk", data={"batch_size": batch_size},
+                      files={"file": ("data.csv", CSV.encode(), "text/csv")})
+    assert res.status_code == 400
+
+
+def test_topics_and_cluster(client):
+    texts = ["giá vàng tăng mạnh hôm nay", "giá vàng tăng mạnh phiên sáng", "bóng đá việt nam thắng lớn", "bóng đá việt nam thắng đậm"]
+    topics = client.post("/analytics/topics", json={"texts": texts}).json()["topics"]
+    assert "giá vàng" in [t["text"] for t in topics]
+
+    clusters = client.post("/analytics/cluster", json={"texts": texts, "num_clusters": 2}).json()["clusters"]
+    assert set(clusters) == {"Nhóm 1", "Nhóm 2"}
+
+
+def test_url_cache_is_separate_per_analysis_mode(client, monkeypatch):
+    from routers import analytics
+
+    article = "Nội dung bài báo dài về kinh tế. " * 20
+
+    async def fake_fetch(url, etag=None, last_modified=None):
+        return {"text": article, "tier": "http", "etag": None, "last_modified": None, "not_modified": False}
+
+    async def fake_documents(texts):
+        doc = {"label": "Tích cực", "score": 0.9}
+        return [{"document": doc, "paragraphs": [], "windows": [], "truncated": False} for _ in texts]
+
+    async def fake_sentiment(texts):
+        return [{"label": "Trung lập", "score": 0.5} for _ in texts]
+
+    monkeypatch.setattr(sentiment_service, "sentiment_analyzer", object())
+    monkeypatch.setattr(analytics, "fetch_article_text", fake_fetch)
+    monkeypatch.setattr(analytics, "analyze_documents", fake_documents)
+    monkeypatch.setattr(analytics, "analyze_sentiment", fake_sentiment)
+    url = "https://example.com/bai-viet?utm_source=x"
+
+    long_res = client.post("/analytics/url", json={"url": url, "long_document": True}).json()
+    assert long_res["cache"] == "miss" and "document_sentiment" in long_res
+    short_res = client.post("/analytics/url", json={"url": url, "long_document": False}).json()
+    assert short_res["cache"] == "miss" and "document_sentiment" not in short_res
+    assert short_res["sentiments"] == [{"label": "Trung lập", "score": 0.5}]
+
+    again = client.post("/analytics/url", json={"url": url, "long_document": True}).json()
+    assert again["cache"] == "fresh" and again["document_sentiment"] == {"label": "Tích cực", "score": 0.9}
@@ -0,0 +1,60 @@
+# backend/tests/test_browser_pool.py
+import asyncio
+import threading
+
+from services.browser_pool import BrowserPool
+
+
+class FakePool(BrowserPool):
+    """ Không mở Chrome: _load chờ `release` (giả lập trang tải chậm) """
+
+    def __init__(self):
+        super().__init__(size=1, max_pages=10)
+        self.created, self.quit = 0, []
+        self.release = threading.Event()
+
+    def _create_driver(self):
+        self.created += 1
+        from services.browser_pool import _PooledDriver
+        return _PooledDriver(driver=f"driver-{self.created}")
+
+    def _quit(self, slot):
+        self.quit.append(slot.driver)
+        self.release.set()  # Giống driver.quit(): lệnh đang chạy trên driver bị ngắt
+
+    def _load(self, slot, url):
+        self.release.wait(5)
+        return f"<html>{url}</html>"
+
+
+def test_slot_is_reused_after_successful_fetch():
+    pool = FakePool()
+    pool.release.set()
+
+    async def run():
+        await pool.fetch_html("https://a")
+        await pool.fetch_html("https://b")
+    asyncio.run(run())
+    assert pool.created == 1 and pool.stats()["idle"] == 1
+
+
+def test_cancelled_fetch_quits_driver_and_keeps_pool_usable():
+    pool = FakePool()
+
+    async def run():
+        task = asyncio.create_task(pool.fetch_html("https://slow"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        for _ in range(50):  # _discard đóng driver ở thread riêng
+            if pool.quit:
+                break
+            await asyncio.sleep(0.01)
+        return await asyncio.wait_for(pool.fetch_html("https://next"), 2)
+
+    assert asyncio.run(run()) == "<html>https://next</html>"
+    assert pool.quit == ["driver-1"] and pool.created == 2
+    assert pool.stats()["idle"] == 1
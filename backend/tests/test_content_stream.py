@@ -0,0 +1,108 @@
+# backend/tests/test_content_stream.py
+# Stream /content/generate-text/stream qua server thật (uvicorn) tới fake_groq_server.py: kiểm tra token tới dần + cache
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+from routers import content_studio
+from services import openai_service
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKENS, TOKEN_DELAY = 10, 0.05
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Server trên cổng {port} không khởi động")
+
+
+@pytest.fixture(scope="module")
+def fake_groq():
+    pytest.importorskip("openai")
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, "fake_groq_server.py", "--port", str(port), "--tokens", str(TOKENS),
+                             "--token-delay", str(TOKEN_DELAY), "--first-token-delay", "0"], cwd=BACKEND_DIR)
+    try:
+        _wait_for_port(port)
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        proc.terminate()
+        proc.wait(timeout=5)
+
+
+@pytest.fixture(scope="module")
+def content_server():
+    """ Router Content Studio chạy trên uvicorn thật (TestClient gom cả body, không thấy token tới dần) """
+    app = FastAPI()
+    app.include_router(content_studio.router)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    _wait_for_port(port)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def groq_client(fake_groq, monkeypatch):
+    monkeypatch.setattr(openai_service, "GROQ_API_KEY", "test")
+    monkeypatch.setattr(openai_service, "GROQ_BASE_URL", fake_groq)
+    monkeypatch.setattr(openai_service, "_clients", {})
+
+
+def _stream(base_url, payload):
+    """ [(thời điểm nhận, event, data)] của từng sự kiện SSE """
+    events, event = [], None
+    with httpx.stream("POST", f"{base_url}/content/generate-text/stream", json=payload, timeout=30) as res:
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/event-stream")
+        for line in res.iter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((time.perf_counter(), event, json.loads(line[len("data: "):])))
+                event = None
+    return events
+
+
+def test_stream_tokens_arrive_incrementally_then_cache_hit(groq_client, content_server):
+    payload = {"prompt": f"Quảng cáo cà phê {uuid.uuid4().hex}", "task_type": "Viết slogan", "use_cache": True}
+
+    events = _stream(content_server, payload)
+    deltas = [(t, data["delta"]) for t, event, data in events if event is None]
+    assert len(deltas) == TOKENS
+    # Token tới dần theo nhịp của server giả, không phải 1 khối ở cuối
+    assert deltas[-1][0] - deltas[0][0] >= (TOKENS - 1) * TOKEN_DELAY * 0.5
+    done = events[-1]
+    assert done[1] == "done" and done[2]["generated_text"] == "".join(d for _, d in deltas)
+    assert "cached" not in done[2]
+
+    hits = openai_service.groq_cache.stats()["hits"]
+    cached = _stream(content_server, payload)
+    assert [e for _, e, _ in cached] == [None, "done"]
+    assert cached[-1][2] == {"generated_text": done[2]["generated_text"], "cached": True}
+    assert openai_service.groq_cache.stats()["hits"] == hits + 1
@@ -0,0 +1,44 @@
+# backend/tests/test_database.py
+from sqlalchemy import inspect, text
+
+import database
+from database import async_database_url, engine, InteractionDB
+
+
+def test_async_database_url_maps_sync_drivers(monkeypatch):
+    monkeypatch.delenv("ASYNC_DATABASE_URL", raising=False)
+    assert async_database_url("mysql+pymysql://root:pw@localhost/mediac_db?charset=utf8mb4") == \
+        "mysql+aiomysql://root:pw@localhost/mediac_db?charset=utf8mb4"
+    assert async_database_url("sqlite:///./mediac_test.db") == "sqlite+aiosqlite:///./mediac_test.db"
+    assert async_database_url("postgresql://u@db/mediac") == "postgresql+asyncpg://u@db/mediac"
+
+
+def test_async_database_url_override(monkeypatch):
+    monkeypatch.setenv("ASYNC_DATABASE_URL", "sqlite+aiosqlite:///other.db")
+    assert async_database_url("mysql+pymysql://root@localhost/x") == "sqlite+aiosqlite:///other.db"
+
+
+def test_unique_index_added_to_existing_table_drops_duplicates(client, db, make_articles):
+    """ Bảng interactions cũ (chưa có unique index, có dòng trùng) -> migration giữ dòng id nhỏ nhất rồi tạo index """
+    article_id, = make_articles(("Bài trùng", "nội dung"))
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_interactions_user_article"))
+    db.add_all([InteractionDB(user_id=9001, article_id=article_id) for _ in range(3)])
+    db.commit()
+
+    database._add_missing_columns_and_indexes()
+
+    rows = db.query(InteractionDB.id).filter(InteractionDB.user_id == 9001).all()
+    assert len(rows) == 1
+    assert "uq_interactions_user_article" in {ix["name"] for ix in inspect(engine).get_indexes("interactions")}
+
+
+def test_retired_interaction_index_is_dropped(client):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_interactions_user_article ON interactions (user_id, article_id)"))
+
+    database._add_missing_columns_and_indexes()
+
+    names = {ix["name"] for ix in inspect(engine).get_indexes("interactions")}
+    assert "ix_interactions_user_article" not in names
+    assert "uq_interactions_user_article" in names
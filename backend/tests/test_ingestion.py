@@ -0,0 +1,44 @@
+# backend/tests/test_ingestion.py
+import os
+from datetime import datetime
+
+from database import ArticleDB
+from services.ingestion import bulk_ingest_articles
+
+
+def _row(url, **analysis):
+    return {"category": "ingest_test", "title": f"Tiêu đề {url}", "content": "Nội dung bài báo thử nghiệm", "url": url, **analysis}
+
+
+def _url():
+    return f"https://example.com/ingest/{os.urandom(6).hex()}"
+
+
+def test_dedupes_batch_and_existing_urls(client, db):
+    old, new_a, new_b = _url(), _url(), _url()
+    assert bulk_ingest_articles([_row(old)])["inserted"] == 1
+
+    result = bulk_ingest_articles([_row(new_a), _row(new_a), _row(old), _row(new_b), {"title": "không có url"}])
+    assert result["inserted"] == 2 and result["skipped"] == 3 and result["duplicates_in_batch"] == 2
+    assert sorted(title for _, title, _ in result["articles"]) == sorted([f"Tiêu đề {new_a}", f"Tiêu đề {new_b}"])
+    assert db.query(ArticleDB).filter(ArticleDB.url.in_([old, new_a, new_b])).count() == 3
+
+
+def test_existing_rows_reanalyzed_only_when_stale(client, db):
+    unanalyzed, current = _url(), _url()
+    analysis = {"sentiment_label": "Tích cực", "sentiment_score": 0.9, "sentiment_model": "rev1",
+                "topics": "[]", "analyzed_at": datetime(2024, 1, 1)}
+    bulk_ingest_articles([_row(unanalyzed), _row(current, **analysis)])
+
+    newer = dict(analysis, sentiment_label="Tiêu cực", sentiment_score=0.7, analyzed_at=datetime(2024, 2, 1))
+    result = bulk_ingest_articles([_row(unanalyzed, **newer), _row(current, **newer)])
+    assert result["inserted"] == 0 and result["skipped"] == 2
+
+    rows = {a.url: a for a in db.query(ArticleDB).filter(ArticleDB.url.in_([unanalyzed, current]))}
+    # Chưa phân tích -> cập nhật; đã phân tích bằng đúng model (rev1) -> giữ nguyên
+    assert (rows[unanalyzed].sentiment_label, rows[unanalyzed].sentiment_model) == ("Tiêu cực", "rev1")
+    assert rows[current].sentiment_label == "Tích cực" and rows[current].analyzed_at == datetime(2024, 1, 1)
+
+    bulk_ingest_articles([_row(current, **dict(newer, sentiment_model="rev2"))])  # Model mới -> phân tích lại
+    db.expire_all()
+    assert db.query(ArticleDB.sentiment_model).filter(ArticleDB.url == current).scalar() == "rev2"
@@ -0,0 +1,42 @@
+# backend/tests/test_long_sentiment.py
+import asyncio
+
+from services import long_sentiment
+from services.long_sentiment import paragraph_windows, weighted_vote, split_document
+
+WORDS = " ".join(f"w{i}" for i in range(10))
+
+
+def test_overlapping_windows_weight_each_token_once():
+    windows = paragraph_windows(WORDS, None, size=4, overlap=1)
+    assert windows == [("w0 w1 w2 w3", 4), ("w3 w4 w5 w6", 3), ("w6 w7 w8 w9", 3)]
+    assert sum(w for _, w in windows) == 10  # Phần chồng lấn không bị tính 2 lần
+    assert paragraph_windows("ngắn gọn", None, size=4, overlap=1) == [("ngắn gọn", 2)]
+
+
+def test_weighted_vote_by_length():
+    vote = weighted_vote([{"label": "Tích cực", "score": 0.9}, {"label": "Tiêu cực", "score": 0.8}], [3, 1])
+    assert vote == {"label": "Tích cực", "score": 0.675, "distribution": {"Tích cực": 0.675, "Tiêu cực": 0.2}}
+
+
+def test_split_document_truncates_to_max_windows(monkeypatch):
+    monkeypatch.setattr(long_sentiment, "WINDOW_TOKENS", 4)
+    monkeypatch.setattr(long_sentiment, "WINDOW_OVERLAP", 1)
+    monkeypatch.setattr(long_sentiment, "MAX_WINDOWS", 2)
+    paragraphs, plan, truncated = split_document(f"{WORDS}\n\nđoạn hai")
+    assert paragraphs == [WORDS, "đoạn hai"]
+    assert truncated and [(i, w) for i, _, w in plan] == [(0, 4), (0, 3)]
+
+
+def test_analyze_documents_groups_windows_by_paragraph(monkeypatch):
+    monkeypatch.setattr(long_sentiment, "WINDOW_TOKENS", 4)
+    monkeypatch.setattr(long_sentiment, "WINDOW_OVERLAP", 1)
+
+    async def fake_sentiment(texts):
+        return [{"label": "Tiêu cực" if "w" in t else "Tích cực", "score": 1.0} for t in texts]
+
+    monkeypatch.setattr(long_sentiment, "analyze_sentiment", fake_sentiment)
+    doc, = asyncio.run(long_sentiment.analyze_documents([f"{WORDS}\n\ntin vui"]))
+    assert doc["windows"] == 4 and not doc["truncated"]
+    assert [(p["index"], p["windows"], p["label"]) for p in doc["paragraphs"]] == [(0, 3, "Tiêu cực"), (1, 1, "Tích cực")]
+    assert doc["document"]["distribution"] == {"Tiêu cực": round(10 / 12, 4), "Tích cực": round(2 / 12, 4)}
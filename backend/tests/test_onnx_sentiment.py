@@ -0,0 +1,57 @@
+# backend/tests/test_onnx_sentiment.py
+import numpy as np
+
+from services.onnx_sentiment import OnnxSentimentPipeline, bucket_length
+
+
+class FakeTokenizer:
+    """ Mỗi từ = 1 token, id = số token của câu sau khi cắt (để session giả biết câu nào là câu nào) """
+
+    def __call__(self, texts, truncation=True, max_length=None):
+        lengths = [min(len(t.split()), max_length) if truncation else len(t.split()) for t in texts]
+        return {"input_ids": [[n] * n for n in lengths]}
+
+
+class FakeSession:
+    """ Ghi lại shape từng lô; logits chọn nhãn theo số từ % 3 """
+
+    def __init__(self):
+        self.shapes = []
+
+    def run(self, outputs, feeds):
+        input_ids, mask = feeds["input_ids"], feeds["attention_mask"]
+        self.shapes.append(input_ids.shape)
+        assert (mask.sum(axis=1) == input_ids[:, 0]).all()  # Mask đúng số token thật, phần còn lại là pad
+        logits = np.zeros((len(input_ids), 3))
+        logits[np.arange(len(input_ids)), input_ids[:, 0] % 3] = 5.0
+        return [logits]
+
+
+def _pipeline(max_length=256):
+    pipe = OnnxSentimentPipeline.__new__(OnnxSentimentPipeline)
+    pipe.tokenizer, pipe.session = FakeTokenizer(), FakeSession()
+    pipe.id2label, pipe.max_length, pipe.pad_id = {0: "NEG", 1: "NEU", 2: "POS"}, max_length, 0
+    return pipe
+
+
+def test_bucket_length():
+    assert [bucket_length(n, (16, 32)) for n in (1, 16, 17, 32, 40)] == [16, 16, 32, 32, 40]
+
+
+def test_results_keep_input_order_and_pad_per_bucket():
+    pipe = _pipeline()
+    lengths = [40, 3, 20, 5, 100, 7]
+    results = pipe([" ".join(["từ"] * n) for n in lengths], batch_size=8)
+
+    assert [r["label"] for r in results] == [("NEG", "NEU", "POS")[n % 3] for n in lengths]
+    assert all(r["score"] > 0.9 for r in results)
+    # Câu ngắn không bị pad theo câu dài: mỗi lô chỉ pad tới bucket của nó
+    assert sorted(pipe.session.shapes) == [(1, 32), (1, 64), (1, 128), (3, 16)]
+
+
+def test_batch_size_splits_bucket_and_truncation():
+    pipe = _pipeline(max_length=16)
+    results = pipe([" ".join(["từ"] * n) for n in (2, 30, 4, 6, 8)], batch_size=2)
+    assert len(results) == 5 and results[1]["label"] == ("NEG", "NEU", "POS")[16 % 3]  # 30 từ bị cắt còn 16
+    assert pipe.session.shapes == [(2, 16), (2, 16), (1, 16)]
+    assert pipe([]) == []
@@ -0,0 +1,112 @@
+# backend/tests/test_personalization.py
+from database import InteractionDB, RecommendationDB
+from services.view_buffer import view_buffer
+
+FOOTBALL = "Đội tuyển bóng đá Việt Nam thắng trận giao hữu, huấn luyện viên khen hàng tiền đạo."
+
+
+def _login(client, username):
+    res = client.post("/personalization/login", json={"username": username})
+    assert res.status_code == 200
+    return res.json()["user_id"]
+
+
+def test_login_returns_same_user(client):
+    assert _login(client, "login_user") == _login(client, "login_user")
+
+
+def test_log_view_is_buffered_then_flushed(client, db, make_articles):
+    user_id = _login(client, "buffer_user")
+    article_id, = make_articles(("Bóng đá", FOOTBALL))
+
+    assert client.post("/personalization/log_view", json={"user_id": user_id, "article_id": article_id}).json() == {"status": "success"}
+    # Chưa ghi xuống DB nhưng lịch sử trang đầu đã có (lấy từ bộ đệm)
+    assert db.query(InteractionDB).filter_by(user_id=user_id).count() == 0
+    assert [h["id"] for h in client.get(f"/personalization/history/{user_id}").json()["history"]] == [article_id]
+
+    assert view_buffer.flush() >= 1
+    assert db.query(InteractionDB).filter_by(user_id=user_id).count() == 1
+
+    # Xem lại sau khi đã ghi: INSERT bỏ qua trùng (sqlite on_conflict_do_nothing), không sinh dòng mới
+    client.post("/personalization/log_view", json={"user_id": user_id, "article_id": article_id})
+    view_buffer.flush()
+    assert db.query(InteractionDB).filter_by(user_id=user_id).count() == 1
+
+
+def test_history_keyset_pagination(client, make_articles):
+    user_id = _login(client, "history_user")
+    ids = make_articles(*[(f"Bài {i}", f"Nội dung bài số {i}") for i in range(3)])
+    for article_id in ids:
+        client.post("/personalization/log_view", json={"user_id": user_id, "article_id": article_id})
+    view_buffer.flush()
+
+    first = client.get(f"/personalization/history/{user_id}", params={"limit": 2}).json()
+    assert [h["id"] for h in first["history"]] == ids[::-1][:2]
+    assert first["next_cursor"]
+    second = client.get(f"/personalization/history/{user_id}", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [h["id"] for h in second["history"]] == [ids[0]]
+    assert second["next_cursor"] is None
+
+    assert client.get(f"/personalization/history/{user_id}", params={"cursor": "sai"}).status_code == 400
+
+
+def test_recommend_similar_unread_articles(client, make_articles):
+    user_id = _login(client, "recommend_user")
+    read, similar, other = make_articles(
+        ("Cầu lông: tay vợt trẻ vô địch", "Tay vợt cầu lông trẻ vô địch giải quốc tế sau trận chung kết kịch tính."),
+        ("Cầu lông: tay vợt nữ lên hạng", "Tay vợt cầu lông nữ lên hạng thế giới nhờ chức vô địch giải quốc tế."),
+        ("Giá vàng tăng mạnh", "Giá vàng trong nước tăng mạnh theo thị trường thế giới, nhà đầu tư mua vào."),
+    )
+    client.post("/personalization/log_view", json={"user_id": user_id, "article_id": read})
+    view_buffer.flush()
+
+    recs = client.get(f"/personalization/recommend/{user_id}").json()["recommendations"]
+    rec_ids = [r["id"] for r in recs]
+    assert rec_ids[0] == similar
+    assert read not in rec_ids and other not in rec_ids
+
+    batch = client.post("/personalization/recommend/batch", json={"user_ids": [user_id], "top_n": 1}).json()
+    assert [r["id"] for r in batch["recommendations"][str(user_id)]] == [similar]
+
+
+def test_profile_rebuilt_from_history_of_unindexed_articles(client, db, make_articles):
+    """ Lịch sử cũ (đã có trong DB) trỏ tới bài chỉ mục chưa có -> đồng bộ chỉ mục trước, không lưu hồ sơ rỗng """
+    user_id = _login(client, "rebuild_user")
+    read, similar = make_articles(
+        ("Bơi lội: kình ngư phá kỷ lục", "Kình ngư bơi lội phá kỷ lục quốc gia nội dung bơi tự do."),
+        ("Bơi lội: kình ngư giành huy chương", "Kình ngư bơi lội giành huy chương vàng nội dung bơi tự do."),
+    )
+    db.add(InteractionDB(user_id=user_id, article_id=read))
+    db.commit()
+
+    rec_ids = [r["id"] for r in client.get(f"/personalization/recommend/{user_id}").json()["recommendations"]]
+    assert similar in rec_ids and read not in rec_ids
+
+
+def test_precomputed_recommendations_skip_read_articles(client, db, make_articles):
+    """ Job tính sẵn chạy trên hồ sơ cũ có thể ghi cả bài đã đọc -> lọc theo interactions khi trả về """
+    user_id = _login(client, "precomputed_user")
+    read, unread = make_articles(("Bài đã đọc", "nội dung một"), ("Bài chưa đọc", "nội dung hai"))
+    db.add_all([
+        RecommendationDB(user_id=user_id, article_id=read, rank=0, score=0.9),
+        RecommendationDB(user_id=user_id, article_id=unread, rank=1, score=0.5),
+        InteractionDB(user_id=user_id, article_id=read),
+    ])
+    db.commit()
+
+    recs = client.get(f"/personalization/recommend/{user_id}").json()["recommendations"]
+    assert [r["id"] for r in recs] == [unread]
+
+
+def test_batch_recommend_validates_input(client):
+    assert client.post("/personalization/recommend/batch", json={"user_ids": [1], "top_n": 0}).status_code == 422
+    assert client.post("/personalization/recommend/batch", json={"user_ids": [1], "top_n": -5}).status_code == 422
+    assert client.post("/personalization/recommend/batch", json={"user_ids": list(range(1001))}).status_code == 422
+
+
+def test_log_view_rejects_unknown_user_or_article(client, make_articles):
+    user_id = _login(client, "validate_user")
+    article_id, = make_articles(("Bài hợp lệ", "nội dung"))
+    assert client.post("/personalization/log_view", json={"user_id": 10**9, "article_id": article_id}).status_code == 404
+    assert client.post("/personalization/log_view", json={"user_id": user_id, "article_id": 10**9}).status_code == 404
+    assert not view_buffer.has_pending(10**9)
@@ -0,0 +1,64 @@
+# backend/tests/test_recommendation_index.py
+import pickle
+
+from services.recommendation_index import ArticleIndex, UserProfileStore
+
+
+def test_build_from_empty_table_then_add_articles(tmp_path):
+    index = ArticleIndex(index_dir=str(tmp_path))
+    index.build([])
+    assert index.loaded and index.doc_matrix.shape == (0, 0)
+    assert index.transform("bóng đá").nnz == 0
+    index.save()
+
+    index.add_articles([(1, "Bóng đá", "đội tuyển bóng đá thắng"), (2, "Giá vàng", "giá vàng tăng mạnh")])
+    index.reweight()
+    assert index.top_n(index.transform("bóng đá"), top_n=1)[0][0] == 1
+
+    restored = ArticleIndex(index_dir=str(tmp_path))
+    index.save()
+    assert restored.load() and restored.article_ids == [1, 2]
+
+
+def test_transform_unknown_terms_is_empty_vector(tmp_path):
+    index = ArticleIndex(index_dir=str(tmp_path))
+    index.build([(1, "Bóng đá", "đội tuyển bóng đá thắng")])
+    vec = index.transform("từkhôngcó")
+    assert vec.shape == (1, len(index.vocabulary)) and vec.nnz == 0
+    assert index.top_n(vec) == []
+
+
+def test_incremental_add_matches_full_build(tmp_path):
+    articles = [(i, f"Tin {i}", f"nội dung số {i} về chủ đề {i % 3} và thị trường") for i in range(1, 40)]
+    full = ArticleIndex(index_dir=str(tmp_path / "full"))
+    full.build(articles)
+
+    index = ArticleIndex(index_dir=str(tmp_path / "inc"))
+    index.build(articles[:1])
+    for start in range(1, len(articles), 5):
+        index.add_articles(articles[start:start + 5])
+    doc_before = index.doc_matrix
+    assert index.transposed() is index.transposed()
+    index.reweight()
+    assert index.doc_matrix is not doc_before
+
+    assert index.article_ids == full.article_ids and index.vocabulary == full.vocabulary
+    assert abs(index.counts - full.counts).max() == 0
+    assert abs(index.doc_matrix - full.doc_matrix).max() < 1e-12
+
+
+def test_profile_load_keeps_in_memory_profiles(tmp_path):
+    on_disk = {uid: {"t0": 0.0, "weights": {0: 1.0}, "viewed": {10}} for uid in (1, 2)}
+    with open(tmp_path / "user_profiles.pkl", "wb") as f:
+        pickle.dump(on_disk, f)
+
+    store = UserProfileStore(index_dir=str(tmp_path))
+    store.touch(2)  # Hồ sơ dựng trong bộ nhớ trước khi nạp đĩa
+    store.load()
+    assert store.profiles[2]["viewed"] == set() and store.profiles[1]["viewed"] == {10}
+    assert store.unverified == {1}
+
+    store.touch(1)
+    store.profiles[1]["viewed"].add(11)
+    store.load()  # Đã nạp -> không ghi đè
+    assert store.profiles[1]["viewed"] == {10, 11} and not store.unverified
@@ -0,0 +1,68 @@
+# backend/tests/test_sentiment_service.py
+import os
+import asyncio
+
+from services import sentiment_service
+
+
+def test_model_revision_changes_with_weights_of_same_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(sentiment_service, "LOCAL_MODEL_PATH", str(tmp_path))
+    monkeypatch.setattr(sentiment_service, "DIGEST_CACHE_PATH", str(tmp_path / "digests.json"))
+    (tmp_path / "config.json").write_text('{"model_type": "roberta"}')
+    weights = tmp_path / "model.safetensors"
+    weights.write_bytes(b"\x01" * 64)
+    first = sentiment_service._model_revision()
+    assert sentiment_service._model_revision() == first  # Lần 2 lấy hash đã nhớ
+
+    weights.write_bytes(b"\x02" * 64)  # Model huấn luyện lại: cùng kiến trúc, cùng kích thước file
+    os.utime(weights, ns=(0, os.stat(weights).st_mtime_ns + 1_000_000))
+    second = sentiment_service._model_revision()
+    assert second != first
+
+    (tmp_path / "tokenizer.json").write_text("{}")
+    assert sentiment_service._model_revision() != second
+
+
+def test_cache_key_normalizes_whitespace():
+    assert sentiment_service.cache_key("Tin  tốt\n") == sentiment_service.cache_key("Tin tốt")
+
+
+def test_model_revision_is_computed_once_on_demand(monkeypatch):
+    calls = []
+    monkeypatch.setattr(sentiment_service, "_revisions", {})
+    monkeypatch.setattr(sentiment_service, "_model_revision", lambda: calls.append(1) or "abc123")
+    assert sentiment_service.cache_metrics()["model_revision"] is None  # Metrics không tự hash file model
+    assert sentiment_service.model_revision() == sentiment_service.weights_revision() == "abc123"
+    sentiment_service.cache_key("Tin tốt")
+    assert len(calls) == 1
+
+
+def test_batching_queue_respects_max_batch_size_and_order():
+    batches = []
+
+    def infer(texts):
+        batches.append(list(texts))
+        if "lỗi" in texts:
+            raise ValueError("model lỗi")
+        return [t.upper() for t in texts]
+
+    batcher = sentiment_service.BatchingInferenceQueue(infer, max_batch_size=4, max_wait_ms=200, name="test")
+
+    async def run():
+        requests = [["a1", "a2", "a3"], ["b1", "b2", "b3"], ["c1"], ["d1", "d2", "d3", "d4", "d5"]]
+        return await asyncio.gather(*(batcher.submit(r) for r in requests)), requests
+
+    try:
+        results, requests = asyncio.run(run())
+        assert results == [[t.upper() for t in r] for r in requests]
+        assert all(len(b) <= 4 for b in batches)
+        assert any(len({t[0] for t in b}) > 1 for b in batches)  # Gom văn bản của nhiều request vào 1 lô
+        assert [t for b in batches for t in b] == [t for r in requests for t in r]
+
+        async def failing():
+            return await asyncio.gather(batcher.submit(["x1", "lỗi"]), batcher.submit(["x2"]), return_exceptions=True)
+        first, second = asyncio.run(failing())
+        assert isinstance(first, ValueError) and isinstance(second, ValueError)  # Lỗi trả về mọi request trong lô
+        assert batcher.metrics()["queue_depth"] == 0
+    finally:
+        batcher.stop()
@@ -0,0 +1,37 @@
+# backend/tests/test_trending.py
+import math
+import os
+from datetime import datetime, timedelta
+
+from database import TopicTrendDB
+from services.trending import record_article_phrases, top_rising
+
+GOLD = ("Giá vàng", "giá vàng trong nước")
+FOOTBALL = ("Bóng đá", "đội tuyển bóng đá")
+
+
+def test_counts_merge_per_bucket_and_rising_score(client, db):
+    category = f"trend_{os.urandom(4).hex()}"
+    hour = datetime(2024, 3, 1, 10)
+    record_article_phrases(db, [(category, *GOLD)], ingested_at=hour - timedelta(minutes=30))
+    # 2 lần ghi trong cùng 1 giờ -> cộng dồn vào 1 bucket
+    record_article_phrases(db, [(category, *GOLD), (category, *FOOTBALL)], ingested_at=hour + timedelta(minutes=5))
+    record_article_phrases(db, [(category, *GOLD), (category, *FOOTBALL)], ingested_at=hour + timedelta(minutes=40))
+    db.commit()
+
+    gold = db.query(TopicTrendDB.bucket, TopicTrendDB.count) \
+        .filter_by(category=category, phrase="giá vàng").order_by(TopicTrendDB.bucket).all()
+    assert gold == [(hour - timedelta(hours=1), 1), (hour, 2)]
+
+    # Cửa sổ không tròn giờ được mở rộng theo bucket: [10:00, 11:00) so với [09:00, 10:00)
+    result = top_rising(db, hour + timedelta(minutes=15), hour + timedelta(minutes=45), category=category, min_count=2)
+    assert (result["start"], result["end"]) == (hour, hour + timedelta(hours=1))
+    topics = {t["text"]: t for t in result["topics"]}
+    assert topics["bóng đá"]["previous"] == 0 and topics["bóng đá"]["score"] == 2.0
+    assert topics["giá vàng"]["previous"] == 1 and topics["giá vàng"]["score"] == round(1 / math.sqrt(2), 3)
+    texts = [t["text"] for t in result["topics"]]
+    assert texts.index("bóng đá") < texts.index("giá vàng")  # Cụm từ mới xuất hiện tăng mạnh hơn cụm đã có nền
+
+
+def test_no_phrases_in_window(client, db):
+    assert top_rising(db, datetime(2000, 1, 1), datetime(2000, 1, 2), category="không có")["topics"] == []
@@ -0,0 +1,50 @@
+# backend/tests/test_view_buffer.py
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from services.view_buffer import ViewBuffer
+
+BAD_ARTICLE = 404
+
+
+class FakeDB:
+    """ write_fn giả: lỗi khóa ngoại nếu lô có bài BAD_ARTICLE, hoặc mất kết nối khi down = True """
+
+    def __init__(self):
+        self.rows, self.down = {}, False
+
+    def write(self, views):
+        if self.down:
+            raise OperationalError("INSERT", {}, Exception("server has gone away"))
+        if any(a == BAD_ARTICLE for _, a in views):
+            raise IntegrityError("INSERT", {}, Exception("FOREIGN KEY constraint failed"))
+        self.rows.update(views)
+
+
+def test_bad_row_is_dropped_and_rest_of_batch_written():
+    db = FakeDB()
+    buffer = ViewBuffer(write_fn=db.write, flush_size=1000)
+    for article_id in range(1, 8):
+        buffer.add(1, article_id)
+    buffer.add(2, BAD_ARTICLE)
+
+    assert buffer.flush() == 7
+    assert set(db.rows) == {(1, a) for a in range(1, 8)}
+    metrics = buffer.metrics()
+    assert metrics["pending"] == 0 and metrics["rejected"] == 1
+    # Không còn kẹt: lượt xem mới vẫn ghi được
+    buffer.add(3, 1)
+    assert buffer.flush() == 1
+
+
+def test_transient_error_keeps_batch_for_retry():
+    db = FakeDB()
+    buffer = ViewBuffer(write_fn=db.write, flush_size=1000)
+    buffer.add(1, 1)
+    buffer.add(1, 2)
+    db.down = True
+    assert buffer.flush() == 0
+    assert buffer.metrics()["pending"] == 2 and buffer.metrics()["rejected"] == 0
+
+    db.down = False
+    assert buffer.flush() == 2
+    assert set(db.rows) == {(1, 1), (1, 2)}
@@ -0,0 +1,97 @@
+# backend/utils/cache.py
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+# === CACHE LRU TRONG BỘ NHỚ (THREAD-SAFE) ===
+class LRUCache:
+    """ ttl (giây): None = không hết hạn, chỉ bị đẩy ra theo LRU """
+
+    def __init__(self, max_size: int = 10000, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                value, expires_at = self._data[key]
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.time() + self.ttl if self.ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "max_size": self.max_size, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses, "expired": self.expired}
+
+
+# === KHO KEY-VALUE TRÊN ĐĨA (SQLITE, GIÁ TRỊ LƯU DẠNG JSON) ===
+class SqliteStore:
+    """
+    Giữ kết quả qua các lần khởi động lại server. Giá trị phải serialize được bằng JSON.
+    ttl (giây): None = không hết hạn; dòng hết hạn bị bỏ qua khi đọc và xóa khi mở lại store.
+    """
+
+    def __init__(self, path: str, table: str = "cache", ttl: float = None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.table = table
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)")
+        # Bảng tạo trước khi có cột expires_at
+        columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if "expires_at" not in columns:
+            self._conn.execute(f"ALTER TABLE {table} ADD COLUMN expires_at REAL")
+        self._conn.execute(f"DELETE FROM {table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+        self._conn.commit()
+
+    def get_many(self, keys):
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({','.join('?' * len(part))})"
+                    f" AND (expires_at IS NULL OR expires_at > ?)", part + [time.time()]
+                ).fetchall()
+                found.update((k, json.loads(v)) for k, v in rows)
+        return found
+
+    def set_many(self, items):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False), expires_at) for k, v in items]
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -37,6 +37,9 @@ function PersonalizationModule() {
   // State Data
   const [articles, setArticles] = useState([]);
   const [history, setHistory] = useState([]);
+  // Backend phân trang keyset: next_cursor = null khi đã hết
+  const [articlesCursor, setArticlesCursor] = useState(null);
+  const [historyCursor, setHistoryCursor] = useState(null);
   const [recommendations, setRecommendations] = useState([]);
 
   // State UI
@@ -71,20 +74,41 @@ function PersonalizationModule() {
     }
   };
 
-  const fetchArticles = async () => {
+  // Nối trang sau vào danh sách hiện có (bỏ bài trùng id)
+  const appendPage = (prev, items) => {
+    const seen = new Set(prev.map((item) => item.id));
+    return [...prev, ...items.filter((item) => !seen.has(item.id))];
+  };
+
+  // cursor = null: tải lại trang đầu; có cursor: tải thêm trang tiếp theo
+  const fetchArticles = async (cursor = null) => {
     try {
-      const res = await axios.get(`${API_BASE_URL}/articles`);
-      if (res.data.status === "success") setArticles(res.data.articles);
+      const res = await axios.get(`${API_BASE_URL}/articles`, {
+        params: cursor ? { cursor } : {},
+      });
+      if (res.data.status === "success") {
+        setArticles((prev) =>
+          cursor ? appendPage(prev, res.data.articles) : res.data.articles
+        );
+        setArticlesCursor(res.data.next_cursor);
+      }
     } catch (err) {
       setError("Lỗi tải bài báo.");
     }
   };
 
-  const fetchHistory = async () => {
+  const fetchHistory = async (cursor = null) => {
     if (!currentUser) return;
     try {
-      const res = await axios.get(`${API_BASE_URL}/history/${currentUser.id}`);
-      if (res.data.status === "success") setHistory(res.data.history);
+      const res = await axios.get(`${API_BASE_URL}/history/${currentUser.id}`, {
+        params: cursor ? { cursor } : {},
+      });
+      if (res.data.status === "success") {
+        setHistory((prev) =>
+          cursor ? appendPage(prev, res.data.history) : res.data.history
+        );
+        setHistoryCursor(res.data.next_cursor);
+      }
     } catch (err) {
       console.error(err);
     }
@@ -115,6 +139,16 @@ function PersonalizationModule() {
     setReadingArticle(article);
     setOpenDialog(true);
 
+    // Danh sách / lịch sử chỉ có đoạn tóm tắt -> tải nội dung đầy đủ khi mở bài
+    if (article.content === undefined) {
+      axios
+        .get(`${API_BASE_URL}/articles/${article.id}`)
+        .then((res) => {
+          if (res.data.status === "success") setReadingArticle(res.data.article);
+        })
+        .catch((err) => console.error("Lỗi tải bài báo", err));
+    }
+
     // Gửi log lên server
     try {
       await axios.post(`${API_BASE_URL}/log_view`, {
@@ -177,7 +211,7 @@ function PersonalizationModule() {
               overflow: "hidden",
             }}
           >
-            {article.content}
+            {article.summary ?? article.content}
           </Typography>
         </CardContent>
       </CardActionArea>
@@ -233,6 +267,7 @@ function PersonalizationModule() {
             onClick={() => {
               setCurrentUser(null);
               setHistory([]);
+              setHistoryCursor(null);
               setRecommendations([]);
             }}
           >
@@ -272,6 +307,11 @@ function PersonalizationModule() {
                 onClick={handleReadArticle}
               />
             ))}
+            {articlesCursor && (
+              <Button fullWidth onClick={() => fetchArticles(articlesCursor)}>
+                Tải thêm
+              </Button>
+            )}
           </Paper>
         </Grid>
 
@@ -287,7 +327,8 @@ function PersonalizationModule() {
                   gutterBottom
                   sx={{ display: "flex", alignItems: "center" }}
                 >
-                  <HistoryIcon sx={{ mr: 1 }} /> Lịch sử Đọc ({history.length})
+                  <HistoryIcon sx={{ mr: 1 }} /> Lịch sử Đọc ({history.length}
+                  {historyCursor ? "+" : ""})
                 </Typography>
                 <Divider sx={{ mb: 2 }} />
                 {history.length === 0 && (
@@ -306,6 +347,11 @@ function PersonalizationModule() {
                     onClick={handleReadArticle}
                   />
                 ))}
+                {historyCursor && (
+                  <Button fullWidth onClick={() => fetchHistory(historyCursor)}>
+                    Tải thêm lịch sử
+                  </Button>
+                )}
               </Paper>
             </Grid>
             <Grid item xs={12} md={6}>
@@ -369,7 +415,7 @@ function PersonalizationModule() {
                 variant="body1"
                 sx={{ fontSize: "1.1rem", lineHeight: 1.8 }}
               >
-                {readingArticle.content}
+                {readingArticle.content ?? readingArticle.summary}
               </Typography>
               {readingArticle.image_url && (
                 <Box sx={{ mt: 3, textAlign: "center" }}>